@@ -0,0 +1,488 @@
+#!/usr/bin/env python
+# Copyright (c) 2012 Sergey Danielyan a.k.a gahcep
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+## PyWT benchmarks: timer accuracy, overhead and scale.
+## Usage: python bench/PyWTBench.py [--quick] [--only jitter,idle,...]
+##                                  [--output FILE] [--compare OLD_FILE]
+## Results are written as JSON, --compare prints the change of every
+## number against an older run
+
+from __future__ import print_function, division
+
+import argparse
+import json
+import os
+import platform
+import sys
+from multiprocessing import cpu_count
+from threading import Event
+from time import sleep, strftime, gmtime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import PyWT
+
+## Benchmarks in the run order
+BENCHMARKS                  = ('jitter', 'idle', 'scale', 'control', 'churn', 'shard')
+
+## Timer kinds: WaitableTimer thread per timer or timers of one TimerManager
+KIND_THREAD                 = 'thread'
+KIND_THREAD_POLLING         = 'thread-polling'
+KIND_MANAGER                = 'manager'
+KIND_MANAGER_WHEEL          = 'manager-wheel'
+KIND_MANAGER_SELECTOR       = 'manager-selector'
+
+## Kinds of TimerManager; the selector one needs a Unix pipe
+MANAGER_KINDS               = (KIND_MANAGER, KIND_MANAGER_WHEEL, KIND_MANAGER_SELECTOR)
+MANAGER_WAKEUP_KINDS        = (KIND_MANAGER, KIND_MANAGER_SELECTOR) if os.name == 'posix' else (KIND_MANAGER,)
+
+## Intervals for timers which must not fire during a benchmark
+IDLE_INTERVAL               = 3600
+
+## Time to wait for a timer to apply a state change
+STATE_TIMEOUT               = 10
+
+
+############ Helpers ##############
+def CpuTime():
+    ## User plus system time of the process, works on Python 2 too
+    Times = os.times()
+    return Times[0] + Times[1]
+
+def Percentiles(Values):
+    if not Values:
+        return {'Count': 0}
+    Values = sorted(Values)
+    def At(Part):
+        return Values[min(int(Part * len(Values)), len(Values) - 1)]
+    return {
+        'Count' : len(Values),
+        'Min'   : Values[0],
+        'Mean'  : sum(Values) / len(Values),
+        'P50'   : At(0.5),
+        'P90'   : At(0.9),
+        'P99'   : At(0.99),
+        'Max'   : Values[-1],
+    }
+
+def HistogramPercentile(Snapshot, Part):
+    ## Upper bound of the bucket holding the percentile of a Histogram snapshot
+    if not Snapshot['Count']:
+        return 0.0
+    Target = Part * Snapshot['Count']
+    Seen = 0
+    for Index, Count in enumerate(Snapshot['Counts']):
+        Seen += Count
+        if Seen >= Target:
+            if Index < len(Snapshot['Bounds']):
+                return Snapshot['Bounds'][Index]
+            break
+    return Snapshot['Max']
+
+def WaitFor(Condition, Timeout = STATE_TIMEOUT):
+    Limit = PyWT.Clock() + Timeout
+    while not Condition():
+        if PyWT.Clock() > Limit:
+            return False
+        sleep(0.001)
+    return True
+
+def CreateTimers(Kind, Count, Initial, Interval, FunctionProc, **Options):
+    ## Returns the timers and the manager (None for thread kinds)
+    Manager = None
+    if Kind in MANAGER_KINDS:
+        Manager = PyWT.TimerManager(PyWT.STORE_WHEEL if Kind == KIND_MANAGER_WHEEL else PyWT.STORE_HEAP,
+                                    WakeupMode = PyWT.WAKEUP_SELECTOR if Kind == KIND_MANAGER_SELECTOR else PyWT.WAKEUP_EVENT)
+        Manager.start()
+        Timers = [Manager.CreateTimer(Initial, Interval, FunctionProc, **Options) for Index in range(Count)]
+    else:
+        if Kind == KIND_THREAD_POLLING:
+            Options['WakeupMode'] = PyWT.WAKEUP_POLLING
+        Timers = [PyWT.WaitableTimer(Initial, Interval, FunctionProc, **Options) for Index in range(Count)]
+        for Timer in Timers:
+            Timer.start()
+    return Timers, Manager
+
+def DestroyTimers(Timers, Manager):
+    for Timer in Timers:
+        Timer.Terminate(DisableStateCheck = True)
+    if Manager is not None:
+        Manager.Terminate()
+        Manager.join()
+    else:
+        for Timer in Timers:
+            Timer.join()
+
+def BurnCpu(Loops):
+    ## CPU bound timer function, module level so worker processes can load it
+    Total = 0
+    for Index in range(Loops):
+        Total += Index * Index
+    return Total
+
+def IsRunning(Timers):
+    Running = (PyWT.TIMER_STATE_RUNNINGINITIAL, PyWT.TIMER_STATE_RUNNING)
+    return lambda: all(Timer.GetState() in Running for Timer in Timers)
+
+def Report(Name, Result):
+    print("  %-28s %s" % (Name, json.dumps(Result, sort_keys = True)))
+
+
+class StateProbe(object):
+    ## Trace listener catching the moment a timer applies a control call
+
+    def __init__(self):
+        self.Done = Event()
+        self.Stamp = 0
+        self.__Expected = None
+
+    def __call__(self, Timer, TraceEvent, Value, Stamp):
+        if (TraceEvent, Value) == self.__Expected:
+            self.Stamp = Stamp
+            self.Done.set()
+
+    def Arm(self, TraceEvent, Value):
+        self.__Expected = (TraceEvent, Value)
+        self.Done.clear()
+
+
+############ Benchmarks ##############
+def BenchJitter(Args):
+    ## Fire time deviation from the ideal grid for every wakeup mode and Precision
+    ## (managers have no Precision)
+    Runs = [(Kind, Precision) for Kind in (KIND_THREAD, KIND_THREAD_POLLING) for Precision in Args.precisions]
+    Runs += [(Kind, None) for Kind in MANAGER_WAKEUP_KINDS]
+    Results = []
+    for Kind, Precision in Runs:
+        Options = {'Precision': Precision} if Precision is not None else {}
+        Stamps = []
+        Timers, Manager = CreateTimers(Kind, 1, 1, Args.jitter_interval,
+                                       lambda: Stamps.append(PyWT.Clock()),
+                                       TimerCount = Args.jitter_ticks,
+                                       Statistics = True, **Options)
+        CpuStart = CpuTime()
+        if Manager is None:
+            Timers[0].join()
+        else:
+            Timers[0].WaitForState(PyWT.TIMER_STATE_TERMINATED)
+        Cpu = CpuTime() - CpuStart
+        Lateness = Timers[0].GetStats()['Lateness']
+        if Manager is not None:
+            DestroyTimers(Timers, Manager)
+
+        ## Grid is anchored at the earliest fire, so the deviation is >= 0
+        Offsets = [Stamp - Index * Args.jitter_interval for Index, Stamp in enumerate(Stamps)]
+        Anchor = min(Offsets)
+        Result = {
+            'Kind'      : Kind,
+            'Precision' : Precision,
+            'Interval'  : Args.jitter_interval,
+            'Jitter'    : Percentiles([Offset - Anchor for Offset in Offsets]),
+            'Lateness'  : Lateness,
+            'CpuSeconds': Cpu,
+        }
+        Report(Kind if Precision is None else "%s precision=%g" % (Kind, Precision), Result['Jitter'])
+        Results.append(Result)
+    return Results
+
+def BenchIdle(Args):
+    ## CPU burnt by timers which have nothing to do
+    Results = []
+    for Kind in (KIND_THREAD, KIND_THREAD_POLLING) + MANAGER_WAKEUP_KINDS:
+        Timers, Manager = CreateTimers(Kind, Args.idle_timers, IDLE_INTERVAL, IDLE_INTERVAL, lambda: None)
+        try:
+            WaitFor(IsRunning(Timers))
+            CpuStart = CpuTime()
+            sleep(Args.idle_seconds)
+            Cpu = CpuTime() - CpuStart
+        finally:
+            DestroyTimers(Timers, Manager)
+
+        Result = {
+            'Kind'         : Kind,
+            'Timers'       : Args.idle_timers,
+            'Seconds'      : Args.idle_seconds,
+            'CpuPercent'   : 100.0 * Cpu / Args.idle_seconds,
+            'CpuPerTimer'  : 100.0 * Cpu / Args.idle_seconds / Args.idle_timers,
+        }
+        Report(Kind, Result)
+        Results.append(Result)
+    return Results
+
+def BenchScale(Args):
+    ## Largest timer count still firing on time: doubling until the P99
+    ## lateness exceeds the limit or the ticks fall behind
+    Results = []
+    for Kind, Limit in ((KIND_THREAD, Args.scale_max_threads),
+                        (KIND_MANAGER, Args.scale_max),
+                        (KIND_MANAGER_WHEEL, Args.scale_max)):
+        Count = Args.scale_start
+        Sustained = 0
+        Rounds = []
+        while Count <= Limit:
+            Timers, Manager = CreateTimers(Kind, Count, 1, Args.scale_interval, lambda: None, Statistics = True)
+            try:
+                CpuStart = CpuTime()
+                sleep(1 + Args.scale_seconds)
+                Cpu = CpuTime() - CpuStart
+                if Manager is not None:
+                    Stats = Manager.GetStats()
+                else:
+                    Stats = PyWT.AggregateStats(Timer.GetStats() for Timer in Timers)
+            finally:
+                DestroyTimers(Timers, Manager)
+
+            Expected = Count * int(Args.scale_seconds / Args.scale_interval)
+            Round = {
+                'Timers'      : Count,
+                'Fired'       : Stats['Fired'],
+                'FiredRatio'  : Stats['Fired'] / Expected if Expected else 0.0,
+                'LatenessP99' : HistogramPercentile(Stats['Lateness'], 0.99),
+                'LatenessMax' : Stats['Lateness']['Max'],
+                'CpuPercent'  : 100.0 * Cpu / (1 + Args.scale_seconds),
+            }
+            Rounds.append(Round)
+            Report("%s timers=%d" % (Kind, Count), Round)
+            if Round['LatenessP99'] > Args.scale_lateness or Round['FiredRatio'] < 0.9:
+                break
+            Sustained = Count
+            Count *= 2
+
+        Results.append({'Kind': Kind, 'Interval': Args.scale_interval,
+                        'LatenessLimit': Args.scale_lateness,
+                        'MaxTimers': Sustained, 'Rounds': Rounds})
+    return Results
+
+def BenchControl(Args):
+    ## Call-to-applied latency of Pause/Resume/ChangeIntervals
+    Results = []
+    for Kind in (KIND_THREAD, KIND_MANAGER):
+        Timers, Manager = CreateTimers(Kind, 1, IDLE_INTERVAL, IDLE_INTERVAL, lambda: None)
+        Timer = Timers[0]
+        Probe = StateProbe()
+        Timer.AddTraceListener(Probe)
+        Latency = {'Pause': [], 'Resume': [], 'ChangeIntervals': []}
+        Steps = (
+            ('Pause', lambda: Timer.Pause(), PyWT.TRACE_STATE, PyWT.TIMER_STATE_SUSPENDED),
+            ('Resume', lambda: Timer.Resume(), PyWT.TRACE_STATE, PyWT.TIMER_STATE_RUNNINGINITIAL),
+            ('ChangeIntervals', lambda: Timer.ChangeIntervals(IDLE_INTERVAL, IDLE_INTERVAL), PyWT.TRACE_MESSAGE, PyWT.MESSAGE_CHANGE),
+        )
+        try:
+            WaitFor(IsRunning(Timers))
+            for Round in range(Args.control_rounds):
+                for Name, Call, TraceEvent, Value in Steps:
+                    Probe.Arm(TraceEvent, Value)
+                    Started = PyWT.Clock()
+                    Call()
+                    if not Probe.Done.wait(STATE_TIMEOUT):
+                        raise RuntimeError("%s: %s was not applied" % (Kind, Name))
+                    Latency[Name].append(Probe.Stamp - Started)
+        finally:
+            DestroyTimers(Timers, Manager)
+
+        Result = {'Kind': Kind}
+        for Name in Latency:
+            Result[Name] = Percentiles(Latency[Name])
+            Report("%s %s" % (Kind, Name), Result[Name])
+        Results.append(Result)
+    return Results
+
+def BenchChurn(Args):
+    ## Create, activate and terminate timers as fast as possible
+    Results = []
+    for Kind, Count in ((KIND_THREAD, Args.churn_threads), (KIND_MANAGER, Args.churn_timers)):
+        Started = PyWT.Clock()
+        Timers, Manager = CreateTimers(Kind, Count, IDLE_INTERVAL, IDLE_INTERVAL, lambda: None)
+        Created = PyWT.Clock()
+        for Timer in Timers:
+            Timer.Terminate(DisableStateCheck = True)
+        if Manager is not None:
+            ## Messages are applied in order: the last one done means all done
+            WaitFor(lambda: Timers[-1].GetState() == PyWT.TIMER_STATE_TERMINATED, STATE_TIMEOUT * 10)
+        else:
+            for Timer in Timers:
+                Timer.join()
+        Finished = PyWT.Clock()
+        if Manager is not None:
+            Manager.Terminate()
+            Manager.join()
+
+        Result = {
+            'Kind'            : Kind,
+            'Timers'          : Count,
+            'CreateSeconds'   : Created - Started,
+            'TotalSeconds'    : Finished - Started,
+            'TimersPerSecond' : Count / (Finished - Started),
+        }
+        Report(Kind, Result)
+        Results.append(Result)
+    return Results
+
+def BenchShard(Args):
+    ## CPU bound function calls per second for 1, 2, 4... worker processes
+    try:
+        import PyWTShard
+    except ImportError:
+        print("  skipped: PyWTShard needs Python 3.3+")
+        return []
+    Results = []
+    Shards = 1
+    while True:
+        Service = PyWTShard.ShardedTimerService(Shards = Shards)
+        Service.start()
+        try:
+            for Index in range(Args.shard_timers):
+                Service.CreateTimer(Index, 1, Args.shard_interval, BurnCpu,
+                                    FunctionArgs = [Args.shard_loops], Statistics = True)
+            ## Counted from the first tick on
+            sleep(1)
+            Before = Service.GetStats(STATE_TIMEOUT)['Fired']
+            sleep(Args.shard_seconds)
+            After = Service.GetStats(STATE_TIMEOUT)
+        finally:
+            Service.Terminate(STATE_TIMEOUT)
+
+        Rate = (After['Fired'] - Before) / Args.shard_seconds
+        Result = {
+            'Kind'           : "shards=%d" % Shards,
+            'Shards'         : Shards,
+            'CallsPerSecond' : Rate,
+            'Speedup'        : Rate / Results[0]['CallsPerSecond'] if Results and Results[0]['CallsPerSecond'] else 1.0,
+            'IpcBatches'     : After['IpcBatches'],
+            'IpcMessages'    : After['IpcMessages'],
+        }
+        Report(Result['Kind'], Result)
+        Results.append(Result)
+        if Shards >= Args.shard_max:
+            break
+        Shards = min(Shards * 2, Args.shard_max)
+    return Results
+
+
+############ Comparison ##############
+def Flatten(Value, Prefix = ''):
+    ## {dotted path: number}. List items are named after their Kind/Precision/Timers
+    Items = {}
+    if isinstance(Value, dict):
+        for Key in Value:
+            Items.update(Flatten(Value[Key], Prefix + '.' + Key if Prefix else Key))
+    elif isinstance(Value, list):
+        for Index, Item in enumerate(Value):
+            Name = str(Index)
+            if isinstance(Item, dict):
+                Name = '/'.join(str(Item[Key]) for Key in ('Kind', 'Precision', 'Timers') if Key in Item) or Name
+            Items.update(Flatten(Item, Prefix + '[' + Name + ']'))
+    elif isinstance(Value, (int, float)) and not isinstance(Value, bool):
+        Items[Prefix] = Value
+    return Items
+
+def Compare(Old, New):
+    OldItems = Flatten(Old['Results'])
+    NewItems = Flatten(New['Results'])
+    for Key in sorted(set(OldItems) & set(NewItems)):
+        Before, After = OldItems[Key], NewItems[Key]
+        if Before == After:
+            continue
+        Change = "%+.1f%%" % (100.0 * (After - Before) / Before) if Before else "new"
+        print("%-70s %14.6g %14.6g %10s" % (Key, Before, After, Change))
+
+
+############ Entry point ##############
+def ParseArguments():
+    Parser = argparse.ArgumentParser(description = "PyWT timer benchmarks")
+    Parser.add_argument('--output', default = 'pywt-bench.json', help = "JSON file for the results")
+    Parser.add_argument('--compare', metavar = 'OLD_FILE', help = "print the changes against an older result file")
+    Parser.add_argument('--only', default = ','.join(BENCHMARKS), help = "comma separated list of " + ', '.join(BENCHMARKS))
+    Parser.add_argument('--quick', action = 'store_true', help = "smaller and shorter runs for a smoke test")
+    Parser.add_argument('--precisions', type = float, nargs = '+', default = [0.001, 0.005, 0.01, 0.05])
+    Parser.add_argument('--jitter-interval', type = float, default = 0.02)
+    Parser.add_argument('--jitter-ticks', type = int, default = 200)
+    Parser.add_argument('--idle-timers', type = int, default = 100)
+    Parser.add_argument('--idle-seconds', type = float, default = 3)
+    Parser.add_argument('--scale-start', type = int, default = 16)
+    Parser.add_argument('--scale-max', type = int, default = 65536)
+    Parser.add_argument('--scale-max-threads', type = int, default = 2048)
+    Parser.add_argument('--scale-interval', type = float, default = 0.1)
+    Parser.add_argument('--scale-seconds', type = float, default = 3)
+    Parser.add_argument('--scale-lateness', type = float, default = 0.01, help = "P99 lateness limit, seconds")
+    Parser.add_argument('--control-rounds', type = int, default = 200)
+    Parser.add_argument('--churn-threads', type = int, default = 1000)
+    Parser.add_argument('--churn-timers', type = int, default = 20000)
+    Parser.add_argument('--shard-max', type = int, default = cpu_count(), help = "largest worker process count")
+    Parser.add_argument('--shard-timers', type = int, default = 64)
+    Parser.add_argument('--shard-interval', type = float, default = 0.01)
+    Parser.add_argument('--shard-loops', type = int, default = 20000, help = "CPU work of one call")
+    Parser.add_argument('--shard-seconds', type = float, default = 3)
+    Args = Parser.parse_args()
+
+    if Args.quick:
+        Args.precisions = [0.001, 0.01]
+        Args.jitter_ticks = 20
+        Args.idle_timers = 20
+        Args.idle_seconds = 1
+        Args.scale_max = 256
+        Args.scale_max_threads = 64
+        Args.scale_seconds = 1
+        Args.control_rounds = 20
+        Args.churn_threads = 100
+        Args.churn_timers = 1000
+        Args.shard_timers = 16
+        Args.shard_seconds = 1
+    return Args
+
+def Main():
+    Args = ParseArguments()
+    Selected = [Name for Name in Args.only.split(',') if Name]
+    for Name in Selected:
+        if Name not in BENCHMARKS:
+            sys.exit("Unknown benchmark: " + Name)
+
+    Output = {
+        'Meta': {
+            'Time'      : strftime("%Y-%m-%dT%H:%M:%SZ", gmtime()),
+            'Python'    : platform.python_version(),
+            'Platform'  : platform.platform(),
+            'Cpus'      : cpu_count(),
+            'Clock'     : getattr(PyWT.Clock, '__name__', repr(PyWT.Clock)),
+            'Arguments' : vars(Args),
+        },
+        'Results': {},
+    }
+
+    Functions = {'jitter': BenchJitter, 'idle': BenchIdle, 'scale': BenchScale,
+                 'control': BenchControl, 'churn': BenchChurn, 'shard': BenchShard}
+    for Name in BENCHMARKS:
+        if Name in Selected:
+            print(Name + ":")
+            Output['Results'][Name] = Functions[Name](Args)
+
+    with open(Args.output, 'w') as File:
+        json.dump(Output, File, indent = 1, sort_keys = True)
+    print("Results are written to " + Args.output)
+
+    if Args.compare:
+        with open(Args.compare) as File:
+            Compare(json.load(File), Output)
+
+if __name__ == '__main__':
+    Main()
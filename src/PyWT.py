@@ -21,9 +21,72 @@
 # FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
 # OTHER DEALINGS IN THE SOFTWARE.
 
-from Queue import Queue
-from threading import Event, Thread
+from __future__ import print_function
+
+from array import array
+from bisect import bisect_left
+from collections import deque
+from functools import partial
+from heapq import heapify, heappush, heappop
+from json import dump
+from mmap import mmap, ACCESS_READ
+from errno import EAGAIN
+from os import getpid, pipe, read, write, close
+from random import random
+try:
+    from Queue import Queue, Empty
+except ImportError:
+    from queue import Queue, Empty
+from select import select
+from struct import Struct
+try:
+    from select import epoll, EPOLLIN
+except ImportError:
+    epoll = None
+from sys import platform
+from threading import Condition, Event, Lock, Thread, current_thread, local
 from time import time, gmtime, strftime
+from zlib import crc32
+try:
+    ## Linux, Python 3.13+
+    from os import timerfd_create, timerfd_settime, TFD_NONBLOCK, TFD_CLOEXEC, TFD_TIMER_ABSTIME
+    from time import CLOCK_MONOTONIC, monotonic
+except ImportError:
+    timerfd_create = None
+
+## What 'from PyWT import *' gives: the constants and the public classes.
+## Helpers (Constraint, AlignSchedule, ...) have to be imported by name
+__all__ = [
+    'Clock', 'Histogram', 'TimerStats', 'AggregateStats', 'DebugPrinter', 'TraceRecorder',
+    'Completion', 'VirtualClock', 'ResultPolicy', 'WaitableTimer', 'HeapTimerStore',
+    'WheelTimerStore', 'TimerControl', 'ManagedTimer', 'TimerManager', 'ScheduledCall',
+    'TimerGroup',
+    'PRECISION_MIN', 'PRECISION_DEFAULT', 'PRECISION_MAX', 'TIMER_INTERVAL_MIN',
+    'TIMER_INTERVAL_MAX', 'TIMER_INTERVAL_INITIAL_MIN', 'TIMER_INTERVAL_INITIAL_MAX',
+    'TIMER_COUNT_MIN', 'TIMER_COUNT_MAX', 'SUSPENDED_DELAY_MIN', 'SUSPENDED_DELAY_MAX',
+    'SLACK_MIN', 'SLACK_MAX', 'CATCHUP_LIMIT_MIN', 'CATCHUP_LIMIT_DEFAULT',
+    'CATCHUP_LIMIT_MAX', 'OVERLAP_LIMIT_MIN', 'OVERLAP_LIMIT_DEFAULT', 'OVERLAP_LIMIT_MAX',
+    'BACKOFF_FACTOR_MIN', 'BACKOFF_FACTOR_DEFAULT', 'BACKOFF_FACTOR_MAX', 'SPREAD_NONE',
+    'SPREAD_MAX', 'JITTER_MIN', 'JITTER_MAX', 'PRIORITY_MIN', 'PRIORITY_MAX',
+    'BUDGET_CALLS_MIN', 'BUDGET_CALLS_MAX', 'BUDGET_TIME_MIN', 'BUDGET_TIME_MAX',
+    'TIMER_QUEUE_SIZE', 'MANAGER_QUEUE_SIZE', 'WHEEL_TICK_DEFAULT', 'WHEEL_SLOTS',
+    'TRACE_BUFFER_SIZE', 'ONESHOT_COMPACT_MIN', 'SNAPSHOT_DELAY_MIN', 'STATS_BUCKETS',
+    'WAKEUP_POLLING', 'WAKEUP_EVENT', 'WAKEUP_SELECTOR', 'SPREAD_INTERVAL', 'PRIORITY_LOW',
+    'PRIORITY_NORMAL', 'PRIORITY_HIGH', 'OVERLOAD_DEFER', 'OVERLOAD_SHED', 'CATCHUP_SKIP',
+    'CATCHUP_ONCE', 'CATCHUP_BURST', 'OVERLAP_ALLOW', 'OVERLAP_SKIP', 'OVERLAP_QUEUE',
+    'STORE_HEAP', 'STORE_WHEEL', 'TIMER_ACTIVATE', 'TIMER_NO_ACTIVATE', 'TIMER_STATE_IDLE',
+    'TIMER_STATE_INIT', 'TIMER_STATE_RUNNINGINITIAL', 'TIMER_STATE_RUNNING',
+    'TIMER_STATE_SUSPENDED', 'TIMER_STATE_TERMINATED', 'STATE_TO_TEXT', 'MESSAGE_INIT',
+    'MESSAGE_ACTIVATE', 'MESSAGE_DEACTIVATE', 'MESSAGE_PAUSE', 'MESSAGE_RESUME',
+    'MESSAGE_CHANGE', 'MESSAGE_TERMINATE', 'MESSAGE_PRECISION', 'MESSAGE_BATCH',
+    'MESSAGE_RESULT', 'MESSAGE_RESTORE', 'MESSAGE_SNAPSHOT', 'MESSAGE_TO_TEXT',
+    'SNAPSHOT_MAGIC', 'SNAPSHOT_VERSION', 'SNAPSHOT_HEADER', 'SNAPSHOT_RECORD',
+    'TRACE_STATE', 'TRACE_MESSAGE', 'TRACE_CALLBACK_START', 'TRACE_CALLBACK_END',
+    'TRACE_NOTICE', 'T_SUCCESS', 'T_ERROR_INCORRECT_STATE', 'T_ERROR_ALREADY_SWITCHED',
+    'T_ERROR_FUNCTION_FAILED', 'T_IS_FUNC_RESULT_TRUE', 'T_IS_FUNC_RESULT_FALSE',
+    'T_IS_FUNC_RESULT_OF_TYPE', 'T_IS_FUNC_RESULT_OF_VALUE', 'T_BEHAV_TIMER_TERMINATED',
+    'T_BEHAV_TIMER_DEACTIVATED', 'T_BEHAV_TIMER_PAUSE', 'T_BEHAV_TIMER_BACKOFF',
+]
 
 ## Limits
 PRECISION_MIN               = 0.001
@@ -37,7 +100,67 @@ TIMER_COUNT_MIN             = 0
 TIMER_COUNT_MAX             = 10000
 SUSPENDED_DELAY_MIN         = 0
 SUSPENDED_DELAY_MAX         = 10000
+SLACK_MIN                   = 0
+SLACK_MAX                   = 60
+CATCHUP_LIMIT_MIN           = 1
+CATCHUP_LIMIT_DEFAULT       = 10
+CATCHUP_LIMIT_MAX           = 10000
+OVERLAP_LIMIT_MIN           = 1
+OVERLAP_LIMIT_DEFAULT       = 1
+OVERLAP_LIMIT_MAX           = 10000
+BACKOFF_FACTOR_MIN          = 1
+BACKOFF_FACTOR_DEFAULT      = 2
+BACKOFF_FACTOR_MAX          = 100
+SPREAD_NONE                 = 0
+SPREAD_MAX                  = 3600
+JITTER_MIN                  = 0
+JITTER_MAX                  = 3600
+PRIORITY_MIN                = 0
+PRIORITY_MAX                = 100
+BUDGET_CALLS_MIN            = 0
+BUDGET_CALLS_MAX            = 1000000
+BUDGET_TIME_MIN             = 0
+BUDGET_TIME_MAX             = 60
 TIMER_QUEUE_SIZE            = 100
+MANAGER_QUEUE_SIZE          = 0
+WHEEL_TICK_DEFAULT          = 0.001
+WHEEL_SLOTS                 = (256, 64, 64, 64)
+STORE_FRONT_SEQUENCE        = -(1 << 62)
+TRACE_BUFFER_SIZE           = 100000
+ONESHOT_COMPACT_MIN         = 64
+SNAPSHOT_DELAY_MIN          = 0.000001
+STATS_BUCKETS               = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+
+## Wakeup modes
+WAKEUP_POLLING              = 0
+WAKEUP_EVENT                = 1
+WAKEUP_SELECTOR             = 2
+
+## Phase spreading: the whole continuous interval
+SPREAD_INTERVAL             = -1
+
+## Timer priorities (TimerManager): due timers run in priority order
+PRIORITY_LOW                = 0
+PRIORITY_NORMAL             = 50
+PRIORITY_HIGH               = 100
+
+## Due ticks over the pass budget (TimerManager)
+OVERLOAD_DEFER              = 0
+OVERLOAD_SHED               = 1
+
+## Missed ticks policies
+CATCHUP_SKIP                = 0
+CATCHUP_ONCE                = 1
+CATCHUP_BURST               = 2
+
+## Overlapping function runs policies (Executor mode)
+OVERLAP_ALLOW               = 0
+OVERLAP_SKIP                = 1
+OVERLAP_QUEUE               = 2
+
+## Timer store backends (TimerManager)
+STORE_HEAP                  = 0
+STORE_WHEEL                 = 1
 
 ## Timer activation options
 TIMER_ACTIVATE              = 1
@@ -70,11 +193,49 @@ MESSAGE_RESUME              = 104
 MESSAGE_CHANGE              = 105
 MESSAGE_TERMINATE           = 106
 MESSAGE_PRECISION           = 107
+MESSAGE_BATCH               = 108
+MESSAGE_RESULT              = 109
+MESSAGE_RESTORE             = 110
+MESSAGE_SNAPSHOT            = 111
+
+## For translate message numerical code
+MESSAGE_TO_TEXT = {
+100 : 'MESSAGE_INIT',
+101 : 'MESSAGE_ACTIVATE',
+102 : 'MESSAGE_DEACTIVATE',
+103 : 'MESSAGE_PAUSE',
+104 : 'MESSAGE_RESUME',
+105 : 'MESSAGE_CHANGE',
+106 : 'MESSAGE_TERMINATE',
+107 : 'MESSAGE_PRECISION',
+108 : 'MESSAGE_BATCH',
+109 : 'MESSAGE_RESULT',
+110 : 'MESSAGE_RESTORE',
+111 : 'MESSAGE_SNAPSHOT',
+}
+
+## Snapshot file: header (magic, version, timer count, wall time of the
+## snapshot) and a record per timer (state, state to resume, priority, 
+## CatchUp, name length, remaining count, initial and continuous interval,
+## seconds to the next deadline, remaining pause delay, slack) followed 
+## by the UTF-8 name. Little endian, no padding
+SNAPSHOT_MAGIC              = b'PYWT'
+SNAPSHOT_VERSION            = 1
+SNAPSHOT_HEADER             = Struct('<4sHId')
+SNAPSHOT_RECORD             = Struct('<BBBBHiddddd')
+
+## Trace events: listeners are called as Listener(Timer, Event, Value, Stamp)
+TRACE_STATE                 = 1
+TRACE_MESSAGE               = 2
+TRACE_CALLBACK_START        = 3
+TRACE_CALLBACK_END          = 4
+TRACE_NOTICE                = 5
 
 ## Error codes
 T_SUCCESS                   = 1000
 T_ERROR_INCORRECT_STATE     = 1001
 T_ERROR_ALREADY_SWITCHED    = 1002
+T_ERROR_FUNCTION_FAILED     = 1003
 
 ## Function result conditions
 T_IS_FUNC_RESULT_TRUE       = 1
@@ -86,9 +247,686 @@ T_IS_FUNC_RESULT_OF_VALUE   = 4
 T_BEHAV_TIMER_TERMINATED    = 1
 T_BEHAV_TIMER_DEACTIVATED   = 2
 T_BEHAV_TIMER_PAUSE         = 3
+T_BEHAV_TIMER_BACKOFF       = 4
+
+
+############ Clock ##############
+def MonotonicClock():
+    ## Python 3.3+
+    try:
+        from time import monotonic
+        return monotonic
+    except ImportError:
+        pass
+    
+    ## Python 2 on Linux: CLOCK_MONOTONIC through libc
+    if platform.startswith('linux'):
+        try:
+            import ctypes
+            
+            class TimeSpec(ctypes.Structure):
+                _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+            
+            ClockGetTime = ctypes.CDLL('libc.so.6', use_errno=True).clock_gettime
+            ClockGetTime.argtypes = [ctypes.c_int, ctypes.POINTER(TimeSpec)]
+            Value = TimeSpec()
+            
+            def monotonic():
+                if ClockGetTime(1, ctypes.byref(Value)) != 0:
+                    raise OSError(ctypes.get_errno(), "clock_gettime(CLOCK_MONOTONIC) failed")
+                return Value.tv_sec + Value.tv_nsec * 1e-9
+            
+            monotonic()
+            return monotonic
+        except (ImportError, OSError, AttributeError):
+            pass
+    
+    ## Wall clock as the last resort
+    return time
+
+## Time source for all the deadlines
+Clock = MonotonicClock()
+
+############ Scheduling ##############
+def AlignSchedule(Start, Interval, Now, Policy, Limit):
+    ## Start is the beginning of the interval which ends with the next deadline.
+    ## Returns the realigned Start, the number of missed ticks to fire at once
+    ## and the number of missed ticks dropped
+    if Interval <= 0 or (Start + Interval) > Now:
+        return Start, 0, 0
+    
+    ## Deadlines which are already in the past
+    Missed = int((Now - Start) // Interval)
+    ## The schedule itself never moves, only whole intervals are skipped
+    Start += Missed * Interval
+    
+    if Policy == CATCHUP_ONCE:
+        Burst = 1
+    elif Policy == CATCHUP_BURST:
+        Burst = min(Missed, Limit)
+    else:
+        Burst = 0
+    return Start, Burst, Missed - Burst
+
+def SpreadFraction(Key):
+    ## Where the timer falls within the spread, [0, 1). The same Key gives
+    ## the same phase in every run and process, no Key a random one
+    if Key is None:
+        return random()
+    if not isinstance(Key, bytes):
+        Key = (Key if isinstance(Key, type(u'')) else str(Key)).encode('utf-8')
+    return (crc32(Key) & 0xffffffff) / 4294967296.0
+
+def SpreadPhase(Spread, Fraction, Interval):
+    ## Offset of the first deadline, the whole schedule is shifted by it
+    if Spread == SPREAD_INTERVAL:
+        Spread = Interval
+    return Spread * Fraction
+
+def TickJitter(Jitter, Interval):
+    ## Delay of one tick behind its deadline. Deadlines stay on the grid,
+    ## so the jitter never adds up and the long-run rate is exact. Less 
+    ## than the interval, so the ticks keep their order
+    if not Jitter or not Interval:
+        return 0
+    return random() * min(Jitter, Interval)
+
+############ Decorators ##############
+def Constraint(Minimum, Maximum):
+    ## Dynamically creating a decorator 
+    def Decorator(Function):
+        ## Function to call
+        def WrapFunction(self, Value):
+            Value = Minimum if Value < Minimum else Maximum if Value > Maximum else Value
+            ## Function invocation
+            Function(self, Value)
+        return WrapFunction
+    return Decorator
+
+
+class Histogram(object):
+    ## Fixed buckets: Counts[i] holds values up to Bounds[i], the last one the rest
+    
+    def __init__(self, Bounds = STATS_BUCKETS):
+        self.Bounds = Bounds
+        self.Counts = [0] * (len(Bounds) + 1)
+        self.Count = 0
+        self.Total = 0.0
+        self.Max = 0.0
+    
+    def Add(self, Value):
+        self.Counts[bisect_left(self.Bounds, Value)] += 1
+        self.Count += 1
+        self.Total += Value
+        if Value > self.Max:
+            self.Max = Value
+    
+    def Snapshot(self):
+        return {
+            'Count'  : self.Count,
+            'Total'  : self.Total,
+            'Mean'   : self.Total / self.Count if self.Count else 0.0,
+            'Max'    : self.Max,
+            'Bounds' : list(self.Bounds),
+            'Counts' : list(self.Counts),
+        }
+
+
+class TimerStats(object):
+    ## Counters of one timer. Updated by the thread driving the timer only
+    
+    def __init__(self):
+        ## Ticks the function was run (or submitted) for
+        self.Fired = 0
+        ## Ticks dropped by the CatchUp or Overlap policy
+        self.Skipped = 0
+        ## Ticks over the manager pass budget: dropped or run in a later pass
+        self.Shed = 0
+        self.Deferred = 0
+        ## Actual minus scheduled fire time
+        self.Lateness = Histogram()
+        ## Function run time (submit to completion with an Executor)
+        self.Duration = Histogram()
+        ## Time control messages spent in the queue
+        self.QueueWait = Histogram()
+        ## Messages found in the queue at the last/worst wakeup
+        self.QueueDepth = 0
+        self.QueueDepthMax = 0
+    
+    def AddQueueDepth(self, Depth):
+        self.QueueDepth = Depth
+        if Depth > self.QueueDepthMax:
+            self.QueueDepthMax = Depth
+    
+    def Snapshot(self):
+        return {
+            'Timers'        : 1,
+            'Fired'         : self.Fired,
+            'Skipped'       : self.Skipped,
+            'Shed'          : self.Shed,
+            'Deferred'      : self.Deferred,
+            'Lateness'      : self.Lateness.Snapshot(),
+            'Duration'      : self.Duration.Snapshot(),
+            'QueueWait'     : self.QueueWait.Snapshot(),
+            'QueueDepth'    : self.QueueDepth,
+            'QueueDepthMax' : self.QueueDepthMax,
+        }
+
+
+def AggregateStats(Snapshots):
+    ## Sums GetStats() snapshots of any number of timers into one
+    Result = TimerStats().Snapshot()
+    Result['Timers'] = 0
+    for Snapshot in Snapshots:
+        if Snapshot is None:
+            continue
+        for Key in ('Timers', 'Fired', 'Skipped', 'Shed', 'Deferred', 'QueueDepth'):
+            Result[Key] += Snapshot[Key]
+        Result['QueueDepthMax'] = max(Result['QueueDepthMax'], Snapshot['QueueDepthMax'])
+        for Key in ('Lateness', 'Duration', 'QueueWait'):
+            Total, Part = Result[Key], Snapshot[Key]
+            Total['Count'] += Part['Count']
+            Total['Total'] += Part['Total']
+            Total['Max'] = max(Total['Max'], Part['Max'])
+            Total['Counts'] = [A + B for A, B in zip(Total['Counts'], Part['Counts'])]
+    for Key in ('Lateness', 'Duration', 'QueueWait'):
+        Total = Result[Key]
+        Total['Mean'] = Total['Total'] / Total['Count'] if Total['Count'] else 0.0
+    return Result
+
+
+class DebugPrinter(object):
+    ## Trace listener printing the events the way DEBUG/PROFILE did
+    
+    def __init__(self, PROFILE = False):
+        self.__PROFILE = PROFILE
+    
+    def __call__(self, Timer, Event, Value, Stamp):
+        if Event == TRACE_STATE:
+            Message = "Changing the state to " + STATE_TO_TEXT[Value]
+        elif Event == TRACE_MESSAGE:
+            Message = ">> Received " + MESSAGE_TO_TEXT.get(Value, repr(Value))
+        elif Event == TRACE_CALLBACK_START:
+            Message = "Invoking a FUNCTION"
+        elif Event == TRACE_CALLBACK_END:
+            Message = "FUNCTION is over"
+        else:
+            Message = Value
+        
+        if self.__PROFILE: 
+            Message = strftime("[%H:%M:%S.", gmtime()) + (("%.3f" % time()).split("."))[1] + "]\t" + Message
+        print(Message)
+
+
+class TraceRecorder(object):
+    ## Trace listener keeping the last Size events in memory, no I/O on
+    ## the timer thread. Attach one recorder to as many timers as needed
+    
+    def __init__(self, Size = TRACE_BUFFER_SIZE):
+        self.__Events = deque(maxlen=Size)
+    
+    def __call__(self, Timer, Event, Value, Stamp):
+        self.__Events.append((Stamp, current_thread().ident, Timer.GetName(), Event, Value))
+    
+    def GetEvents(self):
+        ## (Stamp, ThreadId, TimerName, Event, Value) tuples, oldest first
+        return list(self.__Events)
+    
+    def Clear(self):
+        self.__Events.clear()
+    
+    def GetChromeTrace(self):
+        ## Trace Event Format, loadable by chrome://tracing and Perfetto
+        Events = []
+        Process = getpid()
+        for Stamp, Thread, Name, Event, Value in list(self.__Events):
+            Record = {'pid': Process, 'tid': Thread, 'ts': Stamp * 1e6, 'args': {'timer': Name}}
+            if Event == TRACE_CALLBACK_START or Event == TRACE_CALLBACK_END:
+                ## Async pair: with an Executor the run ends on another thread
+                Record.update({'name': 'FunctionProc', 'cat': 'callback', 'id': Name,
+                               'ph': 'b' if Event == TRACE_CALLBACK_START else 'e'})
+            else:
+                if Event == TRACE_STATE:
+                    Record.update({'name': STATE_TO_TEXT[Value], 'cat': 'state'})
+                elif Event == TRACE_MESSAGE:
+                    Record.update({'name': MESSAGE_TO_TEXT.get(Value, repr(Value)), 'cat': 'message'})
+                else:
+                    Record.update({'name': Value, 'cat': 'notice'})
+                Record.update({'ph': 'i', 's': 't'})
+            Events.append(Record)
+        return {'traceEvents': Events, 'displayTimeUnit': 'ms'}
+    
+    def DumpChromeTrace(self, FileName):
+        with open(FileName, 'w') as File:
+            dump(self.GetChromeTrace(), File)
+
+
+class Completion(object):
+    ## Returned by the control functions instead of True. Done once the 
+    ## timer thread has applied the message (or the timer is terminated),
+    ## so there is no need to poll GetState(). Truthy like True
+    
+    def __init__(self):
+        self.__Done = Event()
+    
+    def __bool__(self):
+        return True
+    __nonzero__ = __bool__
+    
+    def Wait(self, Timeout = None):
+        ## False on timeout
+        return self.__Done.wait(Timeout)
+    
+    def IsDone(self):
+        return self.__Done.is_set()
+    
+    def _Resolve(self):
+        self.__Done.set()
+
+
+class VirtualClock(object):
+    ## Time source of a simulation: stands still till it's moved. Pass it
+    ## as TimerManager(TimeSource=...) and move it with Simulate(Until),
+    ## which fires everything due on the way
+    
+    def __init__(self, Start = 0.0):
+        self.__Now = float(Start)
+    
+    def __call__(self):
+        return self.__Now
+    
+    def Set(self, Now):
+        ## Time never goes back
+        if Now > self.__Now:
+            self.__Now = Now
+    
+    def Advance(self, Seconds):
+        self.Set(self.__Now + Seconds)
+
+
+class ResultPolicy(object):
+    ## What a timer does when the FunctionProc result meets the condition.
+    ## T_BEHAV_TIMER_BACKOFF multiplies the interval by BackoffFactor on
+    ## every matching result (up to BackoffMax) and resets it on the others
+    
+    def __init__(self, 
+                 Condition, Value = None, 
+                 Behaviour = T_BEHAV_TIMER_TERMINATED,
+                 BackoffFactor = BACKOFF_FACTOR_DEFAULT,
+                 BackoffMax = TIMER_INTERVAL_MAX
+                 ):
+        self.__Condition = Condition
+        ## Type for T_IS_FUNC_RESULT_OF_TYPE, value for T_IS_FUNC_RESULT_OF_VALUE
+        self.__Value = Value
+        self.__Behaviour = Behaviour
+        self.SetBackoffFactor(BackoffFactor)
+        self.__BackoffMax = BackoffMax
+        ## Current interval multiplier
+        self.__Scale = 1
+    
+    def Match(self, Result):
+        if self.__Condition == T_IS_FUNC_RESULT_TRUE:
+            return bool(Result)
+        elif self.__Condition == T_IS_FUNC_RESULT_FALSE:
+            return not Result
+        elif self.__Condition == T_IS_FUNC_RESULT_OF_TYPE:
+            return isinstance(Result, self.__Value)
+        elif self.__Condition == T_IS_FUNC_RESULT_OF_VALUE:
+            return Result == self.__Value
+        return False
+    
+    def Apply(self, Result, Interval):
+        ## Returns the behaviour the timer has to perform, None otherwise
+        Matched = self.Match(Result)
+        if self.__Behaviour == T_BEHAV_TIMER_BACKOFF:
+            if not Matched:
+                self.__Scale = 1
+            elif Interval > 0:
+                self.__Scale = min(self.__Scale * self.__BackoffFactor, max(self.__BackoffMax / float(Interval), 1))
+            return None
+        return self.__Behaviour if Matched else None
+    
+    def Interval(self, Interval):
+        ## Interval with the backoff applied
+        return Interval * self.__Scale
+    
+    def Reset(self):
+        self.__Scale = 1
+    
+    ########### Validators ################
+    @Constraint(BACKOFF_FACTOR_MIN, BACKOFF_FACTOR_MAX)
+    def SetBackoffFactor(self, Value):
+        self.__BackoffFactor = Value
+
+
+class FunctionInvoker(object):
+    
+    def __init__(self,
+                 FunctionProc, FunctionArgs, FunctionKWArgs,
+                 Executor = None,
+                 Overlap = OVERLAP_ALLOW,
+                 OverlapLimit = OVERLAP_LIMIT_DEFAULT,
+                 OnComplete = None,
+                 Stats = None,
+                 Tracers = None,
+                 Trace = None,
+                 OnResult = None
+                 ):
+        
+        # Received parameters 
+        self.__FunctionProc = FunctionProc
+        self.__FunctionArgs = FunctionArgs
+        self.__FunctionKWArgs = FunctionKWArgs
+        ## Anything with concurrent.futures.Executor.submit(), e.g.
+        ## ThreadPoolExecutor or ProcessPoolExecutor. None: run inline
+        self.__Executor = Executor
+        self.__Overlap = Overlap
+        self.SetOverlapLimit(OverlapLimit)
+        ## Called with the Future of every finished run
+        self.__OnComplete = OnComplete
+        ## TimerStats of the owner timer, None if disabled
+        self.__Stats = Stats
+        ## Trace listeners list of the owner timer and its trace function
+        self.__Tracers = Tracers if Tracers is not None else []
+        self.__Trace = Trace
+        ## Called with the FunctionProc result: inline in the timer thread,
+        ## in the executor thread otherwise
+        self.__OnResult = OnResult
+        
+        # Inner variables (guarded by the lock: runs finish in executor threads)
+        self.__Lock = Lock()
+        self.__Running = 0
+        ## Runs waiting for the previous one (OVERLAP_QUEUE)
+        self.__Backlog = 0
+        self.__LastFuture = None
+    
+    def Invoke(self):
+        ## Returns False if the run was skipped due to the overlap policy
+        if self.__Executor is None:
+            if self.__Stats is None and not self.__Tracers:
+                Result = self.__FunctionProc(*self.__FunctionArgs, **self.__FunctionKWArgs)
+                if self.__OnResult is not None:
+                    self.__OnResult(Result)
+                return True
+            
+            if self.__Stats is not None:
+                self.__Stats.Fired += 1
+            if self.__Tracers:
+                self.__Trace(TRACE_CALLBACK_START, None)
+            Started = Clock()
+            try:
+                Result = self.__FunctionProc(*self.__FunctionArgs, **self.__FunctionKWArgs)
+            finally:
+                if self.__Stats is not None:
+                    self.__Stats.Duration.Add(Clock() - Started)
+                if self.__Tracers:
+                    self.__Trace(TRACE_CALLBACK_END, None)
+            if self.__OnResult is not None:
+                self.__OnResult(Result)
+            return True
+        
+        with self.__Lock:
+            if self.__Running and (self.__Overlap == OVERLAP_SKIP or
+                                   (self.__Overlap == OVERLAP_QUEUE and self.__Backlog >= self.__OverlapLimit)):
+                if self.__Stats is not None:
+                    self.__Stats.Skipped += 1
+                return False
+            
+            if self.__Stats is not None:
+                self.__Stats.Fired += 1
+            
+            if self.__Running and self.__Overlap == OVERLAP_QUEUE:
+                self.__Backlog += 1
+                return True
+            
+            self.__Running += 1
+        
+        self.__Submit()
+        return True
+    
+    def __Submit(self):
+        if self.__Tracers:
+            self.__Trace(TRACE_CALLBACK_START, None)
+        Future = self.__Executor.submit(self.__FunctionProc, *self.__FunctionArgs, **self.__FunctionKWArgs)
+        self.__LastFuture = Future
+        Future.add_done_callback(partial(self.__Complete, Clock()))
+    
+    def __Complete(self, Started, Future):
+        with self.__Lock:
+            if self.__Stats is not None:
+                self.__Stats.Duration.Add(Clock() - Started)
+            Next = self.__Backlog > 0
+            if Next:
+                self.__Backlog -= 1
+            else:
+                self.__Running -= 1
+        
+        if self.__Tracers:
+            self.__Trace(TRACE_CALLBACK_END, None)
+        if self.__OnResult is not None and not Future.cancelled() and Future.exception() is None:
+            self.__OnResult(Future.result())
+        if self.__OnComplete is not None:
+            self.__OnComplete(Future)
+        
+        ## Queued run starts only when the previous one is over
+        if Next:
+            self.__Submit()
+    
+    ########### Validators ################
+    @Constraint(OVERLAP_LIMIT_MIN, OVERLAP_LIMIT_MAX)
+    def SetOverlapLimit(self, Value):
+        self.__OverlapLimit = Value
+    
+    ########## Getter/Setter functions #########
+    def GetLastFuture(self):
+        return self.__LastFuture
+    
+    def GetRunning(self):
+        return self.__Running
+
+
+class TimerControl(object):
+    ## Control functions shared by WaitableTimer, ManagedTimer and 
+    ## AsyncWaitableTimer (PyWTAsync): state checks, error codes, trace
+    ## listeners and the parameter validators. The timer owns its state
+    ## (GetState()) and delivers the messages: _Deliver(Message, Done) 
+    ## passes Message on and resolves Done once it is applied. Control 
+    ## functions return Done, False if the call is refused
+    
+    def __init__(self, Tracers, TimeSource):
+        ## Tracers: trace listener list of the timer, kept in place.
+        ## TimeSource: clock of the trace event stamps
+        self.__Tracers = Tracers
+        self.__TimeSource = TimeSource
+        
+        # Inner variables
+        self.__SuspendedDelay = 0
+        self.__Error = T_SUCCESS 
+    
+    ########## Timer side ###########
+    def _SetError(self, Error):
+        self.__Error = Error
+    
+    def _CountDown(self):
+        ## One call less, returns the calls left
+        self.__TimerCount -= 1
+        return self.__TimerCount
+    
+    def _Trace(self, Event, Value):
+        Stamp = self.__TimeSource()
+        for Listener in self.__Tracers:
+            Listener(self, Event, Value, Stamp)
+    
+    def __Notice(self, Message):
+        if self.__Tracers:
+            self._Trace(TRACE_NOTICE, Message)
+    
+    ############ Decorators ##############
+    def CheckTerminatedState(Function):
+        def WrapFunction(self, *args, **kwargs):
+            if self.GetState() == TIMER_STATE_TERMINATED:
+                self.__Notice("Timer is in TERMINATED state. All invocations are prohibited")
+                self.__Error = T_ERROR_INCORRECT_STATE
+                return False
+            else:
+                return Function(self, *args, **kwargs)
+        return WrapFunction
+    
+    ########### Validators ################
+    @Constraint(TIMER_INTERVAL_INITIAL_MIN, TIMER_INTERVAL_INITIAL_MAX)
+    def SetInitialInterval(self, Value):
+        self.__TimerInitialInterval = Value
+    
+    @Constraint(TIMER_INTERVAL_MIN, TIMER_INTERVAL_MAX)
+    def SetInterval(self, Value):
+        self.__TimerInterval = Value
+    
+    @Constraint(TIMER_COUNT_MIN, TIMER_COUNT_MAX)
+    def SetCount(self, Value):
+        self.__TimerCount = Value
+            
+    @Constraint(SUSPENDED_DELAY_MIN, SUSPENDED_DELAY_MAX)
+    def SetDelay(self, Value):
+        self.__SuspendedDelay = Value
+    
+    @Constraint(CATCHUP_LIMIT_MIN, CATCHUP_LIMIT_MAX)
+    def SetCatchUpLimit(self, Value):
+        self.__CatchUpLimit = Value
+    
+    ########## Getter/Setter functions #########
+    def GetInitialInterval(self):
+        return self.__TimerInitialInterval
+    
+    def GetInterval(self):
+        return self.__TimerInterval
+    
+    def GetCount(self):
+        return self.__TimerCount
+    
+    def GetDelay(self):
+        return self.__SuspendedDelay
+    
+    def GetCatchUpLimit(self):
+        return self.__CatchUpLimit
+    
+    def GetError(self):
+        return self.__Error
+    
+    ########### Tracing ##########
+    def AddTraceListener(self, Listener):
+        self.__Tracers.append(Listener)
+    
+    def RemoveTraceListener(self, Listener):
+        self.__Tracers.remove(Listener)
+    
+    ########### Output Debug information ##########
+    def __OutputErrorState(self, RequiredTimerState = [], Invert=False):
+        PrintString = "Error: wrong state: should be "
+        CondCount = len(RequiredTimerState)
+        if not Invert:
+            for index, nextstate in enumerate(RequiredTimerState):
+                PrintString += STATE_TO_TEXT[nextstate]
+                if index != (CondCount - 1): PrintString += " or "
+            PrintString += " instead of "
+            PrintString += STATE_TO_TEXT[self.GetState()]
+        else:
+            PrintString += "anything except of "
+            PrintString += STATE_TO_TEXT[RequiredTimerState[0]]
+        return PrintString
+    
+    ########### Message sending ##########
+    def _Send(self, Caller, Message):
+        Done = Completion()
+        self._Deliver(Message, Done)
+        self.__Notice(Caller + "(): Notice: message is sent")
+        self.__Error = T_SUCCESS
+        return Done
+    
+    def _Refuse(self, Caller, Output, Error = T_ERROR_INCORRECT_STATE, Invert = False):
+        ## Output is a text or the list of the required states
+        if self.__Tracers:
+            if isinstance(Output, list):
+                Output = self.__OutputErrorState(Output, Invert)
+            self._Trace(TRACE_NOTICE, Caller + "(): " + Output)
+        self.__Error = Error
+        return False
+    
+    ########## Behaviour functions ###########
+    def ChangeIntervals(self, Initial, Interval):
+        self.__Notice("ChangeIntervals(): In function")
+        
+        if self.GetState() != TIMER_STATE_TERMINATED:
+            return self._Send("ChangeIntervals", (MESSAGE_CHANGE, Initial, Interval))
+        else:
+            return self._Refuse("ChangeIntervals", [TIMER_STATE_TERMINATED], Invert = True)
+    
+    ########## Action functions ##############
+    @CheckTerminatedState
+    def Activate(self, DisableStateCheck = False):
+        self.__Notice("Activate(): In function")
+        
+        if DisableStateCheck:
+            return self._Send("Activate", (MESSAGE_ACTIVATE, 0, 0))
+        elif (self.GetState() == TIMER_STATE_RUNNING) or (self.GetState() == TIMER_STATE_RUNNINGINITIAL):
+            return self._Refuse("Activate", "Warning: already in RUNNING mode", T_ERROR_ALREADY_SWITCHED)
+        elif (self.GetState() == TIMER_STATE_INIT) or (self.GetState() == TIMER_STATE_IDLE):
+            return self._Send("Activate", (MESSAGE_ACTIVATE, 0, 0))
+        else:
+            return self._Refuse("Activate", [TIMER_STATE_INIT, TIMER_STATE_IDLE])
+    
+    @CheckTerminatedState
+    def Pause(self, Wait=0, DisableStateCheck = False):
+        self.__Notice("Pause(): In function")
+        
+        if DisableStateCheck:
+            return self._Send("Pause", (MESSAGE_PAUSE, Wait, 0))
+        elif self.GetState() == TIMER_STATE_SUSPENDED:
+            return self._Refuse("Pause", "Warning: already in SUSPENDED mode", T_ERROR_ALREADY_SWITCHED)
+        elif (self.GetState() == TIMER_STATE_RUNNINGINITIAL) or (self.GetState() == TIMER_STATE_RUNNING):
+            return self._Send("Pause", (MESSAGE_PAUSE, Wait, 0))
+        else:
+            return self._Refuse("Pause", [TIMER_STATE_RUNNINGINITIAL, TIMER_STATE_RUNNING])
+    
+    @CheckTerminatedState
+    def Resume(self, DisableStateCheck = False):
+        self.__Notice("Resume(): In function")
+        
+        if DisableStateCheck:
+            return self._Send("Resume", (MESSAGE_RESUME, 0, 0))
+        elif (self.GetState() == TIMER_STATE_RUNNINGINITIAL) or (self.GetState() == TIMER_STATE_RUNNING):
+            return self._Refuse("Resume", "Warning: already in RUNNING mode", T_ERROR_ALREADY_SWITCHED)
+        elif self.GetState() == TIMER_STATE_SUSPENDED:
+            return self._Send("Resume", (MESSAGE_RESUME, 0, 0))
+        else:
+            return self._Refuse("Resume", [TIMER_STATE_SUSPENDED])
+    
+    @CheckTerminatedState
+    def Deactivate(self, DisableStateCheck = False):
+        self.__Notice("Deactivate(): In function")
+        
+        if DisableStateCheck:
+            return self._Send("Deactivate", (MESSAGE_DEACTIVATE, 0, 0))
+        elif self.GetState() == TIMER_STATE_INIT:
+            return self._Refuse("Deactivate", "Warning: already in INIT mode", T_ERROR_ALREADY_SWITCHED)
+        elif (self.GetState() == TIMER_STATE_SUSPENDED) or (self.GetState() == TIMER_STATE_RUNNING) or (self.GetState() == TIMER_STATE_RUNNINGINITIAL):
+            return self._Send("Deactivate", (MESSAGE_DEACTIVATE, 0, 0))
+        else:
+            return self._Refuse("Deactivate", [TIMER_STATE_SUSPENDED, TIMER_STATE_RUNNING, TIMER_STATE_RUNNINGINITIAL])
+    
+    @CheckTerminatedState
+    def Terminate(self, DisableStateCheck = False):
+        self.__Notice("Terminate(): In function")
+        
+        ## Don't merge with next condition due to clarity
+        if DisableStateCheck:
+            return self._Send("Terminate", (MESSAGE_TERMINATE, 0, 0))
+        elif self.GetState() != TIMER_STATE_IDLE:
+            return self._Send("Terminate", (MESSAGE_TERMINATE, 0, 0))
+        else:
+            return self._Refuse(">> Terminate", [TIMER_STATE_IDLE], Invert = True)
 
 
-class WaitableTimer(Thread):
+class WaitableTimer(Thread, TimerControl):
     
     def __init__(self, 
                  TimerInitialInterval, TimerContinuousInterval,
@@ -98,31 +936,65 @@ class WaitableTimer(Thread):
                  Precision = PRECISION_DEFAULT,
                  DEBUG = False,
                  PROFILE = False,
-                 FunctionArgs = [], FunctionKWArgs = {}
+                 FunctionArgs = [], FunctionKWArgs = {},
+                 WakeupMode = WAKEUP_EVENT,
+                 CatchUp = CATCHUP_SKIP,
+                 CatchUpLimit = CATCHUP_LIMIT_DEFAULT,
+                 Executor = None,
+                 Overlap = OVERLAP_ALLOW,
+                 OverlapLimit = OVERLAP_LIMIT_DEFAULT,
+                 OnComplete = None,
+                 Statistics = False,
+                 ResultCondition = None,
+                 ResultValue = None,
+                 ResultBehaviour = T_BEHAV_TIMER_TERMINATED,
+                 BackoffFactor = BACKOFF_FACTOR_DEFAULT,
+                 BackoffMax = TIMER_INTERVAL_MAX,
+                 Spread = SPREAD_NONE,
+                 SpreadKey = None,
+                 Jitter = JITTER_MIN
                  ):
         
         ## Had to be the first
         Thread.__init__(self)
+        ## Trace listeners, DEBUG is served by one of them
+        self.__Tracers = [DebugPrinter(PROFILE)] if DEBUG else []
+        TimerControl.__init__(self, self.__Tracers, Clock)
         
         # Received parameters 
         self.SetPrecision(Precision)
+        self.__WakeupMode = WakeupMode
+        self.__CatchUp = CatchUp
+        self.SetCatchUpLimit(CatchUpLimit)
         self.SetInitialInterval(TimerInitialInterval)
         self.SetInterval(TimerContinuousInterval)
         self.SetCount(TimerCount)
+        ## Load spreading related: phase of the first deadline and tick jitter
+        self.__Spread = Spread if Spread == SPREAD_INTERVAL else min(max(Spread, SPREAD_NONE), SPREAD_MAX)
+        self.__SpreadFraction = SpreadFraction(SpreadKey) if self.__Spread else 0
+        self.SetJitter(Jitter)
+        ## Statistics related
+        self.__Stats = TimerStats() if Statistics else None
+        ## Result related: None unless ResultCondition is given
+        self.__Policy = None
+        OnResult = None
+        ## Executor results: not the bounded message queue, a result must
+        ## never be dropped (or block an Executor thread) under load
+        self.__Results = deque()
+        if ResultCondition is not None:
+            self.__Policy = ResultPolicy(ResultCondition, ResultValue, ResultBehaviour, BackoffFactor, BackoffMax)
+            OnResult = self.__ApplyResult if Executor is None else self.__PostResult
         ## Function related
-        self.__FunctionProc = FunctionProc
-        self.__FunctionArgs = FunctionArgs
-        self.__FunctionKWArgs = FunctionKWArgs
-        ## Debug related
-        self.__DEBUG = DEBUG 
-        self.__PROFILE = PROFILE
+        self.__Invoker = FunctionInvoker(FunctionProc, FunctionArgs, FunctionKWArgs,
+                                         Executor, Overlap, OverlapLimit, OnComplete,
+                                         self.__Stats, self.__Tracers, self._Trace, OnResult)
         
         ## Flags
-        if self.__TimerInterval == 0 or self.__TimerCount == 1:
+        if self.GetInterval() == 0 or self.GetCount() == 1:
             self.__IsOneTimeShotTimer = True
         else:
             self.__IsOneTimeShotTimer = False
-        self.__IsRepeatableTimer = True if self.__TimerCount > 1 else False
+        self.__IsRepeatableTimer = True if self.GetCount() > 1 else False
         
         # Check flags validity
         ## Both types simultaneously is not allowed
@@ -130,9 +1002,10 @@ class WaitableTimer(Thread):
             self.__IsRepeatableTimer = False
         
         # Inner variables
-        self.__SuspendedDelay = 0
         self.__State = TIMER_STATE_IDLE
-        self.__Error = T_SUCCESS 
+        ## Notified on state changes while WaitForState() callers wait
+        self.__StateChanged = Condition()
+        self.__Waiting = 0
         
         # Events
         self.__ePauseResume = Event()
@@ -140,16 +1013,18 @@ class WaitableTimer(Thread):
         self.__eDeactivate = Event()
         self.__eInit = Event()
         self.__eTerminate = Event()
+        ## Set on every sent message (WAKEUP_EVENT mode)
+        self.__eWakeup = Event()
         
         # Queue init
         self.__MsgQueue = Queue(TIMER_QUEUE_SIZE)
         
         # Move to first working state
-        self.__MsgQueue.put_nowait((MESSAGE_INIT, 0, 0))
+        self.__Post((MESSAGE_INIT, 0, 0))
         
         # Or even further
         if StartCondition == TIMER_ACTIVATE:
-            self.__MsgQueue.put_nowait((MESSAGE_ACTIVATE, 0, 0))
+            self.__Post((MESSAGE_ACTIVATE, 0, 0))
     
     def run(self):        
         
@@ -158,8 +1033,16 @@ class WaitableTimer(Thread):
         SavedTime = 0
         
         ## Working variables
+        ## InitialTime is the scheduled (not the actual) start of the current
+        ## interval, so neither function run time nor lateness cause a drift
         InitialTime = 0
         TimeoutMark = 0
+        ## Jitter of the current tick, on top of TimeoutMark
+        Offset = 0
+        ## Missed ticks to replay right away (CATCHUP_ONCE/CATCHUP_BURST)
+        Burst = 0
+        ## Completions of the received messages, done before the next sleep
+        Pending = []
                 
         ## Main cycle
         while not self.__eTerminate.is_set():
@@ -167,408 +1050,2157 @@ class WaitableTimer(Thread):
             ##################################
             ##### Message Processing Loop ####
             ##################################
+            if self.__Stats is not None and not self.__MsgQueue.empty():
+                self.__Stats.AddQueueDepth(self.__MsgQueue.qsize())
+            
             while not self.__MsgQueue.empty():
-                message = self.__MsgQueue.get_nowait()
+                message, SentAt, Done = self.__MsgQueue.get_nowait()
+                if Done is not None:
+                    Pending.append(Done)
+                if self.__Stats is not None:
+                    self.__Stats.QueueWait.Add(Clock() - SentAt)
+                if self.__Tracers:
+                    self._Trace(TRACE_MESSAGE, message[0])
                 
                 ## MESSAGE_INIT
                 if message[0] == MESSAGE_INIT:
-                    self.__DebugPrint(">> Received MESSAGE_INIT")
                     self.__eInit.set()                    
                 
                 ## MESSAGE_CHANGE
                 elif message[0] == MESSAGE_CHANGE:
-                    self.__DebugPrint(">> Received MESSAGE_CHANGE")
                     self.SetInitialInterval(message[1])
                     self.SetInterval(message[2])
                     
                     if self.__State == TIMER_STATE_RUNNINGINITIAL:
-                        TimeoutMark += self.__TimerInitialInterval - TimeoutMark
+                        TimeoutMark += self.__InitialDelay() - TimeoutMark
                     elif self.__State == TIMER_STATE_RUNNING:
-                        TimeoutMark += self.__TimerInterval - TimeoutMark
+                        TimeoutMark += self.__NextInterval() - TimeoutMark
                 
                 ## MESSAGE_PRECISION
                 elif message[0] == MESSAGE_PRECISION:
-                    self.__DebugPrint(">> Received MESSAGE_PRECISION")
                     self.SetPrecision(message[1])
                 
                 ## MESSAGE_ACTIVATE
                 elif message[0] == MESSAGE_ACTIVATE:
-                    self.__DebugPrint(">> Received MESSAGE_ACTIVATE")
                     self.__eActivate.set()
                     
                 ## MESSAGE_DEACTIVATE
                 elif message[0] == MESSAGE_DEACTIVATE:
-                    self.__DebugPrint(">> Received MESSAGE_DEACTIVATE")
                     self.__eDeactivate.set()
                     
                 ## MESSAGE_PAUSE
                 elif message[0] == MESSAGE_PAUSE:
-                    self.__DebugPrint(">> Received MESSAGE_PAUSE")
                     self.__ePauseResume.set()
                     self.SetDelay(message[1])
                     
                 ## MESSAGE_RESUME
                 elif message[0] == MESSAGE_RESUME:
-                    self.__DebugPrint(">> Received MESSAGE_RESUME")
                     self.__ePauseResume.set()
-                    self.__SuspendedDelay = 0
+                    self.SetDelay(0)
                 
                 ## MESSAGE_TERMINATE
                 elif message[0] == MESSAGE_TERMINATE:
-                    self.__DebugPrint(">> Received MESSAGE_TERMINATE")
                     self.__eTerminate.set()
             
+            ## Function results of the Executor runs
+            while self.__Results:
+                self.__ApplyResult(self.__Results.popleft())
+            
             ##################################
             ##### State Processing Loop ######
             ##################################
             
             ## TIMER_STATE_IDLE 
             if self.__State == TIMER_STATE_IDLE:
-                self.__DebugPrint("Current State: TIMER_STATE_IDLE")
                 if self.__eInit.is_set():
-                    self.__DebugPrint("Changing the state to TIMER_STATE_INIT")
-                    self.__State = TIMER_STATE_INIT
+                    self.__SetState(TIMER_STATE_INIT)
                     self.__eInit.clear()
                     continue
             
             ## TIMER_STATE_INIT
             elif self.__State == TIMER_STATE_INIT:
-                self.__DebugPrint("Current State: TIMER_STATE_INIT")
                 
                 if self.__eActivate.is_set():
-                    self.__DebugPrint("Changing the state to TIMER_STATE_RUNNINGINITIAL")
-                    self.__State = TIMER_STATE_RUNNINGINITIAL
+                    self.__SetState(TIMER_STATE_RUNNINGINITIAL)
                     self.__eActivate.clear()
-                    TimeoutMark = self.__TimerInitialInterval
-                    InitialTime = time()
+                    TimeoutMark = self.__InitialDelay()
+                    Offset = TickJitter(self.__Jitter, self.GetInterval())
+                    InitialTime = Clock()
                     continue
             
             ## TIMER_STATE_SUSPENDED
             elif self.__State == TIMER_STATE_SUSPENDED:
-                self.__DebugPrint("Current State: TIMER_STATE_SUSPENDED")
                 if self.__eTerminate.is_set():
-                    self.__DebugPrint("Terminating a timer")
                     continue
                 
                 if self.__eDeactivate.is_set():
-                    self.__DebugPrint("Changing the state to TIMER_STATE_INIT")
                     self.__eDeactivate.clear()
-                    self.__State = TIMER_STATE_INIT
+                    self.__SetState(TIMER_STATE_INIT)
+                    Burst = 0
                     continue
                 
                 if self.__ePauseResume.is_set():
-                    self.__DebugPrint("Restoring the state after Pause()")
-                    self.__State = SavedState
+                    self.__SetState(SavedState)
                     # Increase the initial value with the value of delay
-                    # "time() - SavedTime" - amount of delay 
-                    InitialTime += time() - SavedTime
+                    # "Clock() - SavedTime" - amount of delay 
+                    InitialTime += Clock() - SavedTime
+                    ## The delay is over, a later pause brings its own
+                    self.SetDelay(0)
                     self.__ePauseResume.clear()
                     continue
                 
-                if self.__SuspendedDelay != 0:
-                    if (time() - SavedTime) >= self.__SuspendedDelay:
-                        self.__DebugPrint("SuspendedDelay is over now")
+                if self.GetDelay() != 0:
+                    if (Clock() - SavedTime) >= self.GetDelay():
+                        if self.__Tracers:
+                            self._Trace(TRACE_NOTICE, "SuspendedDelay is over now")
                         # Automatically check in the flag if delay is over
                         self.__ePauseResume.set()
                         continue
 
             ## TIMER_STATE_RUNNINGINITIAL
             elif self.__State == TIMER_STATE_RUNNINGINITIAL:
-                self.__DebugPrint("Current State: TIMER_STATE_RUNNINGINITIAL")
                 # Preinitial processing due to immediately exit from the cycle
                 # ignoring the fact, that FunctionProc might be just invoked 
                 if self.__eTerminate.is_set():
-                    self.__DebugPrint("Terminating a timer")
                     continue
                 
                 if self.__eDeactivate.is_set():
-                    self.__DebugPrint("Changing the state to TIMER_STATE_INIT")
                     self.__eDeactivate.clear()
-                    self.__State = TIMER_STATE_INIT
+                    self.__SetState(TIMER_STATE_INIT)
+                    Burst = 0
                     continue
                 
                 if self.__ePauseResume.is_set():
-                    self.__DebugPrint("Changing the state to TIMER_STATE_SUSPENDED")
                     SavedState = self.__State
-                    SavedTime = time()
-                    self.__State = TIMER_STATE_SUSPENDED
+                    SavedTime = Clock()
+                    self.__SetState(TIMER_STATE_SUSPENDED)
                     self.__ePauseResume.clear()
                     continue
                 
-                if (time() - InitialTime) >= TimeoutMark:
-                    self.__DebugPrint("Invoking a FUNCTION")
-                    self.__State = TIMER_STATE_RUNNING
-                    self.__FunctionProc(*self.__FunctionArgs, **self.__FunctionKWArgs)
-                    TimeoutMark = self.__TimerInterval
-                    InitialTime = time()
+                if (Clock() - InitialTime) >= TimeoutMark + Offset:
+                    self.__SetState(TIMER_STATE_RUNNING)
+                    if self.__Stats is not None:
+                        self.__Stats.Lateness.Add(Clock() - InitialTime - TimeoutMark - Offset)
+                    self.__Invoker.Invoke()
+                    InitialTime += TimeoutMark
+                    TimeoutMark = self.__NextInterval()
+                    Offset = TickJitter(self.__Jitter, self.GetInterval())
                     if self.__IsOneTimeShotTimer:
-                        self.__DebugPrint("Terminating a One-Time-Shot timer")
+                        if self.__Tracers:
+                            self._Trace(TRACE_NOTICE, "Terminating a One-Time-Shot timer")
                         self.__eTerminate.set()
                     elif self.__IsRepeatableTimer:
-                        self.__TimerCount -= 1
+                        self._CountDown()
+                    InitialTime, Burst, Skipped = AlignSchedule(InitialTime, TimeoutMark, Clock(), self.__CatchUp, self.GetCatchUpLimit())
+                    if self.__Stats is not None:
+                        self.__Stats.Skipped += Skipped
                     continue
                 
             ## TIMER_STATE_RUNNING
             elif self.__State == TIMER_STATE_RUNNING:
-                self.__DebugPrint("Current State: TIMER_STATE_RUNNING")
                 # Preinitial processing due to immediately exit from the cycle
                 # ignoring the fact, that FunctionProc might be just invoked 
                 if self.__eTerminate.is_set():
-                    self.__DebugPrint("Terminating a timer")
                     continue
                 
                 if self.__eDeactivate.is_set():
-                    self.__DebugPrint("Changing the state to TIMER_STATE_INIT")
                     self.__eDeactivate.clear()
-                    self.__State = TIMER_STATE_INIT
+                    self.__SetState(TIMER_STATE_INIT)
+                    Burst = 0
                     continue
                 
                 if self.__ePauseResume.is_set():
-                    self.__DebugPrint("Changing the state to TIMER_STATE_SUSPENDED")
                     SavedState = self.__State
-                    SavedTime = time()
-                    self.__State = TIMER_STATE_SUSPENDED
+                    SavedTime = Clock()
+                    self.__SetState(TIMER_STATE_SUSPENDED)
                     self.__ePauseResume.clear()
                     continue
                 
-                if (time() - InitialTime) >= TimeoutMark:
-                    self.__DebugPrint("Invoking a FUNCTION")
-                    self.__FunctionProc(*self.__FunctionArgs, **self.__FunctionKWArgs)
-                    InitialTime = time()
+                if Burst or (Clock() - InitialTime) >= TimeoutMark + Offset:
+                    if self.__Stats is not None and not Burst:
+                        self.__Stats.Lateness.Add(Clock() - InitialTime - TimeoutMark - Offset)
+                    self.__Invoker.Invoke()
+                    if Burst:
+                        ## Replayed tick: the schedule is already realigned
+                        Burst -= 1
+                    else:
+                        InitialTime += TimeoutMark
+                        TimeoutMark = self.__NextInterval()
+                        Offset = TickJitter(self.__Jitter, self.GetInterval())
+                        InitialTime, Burst, Skipped = AlignSchedule(InitialTime, TimeoutMark, Clock(), self.__CatchUp, self.GetCatchUpLimit())
+                        if self.__Stats is not None:
+                            self.__Stats.Skipped += Skipped
                     if self.__IsRepeatableTimer:
-                        self.__TimerCount -= 1
-                        if (self.__TimerCount <= 0):
-                            self.__DebugPrint("Terminating a Repeatable timer")
+                        if (self._CountDown() <= 0):
+                            if self.__Tracers:
+                                self._Trace(TRACE_NOTICE, "Terminating a Repeatable timer")
                             self.__eTerminate.set()
                             continue
                         else:
-                            self.__DebugPrint("Remained invocation function calls: " + repr(self.__TimerCount))
+                            if self.__Tracers:
+                                self._Trace(TRACE_NOTICE, "Remained invocation function calls: " + repr(self.GetCount()))
+            
+            if self.__eTerminate.is_set():
+                continue
+            
+            ## Nothing changes any more till the sleep is over: the received
+            ## messages are applied
+            if Pending:
+                for Done in Pending:
+                    Done._Resolve()
+                del Pending[:]
             
-            if not self.__eTerminate.is_set():
+            if self.__WakeupMode == WAKEUP_POLLING:
                 self.__eTerminate.wait(self.__Precision)
+                continue
+            
+            ## Sleep until the nearest deadline or the next message
+            Timeout = None
+            if Burst and self.__State == TIMER_STATE_RUNNING:
+                Timeout = 0
+            elif (self.__State == TIMER_STATE_RUNNINGINITIAL) or (self.__State == TIMER_STATE_RUNNING):
+                Timeout = TimeoutMark + Offset - (Clock() - InitialTime)
+            elif self.__State == TIMER_STATE_SUSPENDED and self.GetDelay() != 0:
+                Timeout = self.GetDelay() - (Clock() - SavedTime)
+            
+            # Far deadline: wake up Precision earlier and cover the rest
+            # with a short wait, so the lateness is bounded by Precision
+            if Timeout is not None:
+                Timeout = max(Timeout - self.__Precision if Timeout > self.__Precision else Timeout, 0)
+            self.__eWakeup.wait(Timeout)
+            self.__eWakeup.clear()
 
-        self.__State = TIMER_STATE_TERMINATED
-        self.__DebugPrint("Current State: TIMER_STATE_TERMINATED")
+        self.__SetState(TIMER_STATE_TERMINATED)
+        
+        ## Messages which will never be processed
+        for Done in Pending:
+            Done._Resolve()
+        while True:
+            try:
+                Message, SentAt, Done = self.__MsgQueue.get_nowait()
+            except Empty:
+                break
+            if Done is not None:
+                Done._Resolve()
     
-    ############ Decorators ##############
-    def Constraint(Minimum, Maximum):
-        ## Dynamically creating a decorator 
-        def Decorator(Function):
-            ## Function to call
-            def WrapFunction(self, Value):
-                Value = Minimum if Value < Minimum else Maximum if Value > Maximum else Value
-                ## Function invocation
-                Function(self, Value)
-            return WrapFunction
-        return Decorator
+    ########### Function result ##########
+    def __ApplyResult(self, Result):
+        ## Timer thread only
+        if self.__Policy is None:
+            return
+        Behaviour = self.__Policy.Apply(Result, self.GetInterval())
+        if Behaviour is None:
+            return
+        if self.__Tracers:
+            self._Trace(TRACE_NOTICE, "Function result " + repr(Result) + " meets the condition")
+        
+        Active = self.__State in (TIMER_STATE_RUNNINGINITIAL, TIMER_STATE_RUNNING, TIMER_STATE_SUSPENDED)
+        if Behaviour == T_BEHAV_TIMER_TERMINATED:
+            self.__eTerminate.set()
+        elif Behaviour == T_BEHAV_TIMER_DEACTIVATED and Active:
+            self.__eDeactivate.set()
+        elif Behaviour == T_BEHAV_TIMER_PAUSE and Active and self.__State != TIMER_STATE_SUSPENDED:
+            ## Indefinite, like the ManagedTimer one
+            self.SetDelay(0)
+            self.__ePauseResume.set()
     
-    def CheckTerminatedState(Function):
-        def WrapFunction(self):
-            if self.__State == TIMER_STATE_TERMINATED:
-                self.__DebugPrint("Timer is in TERMINATED state. All invocations are prohibited")
-                self.__Error = T_ERROR_INCORRECT_STATE
-                return False
-            else:
-                Function()
-        return WrapFunction
+    def __PostResult(self, Result):
+        ## Executor thread
+        self.__Results.append(Result)
+        self.__eWakeup.set()
     
-    ########### Validators ################
-    @Constraint(TIMER_INTERVAL_INITIAL_MIN, TIMER_INTERVAL_INITIAL_MAX)
-    def SetInitialInterval(self, Value):
-        self.__TimerInitialInterval = Value
+    def __NextInterval(self):
+        if self.__Policy is None:
+            return self.GetInterval()
+        return self.__Policy.Interval(self.GetInterval())
     
-    @Constraint(TIMER_INTERVAL_MIN, TIMER_INTERVAL_MAX)
-    def SetInterval(self, Value):
-        self.__TimerInterval = Value
+    def __InitialDelay(self):
+        return self.GetInitialInterval() + self.GetPhase()
     
+    ########### Validators ################
     @Constraint(PRECISION_MIN, PRECISION_MAX)
     def SetPrecision(self, Value):
         self.__Precision = Value
     
-    @Constraint(TIMER_COUNT_MIN, TIMER_COUNT_MAX)
-    def SetCount(self, Value):
-        self.__TimerCount = Value
-            
-    @Constraint(SUSPENDED_DELAY_MIN, SUSPENDED_DELAY_MAX)
-    def SetDelay(self, Value):
-        self.__SuspendedDelay = Value
+    @Constraint(JITTER_MIN, JITTER_MAX)
+    def SetJitter(self, Value):
+        ## Applies from the next tick on
+        self.__Jitter = Value
         
     ########## Getter/Setter functions #########
     def GetPrecision(self):
         return self.__Precision                
     
+    def GetJitter(self):
+        return self.__Jitter
+    
+    def GetPhase(self):
+        ## Shift of the whole schedule, added to the initial interval
+        return SpreadPhase(self.__Spread, self.__SpreadFraction, self.GetInterval())
+    
+    def GetName(self):
+        return self.name
+    
     def GetState(self):
         return self.__State
     
-    def GetError(self):
-        return self.__Error
+    def GetLastFuture(self):
+        return self.__Invoker.GetLastFuture()
     
-    ########### Output Debug information ##########
-    def __OutputErrorState(self, RequiredTimerState = [], Invert=False):
-        PrintString = "Error: wrong state: should be "
-        CondCount = len(RequiredTimerState)
-        if not Invert:
-            for index, nextstate in enumerate(RequiredTimerState):
-                PrintString += STATE_TO_TEXT[nextstate]
-                if index != (CondCount - 1): PrintString += " or "
-            PrintString += " instead of "
-            PrintString += STATE_TO_TEXT[self.__State]
-        else:
-            PrintString += "anything except of "
-            PrintString += STATE_TO_TEXT[RequiredTimerState[0]]
-        return PrintString
+    def GetStats(self):
+        ## None unless created with Statistics=True
+        return self.__Stats.Snapshot() if self.__Stats is not None else None
     
-    def __DebugPrint(self, Message):
-        if self.__DEBUG:
-            if self.__PROFILE: 
-                print strftime("[%H:%M:%S.", gmtime()) + (("%.3f" % time()).split("."))[1] + "]\t",
-            print Message
+    def WaitForState(self, State, Timeout = None):
+        ## Blocks till the timer is in State. False on timeout or if the
+        ## timer is terminated first
+        Limit = None if Timeout is None else Clock() + Timeout
+        with self.__StateChanged:
+            self.__Waiting += 1
+            try:
+                while self.__State != State:
+                    if self.__State == TIMER_STATE_TERMINATED:
+                        return False
+                    Remaining = None if Limit is None else Limit - Clock()
+                    if Remaining is not None and Remaining <= 0:
+                        return False
+                    self.__StateChanged.wait(Remaining)
+                return True
+            finally:
+                self.__Waiting -= 1
+    
+    ########### Tracing ##########
+    def __SetState(self, State):
+        self.__State = State
+        if self.__Waiting:
+            with self.__StateChanged:
+                self.__StateChanged.notify_all()
+        if self.__Tracers:
+            self._Trace(TRACE_STATE, State)
+    
+    ########### Message sending ##########
+    def __Post(self, Message, Done = None):
+        self.__MsgQueue.put_nowait((Message, Clock(), Done))
+        self.__eWakeup.set()
+        ## Too late, the queue is not read any more
+        if Done is not None and self.__State == TIMER_STATE_TERMINATED:
+            Done._Resolve()
+        return Done
+    
+    def _Deliver(self, Message, Done):
+        self.__Post(Message, Done)
     
     ########## Behaviour functions ###########
-    def ChangeIntervals(self, Initial, Interval):
-        self.__DebugPrint("ChangeIntervals(): In function")
+    def ChangePrecision(self, Precision):
+        if self.__Tracers:
+            self._Trace(TRACE_NOTICE, "ChangePrecision(): In function")
         
         if self.__State != TIMER_STATE_TERMINATED:
-            self.__MsgQueue.put_nowait((MESSAGE_CHANGE, Initial, Interval))
-            self.__DebugPrint("ChangeIntervals(): Notice: message is sent")
-            self.__Error = T_SUCCESS
-            return True
+            return self._Send("ChangePrecision", (MESSAGE_PRECISION, Precision, 0))
         else:
-            self.__DebugPrint("ChangeIntervals(): " + self.__OutputErrorState([TIMER_STATE_TERMINATED], Invert=True))
-            self.__Error = T_ERROR_INCORRECT_STATE
-            return False
+            return self._Refuse("ChangePrecision", [TIMER_STATE_TERMINATED], Invert = True)
+
+
+class TimerEntry(object):
+    ## Handle of one scheduled deadline inside a timer store
+    __slots__ = ('Deadline', 'Sequence', 'Item', 'Level', 'Key')
     
-    def ChangePrecision(self, Precision):
-        self.__DebugPrint("ChangePrecision(): In function")
-        
-        if self.__State != TIMER_STATE_TERMINATED:
-            self.__MsgQueue.put_nowait((MESSAGE_PRECISION, Precision, 0))
-            self.__DebugPrint("ChangePrecision(): Notice: message is sent")
-            self.__Error = T_SUCCESS
-            return True
+    def __init__(self, Deadline, Sequence, Item):
+        self.Deadline = Deadline
+        ## Tie breaker for equal deadlines
+        self.Sequence = Sequence
+        ## None once the entry is cancelled
+        self.Item = Item
+        ## Wheel level holding the entry, -1 when it is out of the store
+        self.Level = 0
+        ## Wheel slot number
+        self.Key = 0
+    
+    def __lt__(self, Other):
+        if self.Deadline != Other.Deadline:
+            return self.Deadline < Other.Deadline
+        return self.Sequence < Other.Sequence
+
+
+class HeapTimerStore(object):
+    ## Binary heap: O(log N) insert, O(1) lazy cancel. Good for sparse
+    ## and long deadlines
+    
+    def __init__(self, Now = None):
+        self.__Heap = []
+        self.__Sequence = 0
+        ## Sequence of the entries inserted with Front=True, below all the others
+        self.__Front = STORE_FRONT_SEQUENCE
+        self.__Count = 0
+    
+    def __len__(self):
+        return self.__Count
+    
+    def Insert(self, Deadline, Item, Front = False):
+        ## Front: first among the entries with the same deadline
+        if Front:
+            self.__Front += 1
+            Entry = TimerEntry(Deadline, self.__Front, Item)
         else:
-            self.__DebugPrint("ChangePrecision(): " + self.__OutputErrorState([TIMER_STATE_TERMINATED], Invert=True))
-            self.__Error = T_ERROR_INCORRECT_STATE
-            return False
+            self.__Sequence += 1
+            Entry = TimerEntry(Deadline, self.__Sequence, Item)
+        heappush(self.__Heap, Entry)
+        self.__Count += 1
+        return Entry
     
-    ########## Action functions ##############
-    @CheckTerminatedState
-    def Activate(self, DisableStateCheck = False):
-        self.__DebugPrint("Activate(): In function")
+    def Cancel(self, Entry):
+        if Entry.Item is None:
+            return
+        ## Cancelled entry stays in the heap until it reaches the top
+        if Entry.Level >= 0:
+            Entry.Level = -1
+            self.__Count -= 1
+        Entry.Item = None
+    
+    def PopDue(self, Now):
+        Due = []
+        while self.__Heap and self.__Heap[0].Deadline <= Now:
+            Entry = heappop(self.__Heap)
+            if Entry.Item is not None:
+                Entry.Level = -1
+                self.__Count -= 1
+                Due.append(Entry)
+        return Due
+    
+    def NextDeadline(self):
+        while self.__Heap and self.__Heap[0].Item is None:
+            heappop(self.__Heap)
+        return self.__Heap[0].Deadline if self.__Heap else None
+    
+    def Window(self, Until):
+        ## Live entries with Deadline <= Until, in no particular order.
+        ## Costs the entries found, subtrees past Until are not visited
+        Heap = self.__Heap
+        Stack = [0] if Heap else []
+        while Stack:
+            Index = Stack.pop()
+            Entry = Heap[Index]
+            if Entry.Deadline > Until:
+                continue
+            if Entry.Item is not None:
+                yield Entry
+            Stack.extend(Child for Child in (2 * Index + 1, 2 * Index + 2) if Child < len(Heap))
+
+
+class WheelTimerStore(object):
+    ## Hierarchical timing wheel: O(1) insert and cancel, expiring costs
+    ## only the expiring entries. Level N slot spans all the slots of
+    ## level N-1; far entries cascade down when their slot comes up
+    
+    def __init__(self, Now = None, Tick = WHEEL_TICK_DEFAULT, Slots = WHEEL_SLOTS):
+        self.__Slots = Slots
+        ## Slot length of every level
+        self.__Spans = []
+        Span = Tick
+        for Count in Slots:
+            self.__Spans.append(Span)
+            Span *= Count
+        ## Per level: {slot number: set of entries} and a heap of the slot
+        ## numbers. Slots are absolute, so the top level never overflows
+        self.__Buckets = [{} for Count in Slots]
+        self.__Keys = [[] for Count in Slots]
+        ## Per level above 0: {slot number: earliest deadline put in the
+        ## slot}. The slot number is that deadline // Span, so PopDue() at
+        ## the deadline cascades the slot. Not lowered by Cancel(): an early
+        ## wakeup at worst
+        self.__Earliest = [{} for Count in Slots]
+        self.__Now = Clock() if Now is None else Now
+        self.__Sequence = 0
+        ## Sequence of the entries inserted with Front=True, below all the others
+        self.__Front = STORE_FRONT_SEQUENCE
+        self.__Count = 0
+    
+    def __len__(self):
+        return self.__Count
+    
+    def Insert(self, Deadline, Item, Front = False):
+        ## Front: first among the entries with the same deadline
+        if Front:
+            self.__Front += 1
+            Entry = TimerEntry(Deadline, self.__Front, Item)
+        else:
+            self.__Sequence += 1
+            Entry = TimerEntry(Deadline, self.__Sequence, Item)
+        self.__Place(Entry)
+        self.__Count += 1
+        return Entry
+    
+    def Cancel(self, Entry):
+        if Entry.Item is None:
+            return
+        if Entry.Level >= 0:
+            ## Empty slot is kept till its time so the slot number is pushed once
+            self.__Buckets[Entry.Level][Entry.Key].discard(Entry)
+            Entry.Level = -1
+            self.__Count -= 1
+        Entry.Item = None
+    
+    def PopDue(self, Now):
+        self.__Now = Now
         
-        if DisableStateCheck:
-            self.__MsgQueue.put_nowait((MESSAGE_ACTIVATE, 0, 0))
-            self.__DebugPrint("Activate(): Notice: message is sent")
-            self.__Error = T_SUCCESS
-            return True
+        ## Cascade from the top, so the entries reach level 0 in this pass
+        for Level in range(len(self.__Slots) - 1, 0, -1):
+            Limit = int(Now // self.__Spans[Level])
+            Keys = self.__Keys[Level]
+            while Keys and Keys[0] <= Limit:
+                Key = heappop(Keys)
+                del self.__Earliest[Level][Key]
+                for Entry in self.__Buckets[Level].pop(Key):
+                    self.__Place(Entry)
         
-        elif (self.__State == TIMER_STATE_RUNNING) or (self.__State == TIMER_STATE_RUNNINGINITIAL):
-            self.__DebugPrint("Activate(): Warning: already in RUNNING mode")
-            self.__Error = T_ERROR_ALREADY_SWITCHED
-            return False
+        Due = []
+        Later = None
+        Limit = int(Now // self.__Spans[0])
+        Keys = self.__Keys[0]
+        while Keys and Keys[0] <= Limit:
+            Key = heappop(Keys)
+            Bucket = self.__Buckets[0].pop(Key)
+            ## Current slot may hold deadlines which are not reached yet
+            if Key == Limit:
+                Later = set(Entry for Entry in Bucket if Entry.Deadline > Now)
+                Bucket -= Later
+            for Entry in Bucket:
+                Entry.Level = -1
+                Due.append(Entry)
+        
+        if Later:
+            self.__Buckets[0][Limit] = Later
+            heappush(Keys, Limit)
+        
+        self.__Count -= len(Due)
+        Due.sort()
+        return Due
+    
+    def NextDeadline(self):
+        Nearest = None
+        for Level in range(len(self.__Slots)):
+            Keys = self.__Keys[Level]
+            Buckets = self.__Buckets[Level]
+            ## Drop the slots emptied by Cancel()
+            while Keys and not Buckets[Keys[0]]:
+                Key = heappop(Keys)
+                del Buckets[Key]
+                self.__Earliest[Level].pop(Key, None)
+            if not Keys:
+                continue
+            
+            if Level == 0:
+                Deadline = min(Entry.Deadline for Entry in Buckets[Keys[0]])
+            else:
+                ## Time to cascade the slot. Not Key * Span: it may round
+                ## below the slot start PopDue() sees (Now // Span)
+                Deadline = self.__Earliest[Level][Keys[0]]
+            if Nearest is None or Deadline < Nearest:
+                Nearest = Deadline
+        return Nearest
+    
+    def Window(self, Until):
+        ## Live entries with Deadline <= Until, in no particular order.
+        ## Only the slots starting before Until are visited
+        for Level in range(len(self.__Slots)):
+            Keys = self.__Keys[Level]
+            Buckets = self.__Buckets[Level]
+            Limit = Until // self.__Spans[Level]
+            Stack = [0] if Keys else []
+            while Stack:
+                Index = Stack.pop()
+                if Keys[Index] > Limit:
+                    continue
+                for Entry in Buckets[Keys[Index]]:
+                    if Entry.Deadline <= Until:
+                        yield Entry
+                Stack.extend(Child for Child in (2 * Index + 1, 2 * Index + 2) if Child < len(Keys))
+    
+    def __Place(self, Entry):
+        Last = len(self.__Slots) - 1
+        for Level in range(Last + 1):
+            Span = self.__Spans[Level]
+            Key = int(Entry.Deadline // Span)
+            if (Key - int(self.__Now // Span)) < self.__Slots[Level] or Level == Last:
+                break
         
-        elif (self.__State == TIMER_STATE_INIT) or (self.__State == TIMER_STATE_IDLE):
-            self.__MsgQueue.put_nowait((MESSAGE_ACTIVATE, 0, 0))
-            self.__DebugPrint("Activate(): Notice: message is sent")
-            self.__Error = T_SUCCESS
+        Bucket = self.__Buckets[Level].get(Key)
+        if Bucket is None:
+            Bucket = self.__Buckets[Level][Key] = set()
+            heappush(self.__Keys[Level], Key)
+        Bucket.add(Entry)
+        Entry.Level = Level
+        Entry.Key = Key
+        if Level > 0:
+            Earliest = self.__Earliest[Level]
+            if Key not in Earliest or Entry.Deadline < Earliest[Key]:
+                Earliest[Key] = Entry.Deadline
+
+
+class LightTimerTable(object):
+    ## Struct of arrays for huge numbers of simple timers: deadline, 
+    ## interval, count, state and function per timer and an indexed binary 
+    ## heap of slot numbers. About 40 bytes a timer, no object per timer.
+    ## Handles are integers: slot number plus a generation, so the handle 
+    ## of a finished timer never reaches the timer reusing its slot
+    
+    def __init__(self):
+        self.__Lock = Lock()
+        ## Next deadline, remaining time while suspended
+        self.__Deadline = array('d')
+        self.__Interval = array('d')
+        ## Remaining calls, 0 for unlimited
+        self.__Count = array('i')
+        self.__State = array('b')
+        self.__Generation = array('I')
+        ## Slot position in the heap, -1 when it's not there
+        self.__Position = array('i')
+        self.__Functions = []
+        self.__Heap = array('i')
+        self.__Free = array('i')
+        self.__Live = 0
+    
+    def __len__(self):
+        return self.__Live
+    
+    def Add(self, Deadline, Interval, Count, FunctionProc):
+        ## Returns the handle and whether the timer is the nearest one now
+        with self.__Lock:
+            if self.__Free:
+                Index = self.__Free.pop()
+                self.__Deadline[Index] = Deadline
+                self.__Interval[Index] = Interval
+                self.__Count[Index] = Count
+                self.__State[Index] = TIMER_STATE_RUNNING
+                self.__Functions[Index] = FunctionProc
+            else:
+                Index = len(self.__Functions)
+                self.__Deadline.append(Deadline)
+                self.__Interval.append(Interval)
+                self.__Count.append(Count)
+                self.__State.append(TIMER_STATE_RUNNING)
+                self.__Generation.append(0)
+                self.__Position.append(-1)
+                self.__Functions.append(FunctionProc)
+            self.__Live += 1
+            self.__Push(Index)
+            return (self.__Generation[Index] << 32) | Index, self.__Heap[0] == Index
+    
+    def Cancel(self, Handle):
+        with self.__Lock:
+            Index = self.__Find(Handle)
+            if Index is None:
+                return False
+            if self.__Position[Index] >= 0:
+                self.__Remove(Index)
+            self.__Release(Index)
             return True
+    
+    def Pause(self, Handle, Now):
+        with self.__Lock:
+            Index = self.__Find(Handle)
+            if Index is None or self.__State[Index] != TIMER_STATE_RUNNING:
+                return False
+            self.__Remove(Index)
+            self.__Deadline[Index] = max(self.__Deadline[Index] - Now, 0)
+            self.__State[Index] = TIMER_STATE_SUSPENDED
+            return True
+    
+    def Resume(self, Handle, Now):
+        ## Returns None if refused, otherwise whether the timer is the nearest one
+        with self.__Lock:
+            Index = self.__Find(Handle)
+            if Index is None or self.__State[Index] != TIMER_STATE_SUSPENDED:
+                return None
+            self.__Deadline[Index] += Now
+            self.__State[Index] = TIMER_STATE_RUNNING
+            self.__Push(Index)
+            return self.__Heap[0] == Index
+    
+    def GetState(self, Handle):
+        with self.__Lock:
+            Index = self.__Find(Handle)
+            return TIMER_STATE_TERMINATED if Index is None else self.__State[Index]
+    
+    def NextDeadline(self):
+        ## Cancel()/Pause() of another thread may empty the heap meanwhile
+        with self.__Lock:
+            Heap = self.__Heap
+            return self.__Deadline[Heap[0]] if Heap else None
+    
+    def PopDue(self, Now):
+        ## Functions to call now. Periodic timers are moved to their next
+        ## deadline in place, missed ticks are skipped
+        Due = []
+        with self.__Lock:
+            Heap = self.__Heap
+            Deadlines = self.__Deadline
+            while Heap and Deadlines[Heap[0]] <= Now:
+                Index = Heap[0]
+                Due.append(self.__Functions[Index])
+                Interval = self.__Interval[Index]
+                Count = self.__Count[Index]
+                if Interval <= 0 or Count == 1:
+                    self.__Remove(Index)
+                    self.__Release(Index)
+                    continue
+                if Count > 1:
+                    self.__Count[Index] = Count - 1
+                Deadlines[Index] = AlignSchedule(Deadlines[Index], Interval, Now, CATCHUP_SKIP, 1)[0] + Interval
+                self.__SiftDown(0)
+        return Due
+    
+    def __Find(self, Handle):
+        Index = Handle & 0xFFFFFFFF
+        if Index >= len(self.__Functions) or self.__Generation[Index] != (Handle >> 32):
+            return None
+        if self.__State[Index] == TIMER_STATE_TERMINATED:
+            return None
+        return Index
+    
+    def __Release(self, Index):
+        self.__State[Index] = TIMER_STATE_TERMINATED
+        self.__Functions[Index] = None
+        self.__Generation[Index] = (self.__Generation[Index] + 1) & 0xFFFFFFFF
+        self.__Free.append(Index)
+        self.__Live -= 1
+    
+    ########### Indexed heap ###########
+    def __Push(self, Index):
+        self.__Heap.append(Index)
+        self.__SiftUp(len(self.__Heap) - 1)
+    
+    def __Remove(self, Index):
+        Heap = self.__Heap
+        Position = self.__Position[Index]
+        Last = Heap.pop()
+        self.__Position[Index] = -1
+        if Last != Index:
+            Heap[Position] = Last
+            self.__Position[Last] = Position
+            self.__SiftDown(self.__SiftUp(Position))
+    
+    def __SiftUp(self, Position):
+        Heap, Deadlines, Positions = self.__Heap, self.__Deadline, self.__Position
+        Index = Heap[Position]
+        Deadline = Deadlines[Index]
+        while Position > 0:
+            Parent = (Position - 1) >> 1
+            Other = Heap[Parent]
+            if Deadlines[Other] <= Deadline:
+                break
+            Heap[Position] = Other
+            Positions[Other] = Position
+            Position = Parent
+        Heap[Position] = Index
+        Positions[Index] = Position
+        return Position
+    
+    def __SiftDown(self, Position):
+        Heap, Deadlines, Positions = self.__Heap, self.__Deadline, self.__Position
+        Size = len(Heap)
+        Index = Heap[Position]
+        Deadline = Deadlines[Index]
+        while True:
+            Child = 2 * Position + 1
+            if Child >= Size:
+                break
+            Other = Heap[Child]
+            OtherDeadline = Deadlines[Other]
+            if Child + 1 < Size:
+                Right = Heap[Child + 1]
+                if Deadlines[Right] < OtherDeadline:
+                    Child += 1
+                    Other = Right
+                    OtherDeadline = Deadlines[Right]
+            if OtherDeadline >= Deadline:
+                break
+            Heap[Position] = Other
+            Positions[Other] = Position
+            Position = Child
+        Heap[Position] = Index
+        Positions[Index] = Position
+        return Position
+
+
+class ManagedTimer(TimerControl):
+    
+    def __init__(self, 
+                 Manager,
+                 TimerInitialInterval, TimerContinuousInterval,
+                 FunctionProc,
+                 StartCondition = TIMER_ACTIVATE, 
+                 TimerCount = TIMER_COUNT_MIN, 
+                 DEBUG = False,
+                 PROFILE = False,
+                 FunctionArgs = [], FunctionKWArgs = {},
+                 CatchUp = CATCHUP_SKIP,
+                 CatchUpLimit = CATCHUP_LIMIT_DEFAULT,
+                 Name = None,
+                 Executor = None,
+                 Overlap = OVERLAP_ALLOW,
+                 OverlapLimit = OVERLAP_LIMIT_DEFAULT,
+                 OnComplete = None,
+                 Statistics = False,
+                 Slack = SLACK_MIN,
+                 Batch = False,
+                 Priority = PRIORITY_NORMAL,
+                 ResultCondition = None,
+                 ResultValue = None,
+                 ResultBehaviour = T_BEHAV_TIMER_TERMINATED,
+                 BackoffFactor = BACKOFF_FACTOR_DEFAULT,
+                 BackoffMax = TIMER_INTERVAL_MAX,
+                 Spread = SPREAD_NONE,
+                 SpreadKey = None,
+                 Jitter = JITTER_MIN
+                 ):
+        
+        ## Trace listeners, DEBUG is served by one of them
+        self.__Tracers = [DebugPrinter(PROFILE)] if DEBUG else []
+        ## Deadlines are on the manager clock (maybe a VirtualClock)
+        self.__Clock = Manager.GetClock()
+        TimerControl.__init__(self, self.__Tracers, self.__Clock)
+        
+        # Received parameters 
+        self.__Manager = Manager
+        self.__Name = Name if Name is not None else "ManagedTimer-%x" % id(self)
+        ## Allowed lateness, lets the manager fire this timer together with others
+        self.SetSlack(Slack)
+        ## Order among the timers due in the same pass, and what is shed first
+        self.SetPriority(Priority)
+        self.__CatchUp = CatchUp
+        self.SetCatchUpLimit(CatchUpLimit)
+        self.SetInitialInterval(TimerInitialInterval)
+        self.SetInterval(TimerContinuousInterval)
+        self.SetCount(TimerCount)
+        ## Load spreading related: phase of the first deadline and tick jitter
+        self.__Spread = Spread if Spread == SPREAD_INTERVAL else min(max(Spread, SPREAD_NONE), SPREAD_MAX)
+        self.__SpreadFraction = SpreadFraction(SpreadKey) if self.__Spread else 0
+        self.SetJitter(Jitter)
+        ## Statistics related
+        self.__Stats = TimerStats() if Statistics else None
+        ## Result related: None unless ResultCondition is given (not in Batch mode)
+        self.__Policy = None
+        OnResult = None
+        if ResultCondition is not None:
+            self.__Policy = ResultPolicy(ResultCondition, ResultValue, ResultBehaviour, BackoffFactor, BackoffMax)
+            ## Executor results come back through the manager queue
+            OnResult = self.__ApplyResult if Executor is None else self.__PostResult
+        ## Function related
+        self.__Invoker = FunctionInvoker(FunctionProc, FunctionArgs, FunctionKWArgs,
+                                         Executor, Overlap, OverlapLimit, OnComplete,
+                                         self.__Stats, self.__Tracers, self._Trace, OnResult)
+        ## Batch mode: due calls of one dispatcher pass sharing FunctionProc
+        ## (and Executor) are merged into FunctionProc([(Args, KWArgs), ...])
+        self.__Batch = Batch
+        self.__BatchKey = (FunctionProc, Executor)
+        self.__BatchCall = (FunctionArgs, FunctionKWArgs)
+        
+        ## Flags
+        if self.GetInterval() == 0 or self.GetCount() == 1:
+            self.__IsOneTimeShotTimer = True
         else:
-            self.__DebugPrint("Activate(): " + self.__OutputErrorState([TIMER_STATE_INIT, TIMER_STATE_IDLE]))
-            self.__Error = T_ERROR_INCORRECT_STATE
-            return False
+            self.__IsOneTimeShotTimer = False
+        self.__IsRepeatableTimer = True if self.GetCount() > 1 else False
+        
+        # Check flags validity
+        ## Both types simultaneously is not allowed
+        if self.__IsOneTimeShotTimer and self.__IsRepeatableTimer:
+            self.__IsRepeatableTimer = False
+        
+        # Inner variables
+        self.__State = TIMER_STATE_IDLE
+        ## Notified on state changes while WaitForState() callers wait
+        self.__StateChanged = Manager._StateCondition()
+        self.__Waiting = 0
+        
+        # Scheduling variables (owned by the dispatcher thread)
+        ## State to restore after Pause()
+        self.__SavedState = TIMER_STATE_IDLE
+        ## Moment Pause() was applied
+        self.__SavedTime = 0
+        ## Scheduled (not the actual) start of the current interval
+        self.__MarkTime = 0
+        ## Jitter of the pending deadline
+        self.__Offset = 0
+        ## Manager store entry of the pending deadline
+        self.__Entry = None
+        
+        # Move to first working state
+        self.__Manager._Post(self, (MESSAGE_INIT, 0, 0))
+        
+        # Or even further
+        if StartCondition == TIMER_ACTIVATE:
+            self.__Manager._Post(self, (MESSAGE_ACTIVATE, 0, 0))
     
-    @CheckTerminatedState
-    def Pause(self, Wait=0, DisableStateCheck = False):
-        self.__DebugPrint("Pause(): In function")
+    ########## Dispatcher side ###########
+    def _ProcessMessage(self, Message, Now, SentAt, Depth):
+        if self.__Stats is not None:
+            self.__Stats.QueueWait.Add(Now - SentAt)
+            self.__Stats.AddQueueDepth(Depth)
+        if self.__Tracers:
+            self._Trace(TRACE_MESSAGE, Message[0])
         
-        if DisableStateCheck:
-            self.__MsgQueue.put_nowait((MESSAGE_PAUSE, Wait, 0))
-            self.__DebugPrint("Pause(): Notice: message is sent")
-            self.__Error = T_SUCCESS
-            return True
+        ## MESSAGE_INIT
+        if Message[0] == MESSAGE_INIT:
+            if self.__State == TIMER_STATE_IDLE:
+                self.__SetState(TIMER_STATE_INIT)
         
-        elif self.__State == TIMER_STATE_SUSPENDED:
-            self.__DebugPrint("Pause(): Warning: already in SUSPENDED mode")
-            self.__Error = T_ERROR_ALREADY_SWITCHED
-            return False
+        ## MESSAGE_CHANGE
+        elif Message[0] == MESSAGE_CHANGE:
+            self.SetInitialInterval(Message[1])
+            self.SetInterval(Message[2])
+            
+            if (self.__State == TIMER_STATE_RUNNINGINITIAL) or (self.__State == TIMER_STATE_RUNNING):
+                self.__ScheduleTick()
+        
+        ## MESSAGE_ACTIVATE
+        elif Message[0] == MESSAGE_ACTIVATE:
+            if self.__State == TIMER_STATE_INIT:
+                self.__SetState(TIMER_STATE_RUNNINGINITIAL)
+                self.__MarkTime = Now
+                self.__ScheduleTick()
+        
+        ## MESSAGE_DEACTIVATE
+        elif Message[0] == MESSAGE_DEACTIVATE:
+            if (self.__State == TIMER_STATE_SUSPENDED) or (self.__State == TIMER_STATE_RUNNING) or (self.__State == TIMER_STATE_RUNNINGINITIAL):
+                self.__Cancel()
+                self.__SetState(TIMER_STATE_INIT)
+        
+        ## MESSAGE_PAUSE
+        elif Message[0] == MESSAGE_PAUSE:
+            if (self.__State == TIMER_STATE_RUNNINGINITIAL) or (self.__State == TIMER_STATE_RUNNING):
+                self.__Suspend(Now, Message[1])
+        
+        ## MESSAGE_RESUME
+        elif Message[0] == MESSAGE_RESUME:
+            if self.__State == TIMER_STATE_SUSPENDED:
+                self.__Resume(Now)
+        
+        ## MESSAGE_TERMINATE
+        elif Message[0] == MESSAGE_TERMINATE:
+            self._Shutdown()
+        
+        ## MESSAGE_RESULT
+        elif Message[0] == MESSAGE_RESULT:
+            self.__ApplyResult(Message[1])
+        
+        ## MESSAGE_RESTORE
+        elif Message[0] == MESSAGE_RESTORE:
+            if self.__State == TIMER_STATE_INIT:
+                self.__Restore(Now, Message[1], Message[2])
+    
+    def _Snapshot(self, Now):
+        ## Dispatcher thread. SNAPSHOT_RECORD fields plus the name, None if 
+        ## there is nothing to restore
+        State = self.__State
+        SavedState = TIMER_STATE_IDLE
+        Next = Delay = 0
+        if State in (TIMER_STATE_IDLE, TIMER_STATE_TERMINATED):
+            return None
+        if State in (TIMER_STATE_RUNNINGINITIAL, TIMER_STATE_RUNNING):
+            ## Deadline on the schedule, the jitter is not kept
+            Next = self.__MarkTime + self.__CurrentInterval() - Now
+        elif State == TIMER_STATE_SUSPENDED:
+            ## Time is frozen at the pause
+            SavedState = self.__SavedState
+            Next = self.__MarkTime + self.__IntervalOf(SavedState) - self.__SavedTime
+            if self.GetDelay() != 0:
+                Delay = max(self.GetDelay() - (Now - self.__SavedTime), SNAPSHOT_DELAY_MIN)
+        return (State, SavedState, self.__Priority, self.__CatchUp, self.GetCount(),
+                self.GetInitialInterval(), self.GetInterval(), Next, Delay, self.__Slack, self.__Name)
+    
+    def __Restore(self, Now, Record, Policy):
+        ## Record is (State, SavedState, Deadline, Delay), Deadline on the 
+        ## manager clock as if the timer was never stopped (or resumed now)
+        State, SavedState, Deadline, Delay = Record
+        CatchUp, CatchUpLimit = Policy
+        if State == TIMER_STATE_SUSPENDED:
+            self.__SetState(SavedState)
+            self.__MarkTime = Deadline - self.__CurrentInterval()
+            self.__Suspend(Now, Delay)
+            return
+        
+        self.__SetState(State)
+        if Deadline > Now:
+            self.__MarkTime = Deadline - self.__CurrentInterval()
+            self.__ScheduleTick()
+            return
+        
+        ## Deadlines missed while down: the one at Deadline and the ones
+        ## of the continuous interval after it
+        self.__SetState(TIMER_STATE_RUNNING)
+        self.__MarkTime, Burst, Missed = AlignSchedule(Deadline, self.__CurrentInterval(), Now, CATCHUP_SKIP, 1)
+        Missed += 1
+        if CatchUp == CATCHUP_ONCE:
+            Burst = 1
+        elif CatchUp == CATCHUP_BURST:
+            Burst = min(Missed, CatchUpLimit)
+        if self.__Stats is not None:
+            self.__Stats.Skipped += Missed - Burst
+        if Burst == 0 and self.__IsOneTimeShotTimer:
+            ## Its only deadline is gone
+            self._Shutdown()
+            return
+        for Tick in range(Burst):
+            if not self.__Fire():
+                return
+        self.__ScheduleTick()
+    
+    def _Expire(self, Now):
+        ## The entry is already out of the store
+        self.__Entry = None
+        
+        ## TIMER_STATE_SUSPENDED
+        if self.__State == TIMER_STATE_SUSPENDED:
+            if self.__Tracers:
+                self._Trace(TRACE_NOTICE, "SuspendedDelay is over now")
+            self.__Resume(Now)
         
+        ## TIMER_STATE_RUNNINGINITIAL or TIMER_STATE_RUNNING
         elif (self.__State == TIMER_STATE_RUNNINGINITIAL) or (self.__State == TIMER_STATE_RUNNING):
-            self.__MsgQueue.put_nowait((MESSAGE_PAUSE, Wait, 0))
-            self.__DebugPrint("Pause(): Notice: message is sent")
-            self.__Error = T_SUCCESS
-            return True
+            ## Next interval starts at the deadline, not after the function
+            self.__MarkTime += self.__CurrentInterval()
+            self.__SetState(TIMER_STATE_RUNNING)
+            if self.__Stats is not None:
+                self.__Stats.Lateness.Add(self.__Clock() - self.__MarkTime - self.__Offset)
+            if not self.__Fire():
+                return
+            
+            self.__MarkTime, Burst, Skipped = AlignSchedule(self.__MarkTime, self.__CurrentInterval(), self.__Clock(), self.__CatchUp, self.GetCatchUpLimit())
+            if self.__Stats is not None:
+                self.__Stats.Skipped += Skipped
+            for Tick in range(Burst):
+                if not self.__Fire():
+                    return
+            
+            self.__ScheduleTick()
+    
+    def _Shed(self, Now):
+        ## Drops the due tick (and the missed ones) and moves on to the next
+        ## deadline. False for a tick which cannot be dropped
+        if self.__IsOneTimeShotTimer or self.__State not in (TIMER_STATE_RUNNINGINITIAL, TIMER_STATE_RUNNING):
+            return False
+        self.__Entry = None
+        self.__MarkTime += self.__CurrentInterval()
+        self.__SetState(TIMER_STATE_RUNNING)
+        self.__MarkTime, Burst, Skipped = AlignSchedule(self.__MarkTime, self.__CurrentInterval(), Now, CATCHUP_SKIP, 1)
+        if self.__Stats is not None:
+            self.__Stats.Shed += 1 + Skipped
+        if self.__Tracers:
+            self._Trace(TRACE_NOTICE, "Tick is shed by the manager")
+        self.__ScheduleTick(True)
+        return True
+    
+    def _Defer(self, Deadline):
+        ## The due tick stays due and runs in one of the next passes
+        self.__Entry = self.__Manager._Schedule(self, Deadline, True)
+        if self.__Stats is not None:
+            self.__Stats.Deferred += 1
+    
+    def __Fire(self):
+        if self.__Batch:
+            ## Run by the manager at the end of the pass
+            self.__Manager._Collect(self, self.__BatchKey, self.__BatchCall)
+            if self.__Stats is not None:
+                self.__Stats.Fired += 1
         else:
-            self.__DebugPrint("Pause(): " + self.__OutputErrorState([TIMER_STATE_RUNNINGINITIAL, TIMER_STATE_RUNNING]))
-            self.__Error = T_ERROR_INCORRECT_STATE
+            try:
+                self.__Invoker.Invoke()
+            except Exception as Error:
+                ## The dispatcher is shared: a failing function must not stop other timers
+                self._Failed(Error)
+            ## The result stopped or suspended the timer
+            if self.__State != TIMER_STATE_RUNNING:
+                return False
+        
+        if self.__IsOneTimeShotTimer:
+            if self.__Tracers:
+                self._Trace(TRACE_NOTICE, "Terminating a One-Time-Shot timer")
+            self._Shutdown()
             return False
+        elif self.__IsRepeatableTimer:
+            if (self._CountDown() <= 0):
+                if self.__Tracers:
+                    self._Trace(TRACE_NOTICE, "Terminating a Repeatable timer")
+                self._Shutdown()
+                return False
+            else:
+                if self.__Tracers:
+                    self._Trace(TRACE_NOTICE, "Remained invocation function calls: " + repr(self.GetCount()))
+        return True
     
-    @CheckTerminatedState
-    def Resume(self, DisableStateCheck = False):
-        self.__DebugPrint("Resume(): In function")
+    def _Failed(self, Error):
+        if self.__Tracers:
+            self._Trace(TRACE_NOTICE, "Function raised an exception: " + repr(Error))
+        self._SetError(T_ERROR_FUNCTION_FAILED)
+    
+    def _Shutdown(self):
+        self.__Cancel()
+        self.__SetState(TIMER_STATE_TERMINATED)
+        self.__Manager._Unregister(self)
+    
+    def __Suspend(self, Now, Delay):
+        self.SetDelay(Delay)
+        self.__SavedState = self.__State
+        self.__SavedTime = Now
+        self.__SetState(TIMER_STATE_SUSPENDED)
+        ## While suspended the only deadline is the end of the delay
+        if self.GetDelay() != 0:
+            self.__Schedule(Now + self.GetDelay())
+        else:
+            self.__Cancel()
+    
+    def __ApplyResult(self, Result):
+        ## Dispatcher thread only
+        if self.__Policy is None:
+            return
+        Behaviour = self.__Policy.Apply(Result, self.GetInterval())
+        if Behaviour is None:
+            return
+        if self.__Tracers:
+            self._Trace(TRACE_NOTICE, "Function result " + repr(Result) + " meets the condition")
         
-        if DisableStateCheck:
-            self.__MsgQueue.put_nowait((MESSAGE_RESUME, 0, 0))
-            self.__DebugPrint("Resume(): Notice: message is sent")
-            self.__Error = T_SUCCESS
-            return True
+        if Behaviour == T_BEHAV_TIMER_TERMINATED:
+            if self.__State != TIMER_STATE_TERMINATED:
+                self._Shutdown()
+        elif Behaviour == T_BEHAV_TIMER_DEACTIVATED:
+            if self.__State in (TIMER_STATE_RUNNINGINITIAL, TIMER_STATE_RUNNING, TIMER_STATE_SUSPENDED):
+                self.__Cancel()
+                self.__SetState(TIMER_STATE_INIT)
+        elif Behaviour == T_BEHAV_TIMER_PAUSE:
+            if self.__State in (TIMER_STATE_RUNNINGINITIAL, TIMER_STATE_RUNNING):
+                self.__Suspend(self.__Clock(), 0)
+    
+    def __PostResult(self, Result):
+        ## Executor thread
+        self.__Manager._Post(self, (MESSAGE_RESULT, Result, 0))
+    
+    def __Resume(self, Now):
+        self.__SetState(self.__SavedState)
+        self.SetDelay(0)
+        # Shift the interval start by the amount of delay
+        self.__MarkTime += Now - self.__SavedTime
+        self.__ScheduleTick()
+    
+    def __SetState(self, State):
+        self.__State = State
+        if self.__Waiting:
+            with self.__StateChanged:
+                self.__StateChanged.notify_all()
+        if self.__Tracers:
+            self._Trace(TRACE_STATE, State)
+    
+    def __CurrentInterval(self):
+        return self.__IntervalOf(self.__State)
+    
+    def __IntervalOf(self, State):
+        if State == TIMER_STATE_RUNNINGINITIAL:
+            return self.GetInitialInterval() + self.GetPhase()
+        if self.__Policy is not None:
+            return self.__Policy.Interval(self.GetInterval())
+        return self.GetInterval()
+    
+    def __ScheduleTick(self, Front = False):
+        ## Deadline of the current interval plus a fresh jitter
+        self.__Offset = TickJitter(self.__Jitter, self.GetInterval())
+        self.__Schedule(self.__MarkTime + self.__CurrentInterval() + self.__Offset, Front)
+    
+    def __Schedule(self, Deadline, Front = False):
+        self.__Cancel()
+        self.__Entry = self.__Manager._Schedule(self, Deadline, Front)
+    
+    def __Cancel(self):
+        if self.__Entry is not None:
+            self.__Manager._Cancel(self.__Entry)
+            self.__Entry = None
+    
+    ########### Validators ################
+    @Constraint(JITTER_MIN, JITTER_MAX)
+    def SetJitter(self, Value):
+        ## Applies from the next tick on
+        self.__Jitter = Value
+    
+    @Constraint(SLACK_MIN, SLACK_MAX)
+    def SetSlack(self, Value):
+        self.__Slack = Value
+        self.__Manager._SlackChanged(self)
+    
+    @Constraint(PRIORITY_MIN, PRIORITY_MAX)
+    def SetPriority(self, Value):
+        self.__Priority = Value
+        if Value != PRIORITY_NORMAL:
+            self.__Manager._Prioritize()
         
-        elif (self.__State == TIMER_STATE_RUNNINGINITIAL) or (self.__State == TIMER_STATE_RUNNING):
-            self.__DebugPrint("Resume(): Warning: already in RUNNING mode")
-            self.__Error = T_ERROR_ALREADY_SWITCHED
-            return False
+    ########## Getter/Setter functions #########
+    def GetManager(self):
+        return self.__Manager
+    
+    def GetSlack(self):
+        return self.__Slack
+    
+    def GetPriority(self):
+        return self.__Priority
+    
+    def GetJitter(self):
+        return self.__Jitter
+    
+    def GetPhase(self):
+        ## Shift of the whole schedule, added to the initial interval
+        return SpreadPhase(self.__Spread, self.__SpreadFraction, self.GetInterval())
+    
+    def GetName(self):
+        return self.__Name
+    
+    def GetState(self):
+        return self.__State
+    
+    def GetLastFuture(self):
+        return self.__Invoker.GetLastFuture()
+    
+    def GetStats(self):
+        ## None unless created with Statistics=True
+        return self.__Stats.Snapshot() if self.__Stats is not None else None
+    
+    def WaitForState(self, State, Timeout = None):
+        ## Blocks till the timer is in State. False on timeout or if the
+        ## timer is terminated first
+        Limit = None if Timeout is None else Clock() + Timeout
+        with self.__StateChanged:
+            self.__Waiting += 1
+            try:
+                while self.__State != State:
+                    if self.__State == TIMER_STATE_TERMINATED:
+                        return False
+                    Remaining = None if Limit is None else Limit - Clock()
+                    if Remaining is not None and Remaining <= 0:
+                        return False
+                    self.__StateChanged.wait(Remaining)
+                return True
+            finally:
+                self.__Waiting -= 1
+    
+    ########### Control functions ##########
+    def _Deliver(self, Message, Done):
+        ## Control messages go through the manager queue
+        self.__Manager._Post(self, Message, Done)
+
+
+class SelectorWakeup(object):
+    ## Wakeup source of TimerManager(WakeupMode=WAKEUP_SELECTOR), Unix only.
+    ## A self-pipe for the messages and, where os.timerfd_create exists, a
+    ## kernel timer armed at the exact deadline, so the dispatcher blocks 
+    ## with no timeout at all. Without timerfd select() gets a microsecond 
+    ## timeout. On Linux both sit behind one epoll descriptor, fileno(), 
+    ## which fits any outside select/poll/epoll loop
+    
+    def __init__(self):
+        from fcntl import fcntl, F_GETFL, F_SETFL
+        from os import O_NONBLOCK
+        self.__Read, self.__Write = pipe()
+        for Descriptor in (self.__Read, self.__Write):
+            fcntl(Descriptor, F_SETFL, fcntl(Descriptor, F_GETFL) | O_NONBLOCK)
         
-        elif self.__State == TIMER_STATE_SUSPENDED:
-            self.__MsgQueue.put_nowait((MESSAGE_RESUME, 0, 0))
-            self.__DebugPrint("Resume(): Notice: message is sent")
-            self.__Error = T_SUCCESS
+        ## timerfd deadlines are CLOCK_MONOTONIC, so is Clock then
+        self.__Timer = None
+        if timerfd_create is not None and Clock is monotonic:
+            self.__Timer = timerfd_create(CLOCK_MONOTONIC, flags = TFD_NONBLOCK | TFD_CLOEXEC)
+        
+        self.__Poll = None
+        if epoll is not None:
+            self.__Poll = epoll()
+            self.__Poll.register(self.__Read, EPOLLIN)
+            if self.__Timer is not None:
+                self.__Poll.register(self.__Timer, EPOLLIN)
+    
+    def fileno(self):
+        return self.__Poll.fileno() if self.__Poll is not None else self.__Read
+    
+    def HasTimer(self):
+        return self.__Timer is not None
+    
+    def Notify(self):
+        ## Any thread. A full pipe already means a pending wakeup
+        try:
+            write(self.__Write, b'\0')
+        except (OSError, TypeError):
+            pass
+    
+    def Arm(self, Deadline):
+        ## Absolute deadline on Clock, None disarms
+        if self.__Timer is not None:
+            timerfd_settime(self.__Timer, flags = TFD_TIMER_ABSTIME, initial = Deadline if Deadline is not None else 0)
+    
+    def Wait(self, Deadline, Now):
+        if self.__Timer is not None:
+            self.Arm(Deadline)
+            Timeout = None
+        else:
+            Timeout = None if Deadline is None else max(Deadline - Now, 0)
+        select([self], [], [], Timeout)
+        self.Clear()
+    
+    def Clear(self):
+        ## Takes the pending notifications and timer expirations
+        for Descriptor in (self.__Read, self.__Timer):
+            while Descriptor is not None:
+                try:
+                    if not read(Descriptor, 512):
+                        break
+                except OSError as Error:
+                    if Error.errno == EAGAIN:
+                        break
+                    raise
+    
+    def Close(self):
+        Descriptors = [self.__Read, self.__Write, self.__Timer]
+        self.__Read = self.__Write = self.__Timer = None
+        if self.__Poll is not None:
+            self.__Poll.close()
+        for Descriptor in Descriptors:
+            if Descriptor is not None:
+                close(Descriptor)
+
+
+class ScheduledCall(object):
+    ## Token of one ScheduleAt()/ScheduleAfter() call
+    __slots__ = ('Deadline', 'FunctionProc', 'Args', 'KWArgs', 'Queue')
+    
+    def __init__(self, Deadline, FunctionProc, Args, KWArgs, Queue):
+        self.Deadline = Deadline
+        ## None once the call is run or cancelled
+        self.FunctionProc = FunctionProc
+        self.Args = Args
+        self.KWArgs = KWArgs
+        self.Queue = Queue
+    
+    def Cancel(self):
+        ## False if the call is already run or cancelled
+        return self.Queue.Cancel(self)
+    
+    def IsPending(self):
+        return self.FunctionProc is not None
+
+
+class OneShotQueue(object):
+    ## Binary heap of one-shot calls with lazy deletion: a cancelled call 
+    ## only drops its function and stays in the heap till it reaches the 
+    ## top. Once the cancelled entries outnumber the live ones the heap is 
+    ## rebuilt, so cancelling is O(1) amortized and the heap is at most 
+    ## twice the live calls
+    
+    def __init__(self):
+        self.__Lock = Lock()
+        ## (Deadline, Sequence, ScheduledCall)
+        self.__Heap = []
+        self.__Sequence = 0
+        self.__Live = 0
+        self.__Cancelled = 0
+    
+    def __len__(self):
+        return self.__Live
+    
+    def Push(self, Call):
+        ## Returns whether the call is the nearest one
+        with self.__Lock:
+            self.__Sequence += 1
+            heappush(self.__Heap, (Call.Deadline, self.__Sequence, Call))
+            self.__Live += 1
+            return self.__Heap[0][2] is Call
+    
+    def Cancel(self, Call):
+        with self.__Lock:
+            if Call.FunctionProc is None:
+                return False
+            Call.FunctionProc = Call.Args = Call.KWArgs = None
+            self.__Live -= 1
+            self.__Cancelled += 1
+            if self.__Cancelled > self.__Live and self.__Cancelled >= ONESHOT_COMPACT_MIN:
+                self.__Compact()
             return True
+    
+    def NextDeadline(self):
+        with self.__Lock:
+            Heap = self.__Heap
+            while Heap and Heap[0][2].FunctionProc is None:
+                heappop(Heap)
+                self.__Cancelled -= 1
+            return Heap[0][0] if Heap else None
+    
+    def PopDue(self, Now):
+        ## (FunctionProc, Args, KWArgs) of the calls to run now
+        Due = []
+        with self.__Lock:
+            Heap = self.__Heap
+            while Heap and Heap[0][0] <= Now:
+                Call = heappop(Heap)[2]
+                if Call.FunctionProc is None:
+                    self.__Cancelled -= 1
+                    continue
+                Due.append((Call.FunctionProc, Call.Args, Call.KWArgs))
+                Call.FunctionProc = Call.Args = Call.KWArgs = None
+                self.__Live -= 1
+        return Due
+    
+    def __Compact(self):
+        self.__Heap = [Entry for Entry in self.__Heap if Entry[2].FunctionProc is not None]
+        heapify(self.__Heap)
+        self.__Cancelled = 0
+
+
+def EntryPriority(Entry):
+    return Entry.Item.GetPriority() if Entry.Item is not None else PRIORITY_MIN
+
+
+class TimerManager(Thread):
+    
+    def __init__(self, Store = STORE_HEAP, DEBUG = False, PROFILE = False, TimeSource = None, WakeupMode = WAKEUP_EVENT,
+                 BudgetCalls = BUDGET_CALLS_MIN, BudgetTime = BUDGET_TIME_MIN, Overload = OVERLOAD_DEFER):
+        
+        ## Had to be the first
+        Thread.__init__(self)
+        
+        # Received parameters 
+        ## Clock of all the deadlines: the monotonic Clock or a VirtualClock
+        self.__Clock = TimeSource if TimeSource is not None else Clock
+        ## WAKEUP_EVENT or WAKEUP_SELECTOR
+        self.__Selector = SelectorWakeup() if WakeupMode == WAKEUP_SELECTOR else None
+        ## STORE_HEAP, STORE_WHEEL or a ready store instance
+        if Store == STORE_HEAP:
+            self.__Store = HeapTimerStore(self.__Clock())
+        elif Store == STORE_WHEEL:
+            self.__Store = WheelTimerStore(self.__Clock())
         else:
-            self.__DebugPrint("Resume(): " + self.__OutputErrorState([TIMER_STATE_SUSPENDED]))
-            self.__Error = T_ERROR_INCORRECT_STATE
-            return False
+            self.__Store = Store
+        ## Most timer functions (0: no limit) and seconds (0: no limit) of 
+        ## one pass. The rest of the due ticks is deferred or shed
+        self.SetBudgetCalls(BudgetCalls)
+        self.SetBudgetTime(BudgetTime)
+        self.__Overload = Overload
+        
+        ## Debug related
+        self.__DEBUG = DEBUG 
+        self.__PROFILE = PROFILE
+        
+        # Inner variables
+        ## Timers which are not terminated yet. Changed on the dispatcher
+        ## thread only, under __Lock as GetStats() reads them from any thread
+        self.__Timers = set()
+        ## Statistics of the terminated timers, so the totals never go down
+        self.__Retired = AggregateStats(())
+        self.__Lock = Lock()
+        ## Dispatcher wakeups and the worst shared queue depth seen
+        self.__Wakeups = 0
+        self.__QueueDepthMax = 0
+        ## Wakeups saved by firing timers within their Slack in one pass
+        self.__Coalesced = 0
+        ## Registered timers with a Slack, none: no need to look for the wakeup.
+        ## Kept up to date by SetSlack() as well
+        self.__SlackTimers = set()
+        ## Set once a timer has a priority, due timers are sorted from then on
+        self.__Prioritized = False
+        ## Passes over the budget and the ticks shed and deferred by them
+        self.__Overloads = 0
+        self.__ShedTicks = 0
+        self.__DeferredTicks = 0
+        ## Batch mode calls of the current pass: {(FunctionProc, Executor): (Timers, Calls)}
+        self.__Collected = {}
+        ## Merged function runs and the timer ticks they served
+        self.__Batches = 0
+        self.__BatchedCalls = 0
+        ## Shared by the timers for WaitForState(): waiters check their own
+        ## timer, and a timer notifies only while it has waiters
+        self.__StateChanged = Condition()
+        ## Lightweight timers (AddLightTimer), their calls and failed calls
+        self.__Light = LightTimerTable()
+        self.__LightFired = 0
+        self.__LightErrors = 0
+        ## ScheduleAt()/ScheduleAfter() calls
+        self.__OneShots = OneShotQueue()
+        self.__OneShotsFired = 0
+        self.__OneShotErrors = 0
+        
+        # Events
+        self.__eWakeup = Event()
+        self.__eTerminate = Event()
+        
+        # Queue init: shared by all the timers, so it's unbounded
+        self.__MsgQueue = Queue(MANAGER_QUEUE_SIZE)
+        ## Set once the queue is not read any more
+        self.__Stopped = False
+        ## Messages collected by a group operation of the calling thread
+        self.__Batch = local()
     
-    @CheckTerminatedState
-    def Deactivate(self, DisableStateCheck = False):
-        self.__DebugPrint("Deactivate(): In function")
+    def run(self):
         
-        if DisableStateCheck:
-            self.__MsgQueue.put_nowait((MESSAGE_DEACTIVATE, 0, 0))
-            self.__DebugPrint("Deactivate(): Notice: message is sent")
-            self.__Error = T_SUCCESS
-            return True
+        ## Main cycle
+        while not self.__eTerminate.is_set():
+            self.__eWakeup.clear()
+            Wakeup = self.__Pass()
+            if self.__eTerminate.is_set():
+                break
+            
+            ## Sleep until the nearest deadline or the next message
+            if self.__Selector is not None:
+                self.__Selector.Wait(Wakeup, self.__Clock())
+                continue
+            Timeout = None
+            if Wakeup is not None:
+                Timeout = max(Wakeup - self.__Clock(), 0)
+            self.__eWakeup.wait(Timeout)
         
-        elif self.__State == TIMER_STATE_INIT:
-            self.__DebugPrint("Deactivate(): Warning: already in INIT mode")
-            self.__Error = T_ERROR_ALREADY_SWITCHED
+        self.__Stop()
+    
+    def fileno(self):
+        ## WAKEUP_SELECTOR only: readable when RunPending() has work to do
+        return self.__Selector.fileno()
+    
+    def RunPending(self):
+        ## One dispatcher pass in the calling thread, for a manager which is
+        ## not started and is driven by an outside loop: call it when 
+        ## fileno() is readable or the returned timeout is over. Returns the
+        ## seconds till the next deadline, None if there is none
+        if self.is_alive() or self.__Stopped:
+            return None
+        if self.__Selector is not None:
+            self.__Selector.Clear()
+        Wakeup = self.__Pass()
+        if self.__eTerminate.is_set():
+            self.__Stop()
+            return None
+        if self.__Selector is not None:
+            self.__Selector.Arm(Wakeup)
+        return None if Wakeup is None else max(Wakeup - self.__Clock(), 0)
+    
+    def Simulate(self, Until):
+        ## Deterministic run in the calling thread, for a manager created with
+        ## a VirtualClock and not started: the clock jumps from one wakeup to
+        ## the next, so the timers fire in deadline order with no sleeping.
+        ## Returns False once the manager is terminated
+        if self.is_alive() or not isinstance(self.__Clock, VirtualClock):
             return False
         
-        elif (self.__State == TIMER_STATE_SUSPENDED) or (self.__State == TIMER_STATE_RUNNING) or (self.__State == TIMER_STATE_RUNNINGINITIAL):
-            self.__MsgQueue.put_nowait((MESSAGE_DEACTIVATE, 0, 0))
-            self.__DebugPrint("Deactivate(): Notice: message is sent")
-            self.__Error = T_SUCCESS
+        while not self.__eTerminate.is_set():
+            Wakeup = self.__Pass()
+            ## Functions may have sent messages, they are processed at the same time
+            if not self.__MsgQueue.empty():
+                continue
+            if Wakeup is None or Wakeup > Until:
+                break
+            self.__Clock.Set(Wakeup)
+        
+        if not self.__eTerminate.is_set():
+            self.__Clock.Set(Until)
             return True
-        else:
-            self.__DebugPrint("Deactivate(): " + self.__OutputErrorState([TIMER_STATE_SUSPENDED, TIMER_STATE_RUNNING, TIMER_STATE_RUNNINGINITIAL]))
-            self.__Error = T_ERROR_INCORRECT_STATE
-            return False
+        if not self.__Stopped:
+            self.__Stop()
+        return False
     
-    @CheckTerminatedState
-    def Terminate(self, DisableStateCheck = False):
-        self.__DebugPrint("Terminate(): In function")
+    def __Pass(self):
+        ## One dispatcher pass: returns the time of the next wakeup, None if
+        ## there are no deadlines
+        self.__Wakeups += 1
         
-        ## Don't merge with next condition due to clarity
-        if DisableStateCheck:
-            self.__MsgQueue.put_nowait((MESSAGE_TERMINATE, 0, 0))
-            self.__DebugPrint("Terminate(): Notice: message is sent")
-            self.__Error = T_SUCCESS
-            return True
+        ##################################
+        ##### Message Processing Loop ####
+        ##################################
+        Depth = self.__MsgQueue.qsize()
+        if Depth > self.__QueueDepthMax:
+            self.__QueueDepthMax = Depth
         
-        elif self.__State != TIMER_STATE_IDLE:
-            self.__MsgQueue.put_nowait((MESSAGE_TERMINATE, 0, 0))
-            self.__DebugPrint("Terminate(): Notice: message is sent")
-            self.__Error = T_SUCCESS
-            return True
+        while True:
+            try:
+                Timer, Message, SentAt, Done = self.__MsgQueue.get_nowait()
+            except Empty:
+                break
+            
+            ## Message for the manager itself
+            if Timer is None:
+                if Message[0] == MESSAGE_TERMINATE:
+                    self.__DebugPrint(">> Received MESSAGE_TERMINATE")
+                    self.__eTerminate.set()
+                elif Message[0] == MESSAGE_BATCH:
+                    for Timer, TimerMessage, TimerDone in Message[1]:
+                        self.__Dispatch(Timer, TimerMessage, SentAt, TimerDone, Depth)
+                elif Message[0] == MESSAGE_SNAPSHOT:
+                    Message[1].extend(self.__SnapshotRecords())
+                if Done is not None:
+                    Done._Resolve()
+                continue
+            
+            self.__Dispatch(Timer, Message, SentAt, Done, Depth)
+        
+        if self.__eTerminate.is_set():
+            return None
+        
+        ##################################
+        ##### Due Timers Processing ######
+        ##################################
+        Now = self.__Clock()
+        Deadline = self.__Store.NextDeadline()
+        Wakeup = self.__WakeupTime(Deadline)
+        if Wakeup is not None and Wakeup <= Now:
+            Due = self.__Store.PopDue(Now)
+            ## Every later deadline would have been a wakeup of its own
+            if Wakeup > Deadline:
+                self.__Coalesced += len(set(Entry.Deadline for Entry in Due if Entry.Deadline > Deadline))
+            if self.__Prioritized and len(Due) > 1:
+                ## Stable: deadline order within a priority
+                Due.sort(key = EntryPriority, reverse = True)
+            if self.__BudgetCalls or self.__BudgetTime:
+                self.__RunBudgeted(Due, Now)
+            else:
+                for Entry in Due:
+                    ## Might be cancelled by a function of this very pass
+                    if Entry.Item is not None:
+                        Entry.Item._Expire(Now)
+            Wakeup = self.__WakeupTime(self.__Store.NextDeadline())
+        
+        ## Batch mode calls of the due timers and of the messages (catch-up
+        ## of Restore()), whether a store entry was due or not
+        if self.__Collected:
+            self.__RunBatches()
+        
+        ## Lightweight timers
+        Deadline = self.__Light.NextDeadline()
+        if Deadline is not None and Deadline <= Now:
+            self.__RunLightTimers(Now)
+            Deadline = self.__Light.NextDeadline()
+        if Deadline is not None and (Wakeup is None or Deadline < Wakeup):
+            Wakeup = Deadline
+        
+        ## One-shot calls
+        Deadline = self.__OneShots.NextDeadline()
+        if Deadline is not None and Deadline <= Now:
+            self.__RunOneShots(Now)
+            Deadline = self.__OneShots.NextDeadline()
+        if Deadline is not None and (Wakeup is None or Deadline < Wakeup):
+            Wakeup = Deadline
+        return Wakeup
+    
+    def __Stop(self):
+        ## Nothing can drive the timers any more
+        for Timer in list(self.__Timers):
+            Timer._Shutdown()
+        
+        ## Messages which will never be processed
+        self.__Stopped = True
+        while True:
+            try:
+                Timer, Message, SentAt, Done = self.__MsgQueue.get_nowait()
+            except Empty:
+                break
+            Batch = Message[1] if Timer is None and Message[0] == MESSAGE_BATCH else [(Timer, Message, Done)]
+            for Timer, Message, Done in Batch:
+                if Done is not None:
+                    Done._Resolve()
+        if self.__Selector is not None:
+            self.__Selector.Close()
+        self.__DebugPrint("Manager is terminated")
+    
+    def __WakeupTime(self, Deadline):
+        ## Latest moment no timer is later than its Slack: min(Deadline + Slack).
+        ## Only the deadlines before the nearest one plus its slack can matter
+        if Deadline is None or not self.__SlackTimers:
+            return Deadline
+        Wakeup = None
+        Until = Deadline
+        ## Second pass: deadlines before the first estimate with less slack
+        for Pass in range(2):
+            for Entry in self.__Store.Window(Until):
+                Latest = Entry.Deadline + Entry.Item.GetSlack()
+                if Wakeup is None or Latest < Wakeup:
+                    Wakeup = Latest
+            ## No entries: the deadline is a wheel cascade point
+            if Wakeup is None or Wakeup == Deadline:
+                return Deadline
+            Until = Wakeup
+        return Wakeup
+    
+    def __RunBatches(self):
+        Collected, self.__Collected = self.__Collected, {}
+        for (FunctionProc, Executor), (Timers, Calls) in Collected.items():
+            self.__Batches += 1
+            self.__BatchedCalls += len(Calls)
+            try:
+                if Executor is None:
+                    FunctionProc(Calls)
+                else:
+                    Executor.submit(FunctionProc, Calls)
+            except Exception as Error:
+                for Timer in Timers:
+                    Timer._Failed(Error)
+    
+    def __SnapshotRecords(self):
+        ## Dispatcher thread (or no thread at all): the wall time and the
+        ## records of one moment
+        Now = self.__Clock()
+        Records = [Timer._Snapshot(Now) for Timer in list(self.__Timers)]
+        ## Sorted by name: the same fleet gives the same file
+        Records = sorted((Record for Record in Records if Record is not None), key = lambda Record: Record[-1])
+        return [time()] + Records
+    
+    def __RunBudgeted(self, Due, Now):
+        ## At least one timer runs per pass, whatever the budget
+        Calls = 0
+        Limit = Clock() + self.__BudgetTime if self.__BudgetTime else None
+        for Position, Entry in enumerate(Due):
+            if Entry.Item is None:
+                continue
+            if Calls and ((self.__BudgetCalls and Calls >= self.__BudgetCalls) or (Limit is not None and Clock() >= Limit)):
+                self.__Overrun(Due[Position:], Now)
+                return
+            Entry.Item._Expire(Now)
+            Calls += 1
+    
+    def __Overrun(self, Rest, Now):
+        ## Ticks over the budget: low priority ones are shed (OVERLOAD_SHED),
+        ## the others stay due and run first in the next pass, their missed
+        ## ticks coalesced by the CatchUp policy. Both go in ahead of the 
+        ## timers which ran, so the next overrun hits those instead
+        self.__Overloads += 1
+        for Entry in Rest:
+            Timer = Entry.Item
+            if Timer is None:
+                continue
+            if self.__Overload == OVERLOAD_SHED and Timer.GetPriority() < PRIORITY_HIGH and Timer._Shed(Now):
+                self.__ShedTicks += 1
+            else:
+                Timer._Defer(Entry.Deadline)
+                self.__DeferredTicks += 1
+    
+    def __RunLightTimers(self, Now):
+        Due = self.__Light.PopDue(Now)
+        self.__LightFired += len(Due)
+        for FunctionProc in Due:
+            try:
+                FunctionProc()
+            except Exception as Error:
+                self.__LightErrors += 1
+                self.__DebugPrint("Light timer function raised an exception: " + repr(Error))
+    
+    def __RunOneShots(self, Now):
+        Due = self.__OneShots.PopDue(Now)
+        self.__OneShotsFired += len(Due)
+        for FunctionProc, Args, KWArgs in Due:
+            try:
+                FunctionProc(*Args, **KWArgs)
+            except Exception as Error:
+                self.__OneShotErrors += 1
+                self.__DebugPrint("Scheduled function raised an exception: " + repr(Error))
+    
+    def __Dispatch(self, Timer, Message, SentAt, Done, Depth):
+        ## Depth: shared queue depth at the start of the pass
+        if Message[0] == MESSAGE_INIT and Timer not in self.__Timers:
+            with self.__Lock:
+                self.__Timers.add(Timer)
+                if Timer.GetSlack():
+                    self.__SlackTimers.add(Timer)
+        Timer._ProcessMessage(Message, self.__Clock(), SentAt, Depth)
+        if Done is not None:
+            Done._Resolve()
+    
+    def __Notify(self):
+        self.__eWakeup.set()
+        if self.__Selector is not None:
+            self.__Selector.Notify()
+    
+    ########## Timer side ###########
+    def _Post(self, Timer, Message, Done = None):
+        ## Returns Done, resolved once the message is processed
+        Batch = getattr(self.__Batch, 'Messages', None)
+        if Batch is not None:
+            Batch.append((Timer, Message, Done))
+            return Done
+        return self.__Enqueue(Timer, Message, Done)
+    
+    def __Enqueue(self, Timer, Message, Done):
+        self.__MsgQueue.put_nowait((Timer, Message, self.__Clock(), Done))
+        self.__Notify()
+        ## Too late, the queue is not read any more
+        if Done is not None and self.__Stopped:
+            Done._Resolve()
+        return Done
+    
+    def _BeginBatch(self):
+        ## Messages of this thread are collected till _EndBatch(). Returns
+        ## False for a nested call, which must not end the batch
+        if getattr(self.__Batch, 'Messages', None) is not None:
+            return False
+        self.__Batch.Messages = []
+        return True
+    
+    def _EndBatch(self, Owner):
+        if not Owner:
+            return
+        Batch, self.__Batch.Messages = self.__Batch.Messages, None
+        ## The whole batch is one queue item and one wakeup
+        if Batch:
+            self.__MsgQueue.put_nowait((None, (MESSAGE_BATCH, Batch, 0), self.__Clock(), None))
+            self.__Notify()
+            if self.__Stopped:
+                for Timer, Message, Done in Batch:
+                    if Done is not None:
+                        Done._Resolve()
+    
+    def _Schedule(self, Timer, Deadline, Front = False):
+        ## Front: ahead of the timers due at the same time (shed and deferred ticks)
+        if Front:
+            return self.__Store.Insert(Deadline, Timer, True)
+        return self.__Store.Insert(Deadline, Timer)
+    
+    def _Cancel(self, Entry):
+        self.__Store.Cancel(Entry)
+    
+    def _Collect(self, Timer, Key, Call):
+        Batch = self.__Collected.get(Key)
+        if Batch is None:
+            Batch = self.__Collected[Key] = ([], [])
+        Batch[0].append(Timer)
+        Batch[1].append(Call)
+    
+    def _SlackChanged(self, Timer):
+        ## Any thread: the timers count from MESSAGE_INIT till _Unregister()
+        with self.__Lock:
+            if not Timer.GetSlack():
+                self.__SlackTimers.discard(Timer)
+            elif Timer in self.__Timers:
+                self.__SlackTimers.add(Timer)
+    
+    def _StateCondition(self):
+        return self.__StateChanged
+    
+    def _Prioritize(self):
+        self.__Prioritized = True
+    
+    def _Unregister(self, Timer):
+        with self.__Lock:
+            if Timer in self.__Timers:
+                self.__Timers.remove(Timer)
+                self.__SlackTimers.discard(Timer)
+                Stats = Timer.GetStats()
+                if Stats is not None:
+                    Retired = AggregateStats((self.__Retired, Stats))
+                    ## Counters only: the timer and its queue are gone
+                    Retired['Timers'] = Retired['QueueDepth'] = 0
+                    self.__Retired = Retired
+    
+    def _Print(self, Message):
+        print(Message)
+    
+    ########## Getter/Setter functions #########
+    def GetTimerCount(self):
+        return len(self.__Timers)
+    
+    def GetStore(self):
+        return self.__Store
+    
+    def GetClock(self):
+        return self.__Clock
+    
+    @Constraint(BUDGET_CALLS_MIN, BUDGET_CALLS_MAX)
+    def SetBudgetCalls(self, Value):
+        self.__BudgetCalls = int(Value)
+    
+    @Constraint(BUDGET_TIME_MIN, BUDGET_TIME_MAX)
+    def SetBudgetTime(self, Value):
+        ## Real time, also under a VirtualClock
+        self.__BudgetTime = Value
+    
+    def GetBudget(self):
+        return self.__BudgetCalls, self.__BudgetTime
+    
+    def GetStats(self):
+        ## Aggregate of the timers created with Statistics=True, terminated
+        ## ones included ('Timers' counts the live ones)
+        with self.__Lock:
+            Retired, Timers = self.__Retired, list(self.__Timers)
+        Stats = AggregateStats([Retired] + [Timer.GetStats() for Timer in Timers])
+        Stats['Wakeups'] = self.__Wakeups
+        Stats['CoalescedWakeups'] = self.__Coalesced
+        Stats['Batches'] = self.__Batches
+        Stats['BatchedCalls'] = self.__BatchedCalls
+        Stats['LightTimers'] = len(self.__Light)
+        Stats['LightFired'] = self.__LightFired
+        Stats['LightErrors'] = self.__LightErrors
+        Stats['OneShots'] = len(self.__OneShots)
+        Stats['OneShotsFired'] = self.__OneShotsFired
+        Stats['OneShotErrors'] = self.__OneShotErrors
+        Stats['Overloads'] = self.__Overloads
+        Stats['ShedTicks'] = self.__ShedTicks
+        Stats['DeferredTicks'] = self.__DeferredTicks
+        Stats['QueueDepthMax'] = max(Stats['QueueDepthMax'], self.__QueueDepthMax)
+        return Stats
+    
+    ########### Output Debug information ##########
+    def __DebugPrint(self, Message):
+        if self.__DEBUG:
+            if self.__PROFILE: 
+                Message = strftime("[%H:%M:%S.", gmtime()) + (("%.3f" % time()).split("."))[1] + "]\t" + Message
+            self._Print(Message)
+    
+    ########## Behaviour functions ###########
+    def CreateTimer(self, *args, **kwargs):
+        return ManagedTimer(self, *args, **kwargs)
+    
+    def CreateGroup(self, Timers = ()):
+        return TimerGroup(self, Timers)
+    
+    ########## Lightweight timers ###########
+    ## Deadline, interval, count and FunctionProc only: no name, no state
+    ## machine, no messages. Handles are plain integers. TimerCount 0 and
+    ## Interval > 0 is a periodic timer, missed ticks are skipped
+    def AddLightTimer(self, Initial, Interval, FunctionProc, TimerCount = TIMER_COUNT_MIN):
+        Initial = min(max(Initial, TIMER_INTERVAL_MIN), TIMER_INTERVAL_INITIAL_MAX)
+        Interval = min(max(Interval, TIMER_INTERVAL_MIN), TIMER_INTERVAL_MAX)
+        TimerCount = min(max(TimerCount, TIMER_COUNT_MIN), TIMER_COUNT_MAX)
+        Handle, Nearest = self.__Light.Add(self.__Clock() + Initial, Interval, TimerCount, FunctionProc)
+        if Nearest:
+            self.__Notify()
+        return Handle
+    
+    def CancelLightTimer(self, Handle):
+        return self.__Light.Cancel(Handle)
+    
+    def PauseLightTimer(self, Handle):
+        return self.__Light.Pause(Handle, self.__Clock())
+    
+    def ResumeLightTimer(self, Handle):
+        Nearest = self.__Light.Resume(Handle, self.__Clock())
+        if Nearest:
+            self.__Notify()
+        return Nearest is not None
+    
+    def GetLightTimerState(self, Handle):
+        ## TIMER_STATE_RUNNING, TIMER_STATE_SUSPENDED or TIMER_STATE_TERMINATED
+        return self.__Light.GetState(Handle)
+    
+    ########## One-shot calls ###########
+    ## A single call of FunctionProc, no timer at all. Deadline is on the 
+    ## manager clock (GetClock()), the delay has no lower limit. Returns a
+    ## ScheduledCall; its Cancel() is cheap, so calls which are usually 
+    ## cancelled (timeouts) cost next to nothing
+    def ScheduleAt(self, Deadline, FunctionProc, FunctionArgs = [], FunctionKWArgs = {}):
+        Call = ScheduledCall(Deadline, FunctionProc, FunctionArgs, FunctionKWArgs, self.__OneShots)
+        if self.__OneShots.Push(Call):
+            self.__Notify()
+        return Call
+    
+    def ScheduleAfter(self, Delay, FunctionProc, FunctionArgs = [], FunctionKWArgs = {}):
+        return self.ScheduleAt(self.__Clock() + max(Delay, 0), FunctionProc, FunctionArgs, FunctionKWArgs)
+    
+    ########## Snapshot/Restore ###########
+    def Snapshot(self, Path):
+        ## Writes state, remaining count, intervals and next deadline of all
+        ## the timers to Path (replaced at once). The function, arguments
+        ## and the other options are not saved: timers are restored by Name.
+        ## Returns the number of timers written
+        if self.is_alive() and current_thread() is not self:
+            ## Records are taken by the dispatcher. Past an open batch of this
+            ## thread: its messages are not sent before the batch ends
+            Records = []
+            self.__Enqueue(None, (MESSAGE_SNAPSHOT, Records, 0), Completion()).Wait()
+            if not Records:
+                return 0
         else:
-            self.__DebugPrint(">> Terminate(): " + self.__OutputErrorState([TIMER_STATE_IDLE], Invert=True))
-            self.__Error = T_ERROR_INCORRECT_STATE
+            ## Dispatcher thread (a timer function) or no dispatcher thread:
+            ## nobody else touches the timers
+            Records = self.__SnapshotRecords()
+        
+        Wall, Records = Records[0], Records[1:]
+        Temporary = Path + '.tmp'
+        with open(Temporary, 'wb') as File:
+            File.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(Records), Wall))
+            Chunk = []
+            for Record in Records:
+                Name = Record[-1].encode('utf-8')
+                Chunk.append(SNAPSHOT_RECORD.pack(Record[0], Record[1], Record[2], Record[3], len(Name), *Record[4:-1]))
+                Chunk.append(Name)
+                if len(Chunk) >= 2048:
+                    File.write(b''.join(Chunk))
+                    del Chunk[:]
+            File.write(b''.join(Chunk))
+        try:
+            from os import replace
+        except ImportError:
+            from os import rename as replace
+        replace(Temporary, Path)
+        return len(Records)
+    
+    def Restore(self, Path, Resolver, CatchUp = CATCHUP_SKIP, CatchUpLimit = CATCHUP_LIMIT_DEFAULT, **Options):
+        ## Creates the timers of a snapshot in one batch, no thread per timer.
+        ## Resolver(Name) returns the FunctionProc, or None to leave the 
+        ## timer out. Options go to every CreateTimer() and win over the saved
+        ## values. Time spent down counts: deadlines missed meanwhile are 
+        ## skipped (CATCHUP_SKIP, a one-shot timer is terminated), fired once
+        ## (CATCHUP_ONCE) or replayed up to CatchUpLimit times 
+        ## (CATCHUP_BURST). Returns the timers
+        Timers = []
+        with open(Path, 'rb') as File:
+            Map = mmap(File.fileno(), 0, access = ACCESS_READ)
+        try:
+            if len(Map) < SNAPSHOT_HEADER.size:
+                raise ValueError("Not a PyWT snapshot: " + Path)
+            Magic, Version, Count, Wall = SNAPSHOT_HEADER.unpack_from(Map, 0)
+            if Magic != SNAPSHOT_MAGIC or Version != SNAPSHOT_VERSION:
+                raise ValueError("Not a PyWT snapshot: " + Path)
+            Down = max(time() - Wall, 0)
+            Now = self.__Clock()
+            Policy = (CatchUp, min(max(CatchUpLimit, CATCHUP_LIMIT_MIN), CATCHUP_LIMIT_MAX))
+            
+            ## One queue item and one wakeup for the whole fleet
+            Owner = self._BeginBatch()
+            try:
+                Offset = SNAPSHOT_HEADER.size
+                for Index in range(Count):
+                    (State, SavedState, Priority, TimerCatchUp, Length, TimerCount,
+                     Initial, Interval, Next, Delay, Slack) = SNAPSHOT_RECORD.unpack_from(Map, Offset)
+                    Offset += SNAPSHOT_RECORD.size
+                    Name = Map[Offset:Offset + Length].decode('utf-8')
+                    Offset += Length
+                    
+                    FunctionProc = Resolver(Name)
+                    if FunctionProc is None:
+                        continue
+                    Arguments = {'StartCondition': TIMER_NO_ACTIVATE, 'TimerCount': TimerCount, 'Name': Name,
+                                 'Slack': Slack, 'Priority': Priority, 'CatchUp': TimerCatchUp}
+                    Arguments.update(Options)
+                    Timer = self.CreateTimer(Initial, Interval, FunctionProc, **Arguments)
+                    Timers.append(Timer)
+                    if State == TIMER_STATE_INIT:
+                        continue
+                    
+                    ## A pause with a delay might have ended while down
+                    if State == TIMER_STATE_SUSPENDED and Delay != 0:
+                        Delay -= Down
+                        if Delay <= 0:
+                            State, Next = SavedState, Next + Delay
+                            Delay = 0
+                    elif State != TIMER_STATE_SUSPENDED:
+                        Next -= Down
+                    self._Post(Timer, (MESSAGE_RESTORE, (State, SavedState, Now + Next, Delay), Policy))
+            finally:
+                self._EndBatch(Owner)
+        finally:
+            Map.close()
+        return Timers
+    
+    def Terminate(self):
+        self._Post(None, (MESSAGE_TERMINATE, 0, 0))
+        return True
+
+
+class TimerGroup(object):
+    ## Related timers of one TimerManager controlled at once. A group
+    ## function costs one manager queue message and one wakeup whatever
+    ## the group size; every member still runs its own state check, sets
+    ## its own error code and reports its own result
+    
+    def __init__(self, Manager, Timers = ()):
+        self.__Manager = Manager
+        self.__Timers = []
+        for Timer in Timers:
+            self.Add(Timer)
+    
+    def __len__(self):
+        return len(self.__Timers)
+    
+    def __iter__(self):
+        return iter(list(self.__Timers))
+    
+    ########## Members ###########
+    def Add(self, Timer):
+        ## Only the timers of the group manager can share its messages
+        if Timer.GetManager() is not self.__Manager:
+            return False
+        if Timer not in self.__Timers:
+            self.__Timers.append(Timer)
+        return True
+    
+    def Remove(self, Timer):
+        if Timer not in self.__Timers:
             return False
+        self.__Timers.remove(Timer)
+        return True
+    
+    def CreateTimer(self, *args, **kwargs):
+        ## Same arguments as TimerManager.CreateTimer(), the timer joins the group
+        Owner = self.__Manager._BeginBatch()
+        try:
+            Timer = self.__Manager.CreateTimer(*args, **kwargs)
+        finally:
+            self.__Manager._EndBatch(Owner)
+        self.__Timers.append(Timer)
+        return Timer
+    
+    def CreateTimers(self, Count, *args, **kwargs):
+        ## Count timers with the same arguments, INIT/ACTIVATE messages of
+        ## all of them go in one batch
+        Owner = self.__Manager._BeginBatch()
+        try:
+            Timers = [self.CreateTimer(*args, **kwargs) for Index in range(Count)]
+        finally:
+            self.__Manager._EndBatch(Owner)
+        return Timers
+    
+    ########## Getter/Setter functions #########
+    def GetManager(self):
+        return self.__Manager
+    
+    def GetTimers(self):
+        return list(self.__Timers)
+    
+    def GetStates(self):
+        return dict((Timer, Timer.GetState()) for Timer in self.__Timers)
+    
+    def GetStats(self):
+        ## Aggregate of the members created with Statistics=True
+        return AggregateStats(Timer.GetStats() for Timer in self.__Timers)
+    
+    def WaitForState(self, State, Timeout = None):
+        ## True once every member is in State
+        Limit = None if Timeout is None else Clock() + Timeout
+        for Timer in list(self.__Timers):
+            if not Timer.WaitForState(State, None if Limit is None else max(Limit - Clock(), 0)):
+                return False
+        return True
+    
+    ########## Group operation ###########
+    def __Apply(self, Operation):
+        ## Returns {Timer: result of the member function}: a Completion or
+        ## False. Members TERMINATED before the call leave the group; the
+        ## rest stay till their messages are applied, even if the timer
+        ## terminates meanwhile (they leave on the next call)
+        Results = {}
+        Members = []
+        Owner = self.__Manager._BeginBatch()
+        try:
+            for Timer in self.__Timers:
+                Terminated = Timer.GetState() == TIMER_STATE_TERMINATED
+                Results[Timer] = Operation(Timer)
+                if not Terminated:
+                    Members.append(Timer)
+        finally:
+            self.__Manager._EndBatch(Owner)
+        self.__Timers = Members
+        return Results
+    
+    ########## Behaviour functions ###########
+    def ChangeIntervals(self, Initial, Interval):
+        return self.__Apply(lambda Timer: Timer.ChangeIntervals(Initial, Interval))
+    
+    ########## Action functions ##############
+    def Activate(self, DisableStateCheck = False):
+        return self.__Apply(lambda Timer: Timer.Activate(DisableStateCheck))
+    
+    def Pause(self, Wait=0, DisableStateCheck = False):
+        return self.__Apply(lambda Timer: Timer.Pause(Wait, DisableStateCheck))
+    
+    def Resume(self, DisableStateCheck = False):
+        return self.__Apply(lambda Timer: Timer.Resume(DisableStateCheck))
+    
+    def Deactivate(self, DisableStateCheck = False):
+        return self.__Apply(lambda Timer: Timer.Deactivate(DisableStateCheck))
+    
+    def Terminate(self, DisableStateCheck = False):
+        return self.__Apply(lambda Timer: Timer.Terminate(DisableStateCheck))
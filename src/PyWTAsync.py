@@ -0,0 +1,368 @@
+# Copyright (c) 2012 Sergey Danielyan a.k.a gahcep
+# 
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+# 
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+## asyncio flavour of WaitableTimer: no thread and no queue per timer,
+## deadlines are loop.call_at() handles. Requires Python 3.7+
+
+import asyncio
+
+from PyWT import (
+    TimerControl, DebugPrinter, Constraint, AlignSchedule,
+    TIMER_COUNT_MIN,
+    CATCHUP_LIMIT_DEFAULT,
+    OVERLAP_LIMIT_MIN, OVERLAP_LIMIT_DEFAULT, OVERLAP_LIMIT_MAX,
+    CATCHUP_SKIP, OVERLAP_ALLOW, OVERLAP_SKIP, OVERLAP_QUEUE,
+    TIMER_ACTIVATE,
+    TIMER_STATE_IDLE, TIMER_STATE_INIT, TIMER_STATE_RUNNINGINITIAL,
+    TIMER_STATE_RUNNING, TIMER_STATE_SUSPENDED, TIMER_STATE_TERMINATED,
+    MESSAGE_INIT, MESSAGE_ACTIVATE, MESSAGE_DEACTIVATE, MESSAGE_PAUSE,
+    MESSAGE_RESUME, MESSAGE_CHANGE, MESSAGE_TERMINATE,
+    T_ERROR_FUNCTION_FAILED,
+    TRACE_STATE, TRACE_MESSAGE, TRACE_CALLBACK_START, TRACE_CALLBACK_END, TRACE_NOTICE,
+)
+
+
+class AsyncWaitableTimer(TimerControl):
+    
+    def __init__(self, 
+                 TimerInitialInterval, TimerContinuousInterval,
+                 FunctionProc,
+                 StartCondition = TIMER_ACTIVATE, 
+                 TimerCount = TIMER_COUNT_MIN, 
+                 DEBUG = False,
+                 PROFILE = False,
+                 FunctionArgs = [], FunctionKWArgs = {},
+                 CatchUp = CATCHUP_SKIP,
+                 CatchUpLimit = CATCHUP_LIMIT_DEFAULT,
+                 Overlap = OVERLAP_ALLOW,
+                 OverlapLimit = OVERLAP_LIMIT_DEFAULT,
+                 OnComplete = None,
+                 Loop = None,
+                 Name = None
+                 ):
+        
+        ## Without an explicit loop the timer has to be created inside it
+        self.__Loop = Loop if Loop is not None else asyncio.get_running_loop()
+        ## Trace listeners, DEBUG is served by one of them
+        self.__Tracers = [DebugPrinter(PROFILE)] if DEBUG else []
+        TimerControl.__init__(self, self.__Tracers, self.__Loop.time)
+        
+        # Received parameters 
+        self.__Name = Name if Name is not None else "AsyncWaitableTimer-%x" % id(self)
+        self.SetInitialInterval(TimerInitialInterval)
+        self.SetInterval(TimerContinuousInterval)
+        self.SetCount(TimerCount)
+        self.__CatchUp = CatchUp
+        self.SetCatchUpLimit(CatchUpLimit)
+        ## Function related: plain function or coroutine function
+        self.__FunctionProc = FunctionProc
+        self.__FunctionArgs = FunctionArgs
+        self.__FunctionKWArgs = FunctionKWArgs
+        self.__Overlap = Overlap
+        self.SetOverlapLimit(OverlapLimit)
+        ## Called with the Task of every finished coroutine run
+        self.__OnComplete = OnComplete
+        
+        ## Flags
+        if self.GetInterval() == 0 or self.GetCount() == 1:
+            self.__IsOneTimeShotTimer = True
+        else:
+            self.__IsOneTimeShotTimer = False
+        self.__IsRepeatableTimer = True if self.GetCount() > 1 else False
+        
+        # Check flags validity
+        ## Both types simultaneously is not allowed
+        if self.__IsOneTimeShotTimer and self.__IsRepeatableTimer:
+            self.__IsRepeatableTimer = False
+        
+        # Inner variables
+        self.__State = TIMER_STATE_IDLE
+        
+        # Scheduling variables (owned by the loop thread)
+        ## State to restore after Pause()
+        self.__SavedState = TIMER_STATE_IDLE
+        ## Moment Pause() was applied
+        self.__SavedTime = 0
+        ## Scheduled (not the actual) start of the current interval
+        self.__MarkTime = 0
+        ## loop.call_at() handle of the pending deadline
+        self.__Handle = None
+        ## (State, Future) pairs of WaitForState() callers
+        self.__Waiters = []
+        
+        # Coroutine runs
+        self.__Running = 0
+        ## Runs waiting for the previous one (OVERLAP_QUEUE)
+        self.__Backlog = 0
+        self.__LastTask = None
+        
+        # Move to first working state
+        self.__Post((MESSAGE_INIT, 0, 0))
+        
+        # Or even further
+        if StartCondition == TIMER_ACTIVATE:
+            self.__Post((MESSAGE_ACTIVATE, 0, 0))
+    
+    ########## Loop side ###########
+    def __Post(self, Message, Done = None):
+        ## Messages keep their order and may come from any thread
+        self.__Loop.call_soon_threadsafe(self.__ProcessMessage, Message, Done)
+    
+    def __ProcessMessage(self, Message, Done):
+        Now = self.__Loop.time()
+        if self.__Tracers:
+            self._Trace(TRACE_MESSAGE, Message[0])
+        
+        ## MESSAGE_INIT
+        if Message[0] == MESSAGE_INIT:
+            if self.__State == TIMER_STATE_IDLE:
+                self.__SetState(TIMER_STATE_INIT)
+        
+        ## MESSAGE_CHANGE
+        elif Message[0] == MESSAGE_CHANGE:
+            self.SetInitialInterval(Message[1])
+            self.SetInterval(Message[2])
+            
+            if (self.__State == TIMER_STATE_RUNNINGINITIAL) or (self.__State == TIMER_STATE_RUNNING):
+                self.__Schedule(self.__MarkTime + self.__CurrentInterval())
+        
+        ## MESSAGE_ACTIVATE
+        elif Message[0] == MESSAGE_ACTIVATE:
+            if self.__State == TIMER_STATE_INIT:
+                self.__SetState(TIMER_STATE_RUNNINGINITIAL)
+                self.__MarkTime = Now
+                self.__Schedule(self.__MarkTime + self.GetInitialInterval())
+        
+        ## MESSAGE_DEACTIVATE
+        elif Message[0] == MESSAGE_DEACTIVATE:
+            if (self.__State == TIMER_STATE_SUSPENDED) or (self.__State == TIMER_STATE_RUNNING) or (self.__State == TIMER_STATE_RUNNINGINITIAL):
+                self.__Cancel()
+                self.__SetState(TIMER_STATE_INIT)
+        
+        ## MESSAGE_PAUSE
+        elif Message[0] == MESSAGE_PAUSE:
+            if (self.__State == TIMER_STATE_RUNNINGINITIAL) or (self.__State == TIMER_STATE_RUNNING):
+                self.SetDelay(Message[1])
+                self.__SavedState = self.__State
+                self.__SavedTime = Now
+                self.__SetState(TIMER_STATE_SUSPENDED)
+                ## While suspended the only deadline is the end of the delay
+                if self.GetDelay() != 0:
+                    self.__Schedule(Now + self.GetDelay())
+                else:
+                    self.__Cancel()
+        
+        ## MESSAGE_RESUME
+        elif Message[0] == MESSAGE_RESUME:
+            if self.__State == TIMER_STATE_SUSPENDED:
+                self.__Resume(Now)
+        
+        ## MESSAGE_TERMINATE
+        elif Message[0] == MESSAGE_TERMINATE:
+            self.__Shutdown()
+        
+        if Done is not None:
+            Done._Resolve()
+    
+    def __Expire(self):
+        self.__Handle = None
+        Now = self.__Loop.time()
+        
+        ## TIMER_STATE_SUSPENDED
+        if self.__State == TIMER_STATE_SUSPENDED:
+            if self.__Tracers:
+                self._Trace(TRACE_NOTICE, "SuspendedDelay is over now")
+            self.__Resume(Now)
+        
+        ## TIMER_STATE_RUNNINGINITIAL or TIMER_STATE_RUNNING
+        elif (self.__State == TIMER_STATE_RUNNINGINITIAL) or (self.__State == TIMER_STATE_RUNNING):
+            ## Next interval starts at the deadline, not after the function
+            self.__MarkTime += self.__CurrentInterval()
+            self.__SetState(TIMER_STATE_RUNNING)
+            if not self.__Fire():
+                return
+            
+            self.__MarkTime, Burst, Skipped = AlignSchedule(self.__MarkTime, self.GetInterval(), self.__Loop.time(), self.__CatchUp, self.GetCatchUpLimit())
+            for Tick in range(Burst):
+                if not self.__Fire():
+                    return
+            
+            self.__Schedule(self.__MarkTime + self.GetInterval())
+    
+    def __Fire(self):
+        self.__Invoke()
+        
+        if self.__IsOneTimeShotTimer:
+            if self.__Tracers:
+                self._Trace(TRACE_NOTICE, "Terminating a One-Time-Shot timer")
+            self.__Shutdown()
+            return False
+        elif self.__IsRepeatableTimer:
+            if (self._CountDown() <= 0):
+                if self.__Tracers:
+                    self._Trace(TRACE_NOTICE, "Terminating a Repeatable timer")
+                self.__Shutdown()
+                return False
+            else:
+                if self.__Tracers:
+                    self._Trace(TRACE_NOTICE, "Remained invocation function calls: " + repr(self.GetCount()))
+        return True
+    
+    def __Invoke(self):
+        ## Returns False if the run was skipped due to the overlap policy
+        if self.__Running and self.__Overlap == OVERLAP_SKIP:
+            return False
+        
+        if self.__Running and self.__Overlap == OVERLAP_QUEUE:
+            if self.__Backlog >= self.__OverlapLimit:
+                return False
+            self.__Backlog += 1
+            return True
+        
+        self.__Start()
+        return True
+    
+    def __Start(self):
+        if self.__Tracers:
+            self._Trace(TRACE_CALLBACK_START, None)
+        try:
+            Result = self.__FunctionProc(*self.__FunctionArgs, **self.__FunctionKWArgs)
+        except Exception as Error:
+            ## Loop callbacks must not raise
+            if self.__Tracers:
+                self._Trace(TRACE_NOTICE, "Function raised an exception: " + repr(Error))
+                self._Trace(TRACE_CALLBACK_END, None)
+            self._SetError(T_ERROR_FUNCTION_FAILED)
+            return
+        
+        ## Coroutine function: the run goes on as a task
+        if asyncio.iscoroutine(Result):
+            self.__Running += 1
+            self.__LastTask = self.__Loop.create_task(Result)
+            self.__LastTask.add_done_callback(self.__Complete)
+        elif self.__Tracers:
+            self._Trace(TRACE_CALLBACK_END, None)
+    
+    def __Complete(self, Task):
+        self.__Running -= 1
+        if self.__Tracers:
+            self._Trace(TRACE_CALLBACK_END, None)
+        if not Task.cancelled() and Task.exception() is not None:
+            if self.__Tracers:
+                self._Trace(TRACE_NOTICE, "Function raised an exception: " + repr(Task.exception()))
+            self._SetError(T_ERROR_FUNCTION_FAILED)
+        
+        if self.__OnComplete is not None:
+            self.__OnComplete(Task)
+        
+        ## Queued run starts only when the previous one is over
+        if self.__Backlog > 0:
+            self.__Backlog -= 1
+            self.__Start()
+    
+    def __Shutdown(self):
+        self.__Cancel()
+        self.__Backlog = 0
+        self.__SetState(TIMER_STATE_TERMINATED)
+    
+    def __Resume(self, Now):
+        self.__SetState(self.__SavedState)
+        self.SetDelay(0)
+        # Shift the interval start by the amount of delay
+        self.__MarkTime += Now - self.__SavedTime
+        self.__Schedule(self.__MarkTime + self.__CurrentInterval())
+    
+    def __CurrentInterval(self):
+        if self.__State == TIMER_STATE_RUNNINGINITIAL:
+            return self.GetInitialInterval()
+        return self.GetInterval()
+    
+    def __Schedule(self, Deadline):
+        self.__Cancel()
+        self.__Handle = self.__Loop.call_at(Deadline, self.__Expire)
+    
+    def __Cancel(self):
+        if self.__Handle is not None:
+            self.__Handle.cancel()
+            self.__Handle = None
+    
+    def __SetState(self, State):
+        self.__State = State
+        if self.__Tracers:
+            self._Trace(TRACE_STATE, State)
+        if not self.__Waiters:
+            return
+        
+        ## Wake up the callers waiting for this state. Nothing else can
+        ## be reached after TIMER_STATE_TERMINATED
+        Waiters = []
+        for WaitedState, Future in self.__Waiters:
+            if Future.done():
+                continue
+            if WaitedState == State:
+                Future.set_result(True)
+            elif State == TIMER_STATE_TERMINATED:
+                Future.set_result(False)
+            else:
+                Waiters.append((WaitedState, Future))
+        self.__Waiters = Waiters
+    
+    ########### Validators ################
+    @Constraint(OVERLAP_LIMIT_MIN, OVERLAP_LIMIT_MAX)
+    def SetOverlapLimit(self, Value):
+        self.__OverlapLimit = Value
+        
+    ########## Getter/Setter functions #########
+    def GetLoop(self):
+        return self.__Loop
+    
+    def GetName(self):
+        return self.__Name
+    
+    def GetState(self):
+        return self.__State
+    
+    def GetLastTask(self):
+        return self.__LastTask
+    
+    ########## Control functions ###########
+    def _Deliver(self, Message, Done):
+        ## Done is resolved by the loop: await WaitForState() in the loop
+        ## itself, Done.Wait() would block it
+        self.__Post(Message, Done)
+    
+    ########## Awaitable state ###########
+    async def WaitForState(self, State, Timeout = None):
+        ## Must be awaited in the timer loop. False on timeout or when
+        ## the timer is terminated before reaching the state
+        if self.__State == State:
+            return True
+        if self.__State == TIMER_STATE_TERMINATED:
+            return False
+        
+        Future = self.__Loop.create_future()
+        self.__Waiters.append((State, Future))
+        try:
+            return await asyncio.wait_for(Future, Timeout)
+        except asyncio.TimeoutError:
+            return False
@@ -0,0 +1,431 @@
+# Copyright (c) 2012 Sergey Danielyan a.k.a gahcep
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+## Multi-process flavour of TimerManager: timers are partitioned by key
+## across worker processes, each running its own TimerManager, so CPU
+## bound functions use all the cores instead of sharing one GIL. Control
+## calls travel in batches over one pipe per worker. Requires Python 3.3+,
+## functions and their arguments must be picklable (module level functions)
+
+import multiprocessing
+from multiprocessing.connection import wait
+from os import cpu_count
+from pickle import dumps, loads, HIGHEST_PROTOCOL
+from threading import Event, Lock, Thread
+
+from PyWT import (
+    AggregateStats, Completion, SpreadFraction, TimerManager, TimerStats,
+    TIMER_STATE_TERMINATED, T_SUCCESS, T_ERROR_INCORRECT_STATE,
+)
+
+## Worker operations
+SHARD_CREATE                = 1
+SHARD_ACTIVATE              = 2
+SHARD_DEACTIVATE            = 3
+SHARD_PAUSE                 = 4
+SHARD_RESUME                = 5
+SHARD_CHANGE                = 6
+SHARD_TERMINATE             = 7
+SHARD_STATE                 = 8
+SHARD_ERROR                 = 9
+SHARD_STATS                 = 10
+SHARD_MANAGER_STATS         = 11
+SHARD_SHUTDOWN              = 12
+
+## Control functions: applied in the worker manager batch, replied once done
+SHARD_CONTROLS = {
+SHARD_ACTIVATE   : 'Activate',
+SHARD_DEACTIVATE : 'Deactivate',
+SHARD_PAUSE      : 'Pause',
+SHARD_RESUME     : 'Resume',
+SHARD_CHANGE     : 'ChangeIntervals',
+SHARD_TERMINATE  : 'Terminate',
+}
+
+## Getters: read after the control functions of the same batch are applied
+SHARD_QUERIES = {
+SHARD_STATE      : 'GetState',
+SHARD_ERROR      : 'GetError',
+SHARD_STATS      : 'GetStats',
+}
+
+############ Worker process ##############
+def ShardWorker(Connection, ManagerOptions):
+    ## Main function of a worker process. Every received batch is one
+    ## manager batch and gets one reply batch: (RequestId, Result, Error)
+    Manager = ShardManager(**ManagerOptions)
+    Manager.start()
+    Running = True
+    while Running:
+        try:
+            Batch = Connection.recv()
+        except EOFError:
+            break
+        
+        Results = []
+        Owner = Manager._BeginBatch()
+        try:
+            for Item in Batch:
+                RequestId, Operation, TimerId, Arguments = loads(Item)
+                if Operation == SHARD_SHUTDOWN:
+                    Running = False
+                try:
+                    Results.append((RequestId,) + ShardExecute(Manager, Operation, TimerId, Arguments))
+                except Exception as Error:
+                    Results.append((RequestId, False, Error))
+        finally:
+            Manager._EndBatch(Owner)
+        
+        ## The whole batch is applied by now or soon: the control functions
+        ## are acknowledged once done and the getters see their effect
+        Replies = []
+        for RequestId, Result, Error in Results:
+            if isinstance(Result, Completion):
+                Result.Wait()
+                Result = True
+            elif callable(Result):
+                Result = Result()
+            Replies.append((RequestId, Result, ShardError(Error)))
+        try:
+            Connection.send(Replies)
+        except (EOFError, OSError):
+            break
+    
+    Manager.Terminate()
+    Manager.join()
+
+def ShardError(Error):
+    ## Exceptions go back pickled: one the parent could not load comes
+    ## as a RuntimeError with its type name and repr()
+    if isinstance(Error, BaseException):
+        try:
+            loads(dumps(Error, HIGHEST_PROTOCOL))
+        except Exception:
+            return RuntimeError(type(Error).__name__ + ": " + repr(Error))
+    return Error
+
+def ShardExecute(Manager, Operation, TimerId, Arguments):
+    ## (Result, Error): Result is a value, a Completion or a getter to call
+    ## once the batch is applied
+    if Operation == SHARD_CREATE:
+        Initial, Interval, FunctionProc, Options = Arguments
+        Manager.AddTimer(TimerId, Manager.CreateTimer(Initial, Interval, FunctionProc, **Options))
+        return True, T_SUCCESS
+    if Operation == SHARD_MANAGER_STATS:
+        return Manager.GetStats, T_SUCCESS
+    if Operation == SHARD_SHUTDOWN:
+        return True, T_SUCCESS
+    
+    ## Terminated timers are forgotten
+    Timer = Manager.GetTimer(TimerId)
+    if Timer is None:
+        if Operation == SHARD_STATE:
+            return TIMER_STATE_TERMINATED, T_SUCCESS
+        return False, T_ERROR_INCORRECT_STATE
+    if Operation in SHARD_CONTROLS:
+        Result = getattr(Timer, SHARD_CONTROLS[Operation])(*Arguments)
+        ## Gone for the rest of the batch too, not only once it's applied
+        if Operation == SHARD_TERMINATE and Result:
+            Manager.RemoveTimer(TimerId)
+        return Result, Timer.GetError()
+    return getattr(Timer, SHARD_QUERIES[Operation]), T_SUCCESS
+
+
+class ShardManager(TimerManager):
+    ## TimerManager of a worker process: finds the timers by the TimerId of
+    ## the parent. A timer is dropped once it is terminated, whatever did
+    ## it (Terminate(), TimerCount, a function result)
+    
+    def __init__(self, **ManagerOptions):
+        TimerManager.__init__(self, **ManagerOptions)
+        ## {TimerId: Timer} and back
+        self.__Timers = {}
+        self.__Ids = {}
+    
+    def _Unregister(self, Timer):
+        ## Dispatcher thread
+        TimerManager._Unregister(self, Timer)
+        self.RemoveTimer(self.__Ids.get(Timer))
+    
+    def AddTimer(self, TimerId, Timer):
+        self.__Ids[Timer] = TimerId
+        self.__Timers[TimerId] = Timer
+    
+    def GetTimer(self, TimerId):
+        return self.__Timers.get(TimerId)
+    
+    def GetTimerIds(self):
+        return list(self.__Timers)
+    
+    def RemoveTimer(self, TimerId):
+        Timer = self.__Timers.pop(TimerId, None)
+        if Timer is not None:
+            self.__Ids.pop(Timer, None)
+
+
+class ShardCompletion(Completion):
+    ## Returned by the ShardedTimer functions: done once the worker has
+    ## applied the call. Truthy like True, a refused call shows up as
+    ## GetResult() False once done
+    
+    def __init__(self):
+        Completion.__init__(self)
+        self.__Result = None
+        self.__Error = T_SUCCESS
+    
+    def GetResult(self, Timeout = None):
+        ## None on timeout
+        return self.__Result if self.Wait(Timeout) else None
+    
+    def GetError(self):
+        ## T_* code, or the exception raised in the worker
+        return self.__Error
+    
+    def _Set(self, Result, Error):
+        self.__Result = Result
+        self.__Error = Error
+        self._Resolve()
+
+
+class ShardedTimer(object):
+    ## Parent side handle of a timer living in a worker process. Same
+    ## control functions as WaitableTimer; the getters are round trips
+    
+    def __init__(self, Service, Shard, TimerId, Name, Created):
+        self.__Service = Service
+        self.__Shard = Shard
+        self.__TimerId = TimerId
+        self.__Name = Name
+        self.__Created = Created
+    
+    def __Call(self, Operation, *Arguments):
+        return self.__Service._Call(self.__Shard, Operation, self.__TimerId, Arguments)
+    
+    ########## Getter/Setter functions #########
+    def GetName(self):
+        return self.__Name
+    
+    def GetShard(self):
+        return self.__Shard
+    
+    def GetCreated(self):
+        ## ShardCompletion of the creation: GetResult() False and GetError()
+        ## the exception if the worker could not create the timer
+        return self.__Created
+    
+    def GetState(self, Timeout = None):
+        return self.__Call(SHARD_STATE).GetResult(Timeout)
+    
+    def GetError(self, Timeout = None):
+        return self.__Call(SHARD_ERROR).GetResult(Timeout)
+    
+    def GetStats(self, Timeout = None):
+        ## None unless created with Statistics=True
+        return self.__Call(SHARD_STATS).GetResult(Timeout)
+    
+    ########## Behaviour functions ###########
+    def ChangeIntervals(self, Initial, Interval):
+        return self.__Call(SHARD_CHANGE, Initial, Interval)
+    
+    def Activate(self, DisableStateCheck = False):
+        return self.__Call(SHARD_ACTIVATE, DisableStateCheck)
+    
+    def Pause(self, Wait = 0, DisableStateCheck = False):
+        return self.__Call(SHARD_PAUSE, Wait, DisableStateCheck)
+    
+    def Resume(self, DisableStateCheck = False):
+        return self.__Call(SHARD_RESUME, DisableStateCheck)
+    
+    def Deactivate(self, DisableStateCheck = False):
+        return self.__Call(SHARD_DEACTIVATE, DisableStateCheck)
+    
+    def Terminate(self, DisableStateCheck = False):
+        return self.__Call(SHARD_TERMINATE, DisableStateCheck)
+
+
+class ShardedTimerService(object):
+    ## Shards worker processes (one per core by default) with a TimerManager
+    ## each. A timer lives in the shard its Key maps to. The calls of all
+    ## the threads pile up per shard and go as one message whenever the
+    ## sender thread gets to them, so the busier the service, the bigger
+    ## the batches
+    
+    def __init__(self, Shards = None, StartMethod = None, **ManagerOptions):
+        self.__Count = max(Shards or cpu_count() or 1, 1)
+        self.__Context = multiprocessing.get_context(StartMethod)
+        self.__ManagerOptions = ManagerOptions
+        
+        # Inner variables
+        self.__Lock = Lock()
+        self.__RequestId = 0
+        self.__TimerId = 0
+        ## Calls to send per shard, calls waiting for the reply
+        self.__Outbox = [[] for Shard in range(self.__Count)]
+        self.__Pending = {}
+        self.__Connections = []
+        self.__Workers = []
+        self.__Threads = []
+        ## Sent messages and the calls they carried
+        self.__Batches = 0
+        self.__Messages = 0
+        
+        # Events
+        self.__eSend = Event()
+        self.__eTerminate = Event()
+    
+    def start(self):
+        ## The workers first: no thread of this process is copied by fork
+        for Shard in range(self.__Count):
+            Parent, Child = self.__Context.Pipe()
+            Worker = self.__Context.Process(target = ShardWorker, args = (Child, self.__ManagerOptions),
+                                            name = "PyWTShard-%d" % Shard, daemon = True)
+            Worker.start()
+            Child.close()
+            self.__Connections.append(Parent)
+            self.__Workers.append(Worker)
+        
+        self.__Threads = [Thread(target = self.__Send, name = "PyWTShard-Sender"),
+                          Thread(target = self.__Receive, name = "PyWTShard-Receiver")]
+        for Runner in self.__Threads:
+            Runner.daemon = True
+            Runner.start()
+    
+    ########## IPC ###########
+    def _Call(self, Shard, Operation, TimerId, Arguments):
+        ## Pickled right away: an unpicklable function fails here, not in
+        ## the sender thread
+        Done = ShardCompletion()
+        with self.__Lock:
+            if self.__eTerminate.is_set():
+                Done._Set(False, T_ERROR_INCORRECT_STATE)
+                return Done
+            self.__RequestId += 1
+            RequestId = self.__RequestId
+            Item = dumps((RequestId, Operation, TimerId, Arguments), HIGHEST_PROTOCOL)
+            self.__Pending[RequestId] = Done
+            self.__Outbox[Shard].append(Item)
+        self.__eSend.set()
+        return Done
+    
+    def __Send(self):
+        while True:
+            self.__eSend.wait()
+            self.__eSend.clear()
+            Stopping = self.__eTerminate.is_set()
+            for Shard in range(self.__Count):
+                with self.__Lock:
+                    Batch, self.__Outbox[Shard] = self.__Outbox[Shard], []
+                if not Batch:
+                    continue
+                self.__Batches += 1
+                self.__Messages += len(Batch)
+                try:
+                    self.__Connections[Shard].send(Batch)
+                except (EOFError, OSError):
+                    pass
+            if Stopping:
+                break
+    
+    def __Receive(self):
+        Connections = list(self.__Connections)
+        while Connections:
+            for Connection in wait(Connections):
+                try:
+                    Replies = Connection.recv()
+                except (EOFError, OSError):
+                    Connections.remove(Connection)
+                    continue
+                with self.__Lock:
+                    Done = [(self.__Pending.pop(RequestId, None), Result, Error) for RequestId, Result, Error in Replies]
+                for Reply, Result, Error in Done:
+                    if Reply is not None:
+                        Reply._Set(Result, Error)
+        
+        ## Workers are gone: nobody will answer
+        with self.__Lock:
+            Pending, self.__Pending = self.__Pending, {}
+        for Reply in Pending.values():
+            Reply._Set(False, T_ERROR_INCORRECT_STATE)
+    
+    ########## Getter/Setter functions #########
+    def GetShardCount(self):
+        return self.__Count
+    
+    def GetShard(self, Key):
+        ## Stable across runs and processes (the SpreadKey hash)
+        return min(int(SpreadFraction(Key) * self.__Count), self.__Count - 1)
+    
+    def GetStats(self, Timeout = None):
+        ## TimerManager.GetStats() of every shard summed up, plus 'Shards'
+        ## and the IPC counters
+        Replies = [self._Call(Shard, SHARD_MANAGER_STATS, 0, ()) for Shard in range(self.__Count)]
+        Shards = [Reply.GetResult(Timeout) for Reply in Replies]
+        Shards = [Stats for Stats in Shards if Stats]
+        Result = AggregateStats(Shards)
+        ## The manager counters are plain sums
+        Aggregated = TimerStats().Snapshot()
+        for Stats in Shards:
+            for Key, Value in Stats.items():
+                if Key not in Aggregated:
+                    Result[Key] = Result.get(Key, 0) + Value
+        Result['Shards'] = len(Shards)
+        Result['IpcBatches'] = self.__Batches
+        Result['IpcMessages'] = self.__Messages
+        return Result
+    
+    ########## Behaviour functions ###########
+    def CreateTimer(self, Key, TimerInitialInterval, TimerContinuousInterval, FunctionProc, **Options):
+        ## Same options as TimerManager.CreateTimer(), Name defaults to the Key
+        with self.__Lock:
+            self.__TimerId += 1
+            TimerId = self.__TimerId
+        Shard = self.GetShard(Key)
+        Options.setdefault('Name', str(Key))
+        Created = self._Call(Shard, SHARD_CREATE, TimerId, (TimerInitialInterval, TimerContinuousInterval, FunctionProc, Options))
+        return ShardedTimer(self, Shard, TimerId, Options['Name'], Created)
+    
+    def Terminate(self, Timeout = None):
+        ## Stops the timers and the workers, the calls made after it are
+        ## refused
+        Replies = [self._Call(Shard, SHARD_SHUTDOWN, 0, ()) for Shard in range(self.__Count)]
+        with self.__Lock:
+            self.__eTerminate.set()
+        
+        ## Never started: nobody will answer
+        if not self.__Workers:
+            with self.__Lock:
+                Pending, self.__Pending = self.__Pending, {}
+            for Reply in Pending.values():
+                Reply._Set(False, T_ERROR_INCORRECT_STATE)
+            return True
+        
+        self.__eSend.set()
+        for Reply in Replies:
+            Reply.Wait(Timeout)
+        for Worker in self.__Workers:
+            Worker.join(Timeout)
+        for Runner in self.__Threads:
+            Runner.join(Timeout)
+        for Connection in self.__Connections:
+            Connection.close()
+        return True
@@ -0,0 +1,26 @@
+import unittest
+
+import PyWT
+
+
+class StarImportTest(unittest.TestCase):
+
+    def testPublicNamesOnly(self):
+        Names = {}
+        exec('from PyWT import *', Names)
+        for Name in ('WaitableTimer', 'TimerManager', 'TimerGroup', 'Completion', 'VirtualClock',
+                     'TIMER_STATE_RUNNING', 'T_SUCCESS', 'CATCHUP_SKIP', 'STORE_WHEEL'):
+            self.assertTrue(Name in Names, Name)
+        ## Imports of the module must not clobber builtins and caller names
+        for Name in ('random', 'select', 'mmap', 'read', 'write', 'close', 'pipe', 'getpid',
+                     'time', 'dump', 'platform', 'crc32', 'epoll', 'Thread', 'Queue'):
+            self.assertFalse(Name in Names, Name)
+
+    def testEveryNameExists(self):
+        for Name in PyWT.__all__:
+            self.assertTrue(hasattr(PyWT, Name), Name)
+        self.assertEqual(len(set(PyWT.__all__)), len(PyWT.__all__))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+
+import PyWT
+
+
+class BatchTest(unittest.TestCase):
+
+    def testDueTimersShareOneCall(self):
+        Clock = PyWT.VirtualClock(1000.0)
+        Manager = PyWT.TimerManager(TimeSource = Clock)
+        Runs = []
+        def Flush(Calls):
+            Runs.append((Clock(), sorted(Args[0] for Args, KWArgs in Calls)))
+        for Index in range(4):
+            Manager.CreateTimer(1, 1, Flush, FunctionArgs = [Index], Batch = True)
+        ## Due half a second later: a call of its own
+        Manager.CreateTimer(1.5, 1, Flush, FunctionArgs = [4], Batch = True)
+        Manager.Simulate(1002)
+        self.assertEqual(Runs, [(1001, [0, 1, 2, 3]), (1001.5, [4]), (1002, [0, 1, 2, 3])])
+        Stats = Manager.GetStats()
+        self.assertEqual((Stats['Batches'], Stats['BatchedCalls']), (3, 9))
+
+    def testOtherFunctionsAreNotMerged(self):
+        Clock = PyWT.VirtualClock(1000.0)
+        Manager = PyWT.TimerManager(TimeSource = Clock)
+        Runs = []
+        Manager.CreateTimer(1, 0, lambda Calls: Runs.append(('a', len(Calls))), Batch = True)
+        Manager.CreateTimer(1, 0, lambda Calls: Runs.append(('b', len(Calls))), Batch = True)
+        Manager.CreateTimer(1, 0, lambda: Runs.append(('plain', 1)))
+        Manager.Simulate(1001)
+        self.assertEqual(sorted(Runs), [('a', 1), ('b', 1), ('plain', 1)])
+
+
+if __name__ == '__main__':
+    unittest.main()
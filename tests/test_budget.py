@@ -0,0 +1,47 @@
+import unittest
+
+import PyWT
+
+
+class BudgetTest(unittest.TestCase):
+
+    def Run(self, Overload, Store = PyWT.STORE_HEAP):
+        ## 8 low priority timers due together, 4 calls a pass
+        Clock = PyWT.VirtualClock(1000.0)
+        Manager = PyWT.TimerManager(Store = Store, TimeSource = Clock, BudgetCalls = 4, Overload = Overload)
+        Counts = [0] * 8
+        def Tick(Index):
+            Counts[Index] += 1
+        for Index in range(8):
+            Manager.CreateTimer(1, 1, Tick, FunctionArgs = [Index], Priority = PyWT.PRIORITY_LOW)
+        Manager.Simulate(2000)
+        return Counts, Manager.GetStats()
+
+    def testShedIsFair(self):
+        for Store in (PyWT.STORE_HEAP, PyWT.STORE_WHEEL):
+            Counts, Stats = self.Run(PyWT.OVERLOAD_SHED, Store)
+            self.assertTrue(min(Counts) >= 490, Counts)
+            self.assertTrue(max(Counts) - min(Counts) <= 1, Counts)
+            self.assertEqual(sum(Counts) + Stats['ShedTicks'], 8 * 1000)
+
+    def testDeferIsFair(self):
+        Counts, Stats = self.Run(PyWT.OVERLOAD_DEFER)
+        self.assertTrue(max(Counts) - min(Counts) <= 1, Counts)
+        self.assertTrue(Stats['DeferredTicks'] > 0)
+
+    def testHighPriorityIsNeverShed(self):
+        Clock = PyWT.VirtualClock(1000.0)
+        Manager = PyWT.TimerManager(TimeSource = Clock, BudgetCalls = 2, Overload = PyWT.OVERLOAD_SHED)
+        Counts = [0] * 4
+        def Tick(Index):
+            Counts[Index] += 1
+        Manager.CreateTimer(1, 1, Tick, FunctionArgs = [0], Priority = PyWT.PRIORITY_HIGH)
+        for Index in range(1, 4):
+            Manager.CreateTimer(1, 1, Tick, FunctionArgs = [Index], Priority = PyWT.PRIORITY_LOW)
+        Manager.Simulate(1100)
+        self.assertEqual(Counts[0], 100)
+        self.assertEqual(sum(Counts[1:]), 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+import PyWT
+from PyWT import AlignSchedule
+
+
+class AlignScheduleTest(unittest.TestCase):
+
+    def testNothingMissed(self):
+        self.assertEqual(AlignSchedule(10.0, 1, 10.5, PyWT.CATCHUP_BURST, 5), (10.0, 0, 0))
+        self.assertEqual(AlignSchedule(10.0, 0, 50.0, PyWT.CATCHUP_BURST, 5), (10.0, 0, 0))
+
+    def testPolicies(self):
+        ## Deadlines 11 ... 17 are in the past, the grid does not move
+        self.assertEqual(AlignSchedule(10.0, 1, 17.5, PyWT.CATCHUP_SKIP, 5), (17.0, 0, 7))
+        self.assertEqual(AlignSchedule(10.0, 1, 17.5, PyWT.CATCHUP_ONCE, 5), (17.0, 1, 6))
+        self.assertEqual(AlignSchedule(10.0, 1, 17.5, PyWT.CATCHUP_BURST, 5), (17.0, 5, 2))
+        self.assertEqual(AlignSchedule(10.0, 1, 12.5, PyWT.CATCHUP_BURST, 5), (12.0, 2, 0))
+
+
+class ManagerCatchUpTest(unittest.TestCase):
+
+    def Run(self, CatchUp):
+        ## The third call takes 4.5 seconds
+        Clock = PyWT.VirtualClock(1000.0)
+        Manager = PyWT.TimerManager(TimeSource = Clock)
+        Calls = []
+        def Tick():
+            Calls.append(Clock())
+            if len(Calls) == 3:
+                Clock.Advance(4.5)
+        Manager.CreateTimer(1, 1, Tick, CatchUp = CatchUp, CatchUpLimit = 3, Statistics = True)
+        Manager.Simulate(1010.5)
+        return Calls, Manager.GetStats()
+
+    def testSkip(self):
+        Calls, Stats = self.Run(PyWT.CATCHUP_SKIP)
+        self.assertEqual(Calls, [1001, 1002, 1003, 1008, 1009, 1010])
+        self.assertEqual(Stats['Skipped'], 4)
+
+    def testOnce(self):
+        Calls, Stats = self.Run(PyWT.CATCHUP_ONCE)
+        self.assertEqual(Calls, [1001, 1002, 1003, 1007.5, 1008, 1009, 1010])
+        self.assertEqual(Stats['Skipped'], 3)
+
+    def testBurst(self):
+        Calls, Stats = self.Run(PyWT.CATCHUP_BURST)
+        self.assertEqual(Calls, [1001, 1002, 1003, 1007.5, 1007.5, 1007.5, 1008, 1009, 1010])
+        self.assertEqual(Stats['Skipped'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
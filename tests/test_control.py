@@ -0,0 +1,93 @@
+import unittest
+
+import PyWT
+try:
+    import asyncio
+    import PyWTAsync
+except (ImportError, SyntaxError):
+    ## Python 3.7+
+    PyWTAsync = None
+
+
+class ControlTest(unittest.TestCase):
+    ## Control functions come from TimerControl for every timer flavour
+
+    def Check(self, Timer, Settle):
+        ## Timer is created with TIMER_NO_ACTIVATE, Settle(Done) applies the
+        ## sent messages, Done is the Completion of the last one (or None)
+        Recorder = PyWT.TraceRecorder()
+        Timer.AddTraceListener(Recorder)
+        Settle(None)
+        self.assertEqual(Timer.GetState(), PyWT.TIMER_STATE_INIT)
+        self.assertFalse(Timer.Resume())
+        self.assertEqual(Timer.GetError(), PyWT.T_ERROR_INCORRECT_STATE)
+        self.assertFalse(Timer.Deactivate())
+        self.assertEqual(Timer.GetError(), PyWT.T_ERROR_ALREADY_SWITCHED)
+
+        Done = Timer.Activate()
+        self.assertTrue(isinstance(Done, PyWT.Completion))
+        self.assertEqual(Timer.GetError(), PyWT.T_SUCCESS)
+        Settle(Done)
+        self.assertTrue(Done.IsDone())
+        self.assertEqual(Timer.GetState(), PyWT.TIMER_STATE_RUNNINGINITIAL)
+        self.assertFalse(Timer.Activate())
+        self.assertEqual(Timer.GetError(), PyWT.T_ERROR_ALREADY_SWITCHED)
+
+        Done = Timer.Pause(5)
+        self.assertTrue(Done)
+        Settle(Done)
+        self.assertEqual(Timer.GetState(), PyWT.TIMER_STATE_SUSPENDED)
+        self.assertEqual(Timer.GetDelay(), 5)
+        Done = Timer.Resume()
+        self.assertTrue(Done)
+        Settle(Done)
+        self.assertEqual(Timer.GetDelay(), 0)
+
+        Done = Timer.ChangeIntervals(20, 30)
+        self.assertTrue(Done)
+        Settle(Done)
+        self.assertEqual((Timer.GetInitialInterval(), Timer.GetInterval()), (20, 30))
+
+        Done = Timer.Terminate()
+        self.assertTrue(Done)
+        Settle(Done)
+        self.assertEqual(Timer.GetState(), PyWT.TIMER_STATE_TERMINATED)
+        self.assertFalse(Timer.Pause())
+        self.assertEqual(Timer.GetError(), PyWT.T_ERROR_INCORRECT_STATE)
+        self.assertFalse(Timer.ChangeIntervals(1, 1))
+
+        ## Control notices and state changes go to the trace listeners
+        Events = [(Name, Event, Value) for Stamp, Thread, Name, Event, Value in Recorder.GetEvents()]
+        self.assertTrue((Timer.GetName(), PyWT.TRACE_NOTICE, "Pause(): Notice: message is sent") in Events)
+        self.assertTrue((Timer.GetName(), PyWT.TRACE_MESSAGE, PyWT.MESSAGE_RESUME) in Events)
+        self.assertTrue((Timer.GetName(), PyWT.TRACE_STATE, PyWT.TIMER_STATE_TERMINATED) in Events)
+
+    def testWaitableTimer(self):
+        Timer = PyWT.WaitableTimer(10, 10, lambda: None, StartCondition = PyWT.TIMER_NO_ACTIVATE, TimerCount = 100)
+        Timer.start()
+        try:
+            self.Check(Timer, lambda Done: Done.Wait(5) if Done else Timer.WaitForState(PyWT.TIMER_STATE_INIT, 5))
+        finally:
+            Timer.Terminate(True)
+            Timer.join(5)
+
+    def testManagedTimer(self):
+        Clock = PyWT.VirtualClock(1000.0)
+        Manager = PyWT.TimerManager(TimeSource = Clock)
+        Timer = Manager.CreateTimer(10, 10, lambda: None, StartCondition = PyWT.TIMER_NO_ACTIVATE,
+                                    TimerCount = 100)
+        self.Check(Timer, lambda Done: Manager.Simulate(Clock()))
+
+    @unittest.skipIf(PyWTAsync is None, "PyWTAsync requires Python 3.7+")
+    def testAsyncWaitableTimer(self):
+        Loop = asyncio.new_event_loop()
+        try:
+            Timer = PyWTAsync.AsyncWaitableTimer(10, 10, lambda: None, StartCondition = PyWT.TIMER_NO_ACTIVATE,
+                                                 TimerCount = 100, Loop = Loop)
+            self.Check(Timer, lambda Done: Loop.run_until_complete(asyncio.sleep(0)))
+        finally:
+            Loop.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
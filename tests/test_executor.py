@@ -0,0 +1,80 @@
+import unittest
+
+import PyWT
+
+
+class ManualFuture(object):
+    ## Finished by the test, not by a thread
+    def __init__(self):
+        self.Callbacks = []
+
+    def add_done_callback(self, Callback):
+        self.Callbacks.append(Callback)
+
+    def Finish(self):
+        for Callback in self.Callbacks:
+            Callback(self)
+
+
+class ManualExecutor(object):
+    ## Records the submitted runs, runs nothing
+    def __init__(self):
+        self.Futures = []
+
+    def submit(self, Function, *args, **kwargs):
+        self.Futures.append(ManualFuture())
+        return self.Futures[-1]
+
+
+class OverlapTest(unittest.TestCase):
+
+    def Invoker(self, Overlap, Limit = 1):
+        self.Executor = ManualExecutor()
+        self.Completed = []
+        return PyWT.FunctionInvoker(lambda: None, [], {}, self.Executor, Overlap, Limit,
+                                    self.Completed.append)
+
+    def testInline(self):
+        Calls = []
+        Invoker = PyWT.FunctionInvoker(Calls.append, [1], {})
+        self.assertTrue(Invoker.Invoke())
+        self.assertEqual(Calls, [1])
+        self.assertEqual(Invoker.GetLastFuture(), None)
+
+    def testAllow(self):
+        Invoker = self.Invoker(PyWT.OVERLAP_ALLOW)
+        self.assertTrue(Invoker.Invoke())
+        self.assertTrue(Invoker.Invoke())
+        self.assertEqual(len(self.Executor.Futures), 2)
+        self.assertTrue(Invoker.GetLastFuture() is self.Executor.Futures[1])
+
+    def testSkip(self):
+        Invoker = self.Invoker(PyWT.OVERLAP_SKIP)
+        self.assertTrue(Invoker.Invoke())
+        self.assertFalse(Invoker.Invoke())
+        self.Executor.Futures[0].Finish()
+        self.assertEqual(self.Completed, self.Executor.Futures)
+        self.assertTrue(Invoker.Invoke())
+        self.assertEqual(len(self.Executor.Futures), 2)
+
+    def testQueue(self):
+        Invoker = self.Invoker(PyWT.OVERLAP_QUEUE, 2)
+        self.assertTrue(Invoker.Invoke())
+        self.assertTrue(Invoker.Invoke())
+        self.assertTrue(Invoker.Invoke())
+        ## Over the limit
+        self.assertFalse(Invoker.Invoke())
+        self.assertEqual(len(self.Executor.Futures), 1)
+        ## Queued runs start one after another
+        self.Executor.Futures[0].Finish()
+        self.assertEqual(len(self.Executor.Futures), 2)
+        self.Executor.Futures[1].Finish()
+        self.Executor.Futures[2].Finish()
+        self.assertEqual(len(self.Executor.Futures), 3)
+        self.assertEqual(len(self.Completed), 3)
+        self.assertTrue(Invoker.Invoke())
+        self.assertEqual(len(self.Executor.Futures), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+
+import PyWT
+
+
+class SlowMember(object):
+    ## Group member whose Pause() returns once Other is terminated
+    def __init__(self, Manager, Other):
+        self.Manager = Manager
+        self.Other = Other
+
+    def GetManager(self):
+        return self.Manager
+
+    def GetState(self):
+        return PyWT.TIMER_STATE_RUNNING
+
+    def Pause(self, Wait, DisableStateCheck):
+        return self.Other.WaitForState(PyWT.TIMER_STATE_TERMINATED, 5)
+
+
+class GroupTest(unittest.TestCase):
+
+    def testOneMessagePerGroupCall(self):
+        Clock = PyWT.VirtualClock(1000.0)
+        Manager = PyWT.TimerManager(TimeSource = Clock)
+        Group = Manager.CreateGroup()
+        Timers = Group.CreateTimers(20, 10, 10, lambda: None)
+        Manager.Simulate(1000)
+        ## INIT and ACTIVATE of all the timers in one queue item
+        self.assertEqual(Manager.GetStats()['QueueDepthMax'], 1)
+        self.assertEqual(set(Group.GetStates().values()), set([PyWT.TIMER_STATE_RUNNINGINITIAL]))
+
+        Results = Group.Pause()
+        self.assertEqual(len(Results), 20)
+        Manager.Simulate(1001)
+        self.assertTrue(all(Done.IsDone() for Done in Results.values()))
+        self.assertEqual(set(Group.GetStates().values()), set([PyWT.TIMER_STATE_SUSPENDED]))
+        self.assertEqual(Manager.GetStats()['QueueDepthMax'], 1)
+
+        ## Every member still runs its own state check
+        Timers[0].Terminate()
+        Manager.Simulate(1002)
+        Results = Group.Resume()
+        self.assertEqual(Results[Timers[0]], False)
+        self.assertTrue(all(Results[Timer] for Timer in Timers[1:]))
+        self.assertEqual(len(Group), 19)
+        Manager.Simulate(1003)
+        self.assertEqual(Manager.GetStats()['QueueDepthMax'], 1)
+        self.assertEqual(set(Group.GetStates().values()), set([PyWT.TIMER_STATE_RUNNINGINITIAL]))
+
+        ## One message per timer without the group
+        for Timer in Timers[1:]:
+            Timer.Pause()
+        Manager.Simulate(1004)
+        self.assertEqual(Manager.GetStats()['QueueDepthMax'], 19)
+
+    def testTerminatedMembersLeaveAfterTheirMessages(self):
+        Manager = PyWT.TimerManager()
+        Manager.start()
+        try:
+            Group = Manager.CreateGroup()
+            Runs = []
+            OneShot = Group.CreateTimer(1, 0, lambda: Runs.append(1))
+            self.assertTrue(OneShot.WaitForState(PyWT.TIMER_STATE_RUNNINGINITIAL, 5))
+            self.assertTrue(Group.Add(SlowMember(Manager, OneShot)))
+
+            ## The one-shot fires while its PAUSE message waits in the batch
+            Results = Group.Pause()
+            self.assertTrue(Results[OneShot])
+            self.assertTrue(Results[OneShot].Wait(5))
+            self.assertEqual(Runs, [1])
+            self.assertEqual(len(Group), 2)
+
+            ## Refused now, and gone
+            Results = Group.Pause()
+            self.assertEqual(Results[OneShot], False)
+            self.assertEqual(len(Group), 1)
+            self.assertTrue(OneShot not in Group.Pause())
+        finally:
+            Manager.Terminate()
+            Manager.join(5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+import PyWT
+
+
+class LightTimerTableTest(unittest.TestCase):
+
+    def testPopDue(self):
+        Table = PyWT.LightTimerTable()
+        Calls = []
+        Table.Add(1, 0, 0, lambda: Calls.append('once'))
+        Table.Add(2, 1, 3, lambda: Calls.append('three'))
+        self.assertEqual(len(Table), 2)
+        self.assertEqual(Table.NextDeadline(), 1)
+
+        for Function in Table.PopDue(2.5):
+            Function()
+        self.assertEqual(Calls, ['once', 'three'])
+        self.assertEqual(Table.NextDeadline(), 3)
+        ## Missed ticks are skipped, the count ends the timer
+        self.assertEqual(len(Table.PopDue(10.5)), 1)
+        self.assertEqual(Table.NextDeadline(), 11)
+        self.assertEqual(len(Table.PopDue(11)), 1)
+        self.assertEqual((len(Table), Table.NextDeadline()), (0, None))
+
+    def testPauseResume(self):
+        Table = PyWT.LightTimerTable()
+        Handle, Nearest = Table.Add(5, 5, 0, lambda: None)
+        self.assertTrue(Nearest)
+        self.assertTrue(Table.Pause(Handle, 2))
+        self.assertFalse(Table.Pause(Handle, 2))
+        self.assertEqual(Table.GetState(Handle), PyWT.TIMER_STATE_SUSPENDED)
+        self.assertEqual(Table.NextDeadline(), None)
+        ## The remaining 3 seconds count from the resume
+        self.assertEqual(Table.Resume(Handle, 10), True)
+        self.assertEqual(Table.NextDeadline(), 13)
+        self.assertEqual(Table.Resume(Handle, 10), None)
+
+    def testStaleHandle(self):
+        Table = PyWT.LightTimerTable()
+        Handle, Nearest = Table.Add(1, 0, 0, lambda: None)
+        self.assertTrue(Table.Cancel(Handle))
+        self.assertFalse(Table.Cancel(Handle))
+        ## The slot is reused under a new generation
+        Other, Nearest = Table.Add(1, 0, 0, lambda: None)
+        self.assertNotEqual(Handle, Other)
+        self.assertEqual(Handle & 0xFFFFFFFF, Other & 0xFFFFFFFF)
+        self.assertEqual(Table.GetState(Handle), PyWT.TIMER_STATE_TERMINATED)
+        self.assertEqual(Table.GetState(Other), PyWT.TIMER_STATE_RUNNING)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import threading
+import time
+import unittest
+
+import PyWT
+
+
+def WaitFor(Condition, Timeout = 5):
+    ## The control functions return before the dispatcher applies the message
+    Deadline = time.time() + Timeout
+    while not Condition():
+        if time.time() > Deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+class ManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.Manager = PyWT.TimerManager()
+        self.Manager.start()
+
+    def tearDown(self):
+        self.Manager.Terminate()
+        self.Manager.join(5)
+
+    def testTimersShareOneThread(self):
+        Threads = threading.active_count()
+        Counts = [0] * 50
+        def Tick(Index):
+            Counts[Index] += 1
+        for Index in range(50):
+            self.Manager.CreateTimer(0.01, 0.01, Tick, TimerCount = 5, FunctionArgs = [Index])
+        self.assertEqual(threading.active_count(), Threads)
+        ## Repeatable timers leave the manager after their last call
+        self.assertTrue(WaitFor(lambda: self.Manager.GetTimerCount() == 0 and sum(Counts) == 250))
+        self.assertEqual(Counts, [5] * 50)
+
+    def testControlFunctions(self):
+        Timer = self.Manager.CreateTimer(10, 10, lambda: None)
+        self.assertTrue(WaitFor(lambda: Timer.GetState() == PyWT.TIMER_STATE_RUNNINGINITIAL))
+        self.assertTrue(Timer.Pause())
+        self.assertTrue(WaitFor(lambda: Timer.GetState() == PyWT.TIMER_STATE_SUSPENDED))
+        self.assertFalse(Timer.Pause())
+        self.assertEqual(Timer.GetError(), PyWT.T_ERROR_ALREADY_SWITCHED)
+        self.assertTrue(Timer.Resume())
+        self.assertTrue(WaitFor(lambda: Timer.GetState() == PyWT.TIMER_STATE_RUNNINGINITIAL))
+        self.assertTrue(Timer.Deactivate())
+        self.assertTrue(WaitFor(lambda: Timer.GetState() == PyWT.TIMER_STATE_INIT))
+        self.assertFalse(Timer.Resume())
+        self.assertEqual(Timer.GetError(), PyWT.T_ERROR_INCORRECT_STATE)
+        self.assertTrue(Timer.Terminate())
+        self.assertTrue(WaitFor(lambda: Timer.GetState() == PyWT.TIMER_STATE_TERMINATED))
+        self.assertEqual(self.Manager.GetTimerCount(), 0)
+        self.assertFalse(Timer.Activate())
+
+    def testFailingFunction(self):
+        ## Other timers of the dispatcher keep running
+        Counts = [0]
+        def Fail():
+            raise ValueError('bad')
+        def Tick():
+            Counts[0] += 1
+        Failing = self.Manager.CreateTimer(0.01, 0.01, Fail, TimerCount = 3)
+        self.Manager.CreateTimer(0.02, 0.01, Tick, TimerCount = 3)
+        self.assertTrue(WaitFor(lambda: Counts[0] == 3))
+        self.assertEqual(Failing.GetError(), PyWT.T_ERROR_FUNCTION_FAILED)
+
+    def testTerminateStopsTheTimers(self):
+        Timer = self.Manager.CreateTimer(10, 10, lambda: None)
+        self.Manager.Terminate()
+        self.Manager.join(5)
+        self.assertFalse(self.Manager.is_alive())
+        self.assertEqual(Timer.GetState(), PyWT.TIMER_STATE_TERMINATED)
+
+
+if __name__ == '__main__':
+    unittest.main()
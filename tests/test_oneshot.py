@@ -0,0 +1,52 @@
+import unittest
+
+import PyWT
+
+
+class OneShotTest(unittest.TestCase):
+
+    def setUp(self):
+        self.Clock = PyWT.VirtualClock(1000.0)
+        self.Manager = PyWT.TimerManager(TimeSource = self.Clock)
+        self.Calls = []
+
+    def Call(self, Name, Suffix = ''):
+        self.Calls.append((self.Clock(), Name + Suffix))
+
+    def testDeadlineOrder(self):
+        Manager = self.Manager
+        Manager.ScheduleAt(1003, self.Call, ['c'])
+        Manager.ScheduleAfter(1, self.Call, ['a'], {'Suffix': '!'})
+        Manager.ScheduleAt(1003, self.Call, ['d'])
+        Manager.ScheduleAt(1002, self.Call, ['b'])
+        Manager.Simulate(1010)
+        self.assertEqual(self.Calls, [(1001, 'a!'), (1002, 'b'), (1003, 'c'), (1003, 'd')])
+        Stats = Manager.GetStats()
+        self.assertEqual((Stats['OneShots'], Stats['OneShotsFired']), (0, 4))
+
+    def testCancel(self):
+        Manager = self.Manager
+        Calls = [Manager.ScheduleAfter(Index, self.Call, [str(Index)]) for Index in range(1, 201)]
+        ## Enough cancelled calls to compact the heap
+        for Call in Calls[:150]:
+            self.assertTrue(Call.Cancel())
+        self.assertFalse(Calls[0].Cancel())
+        self.assertEqual(Manager.GetStats()['OneShots'], 50)
+        Manager.Simulate(1200)
+        self.assertEqual([Name for Time, Name in self.Calls], [str(Index) for Index in range(151, 201)])
+        self.assertFalse(Calls[-1].IsPending())
+        self.assertFalse(Calls[-1].Cancel())
+
+    def testErrorsAreCounted(self):
+        Manager = self.Manager
+        def Fail():
+            raise ValueError()
+        Manager.ScheduleAfter(1, Fail)
+        Manager.ScheduleAfter(2, self.Call, ['after'])
+        Manager.Simulate(1005)
+        self.assertEqual(self.Calls, [(1002, 'after')])
+        self.assertEqual(Manager.GetStats()['OneShotErrors'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import time
+import unittest
+
+import PyWT
+
+
+class WaitableTimerResultTest(unittest.TestCase):
+
+    def testResultPauseAfterDelayedPause(self):
+        ## Pause(Wait) is over by itself, a later result pause is for good
+        Counts = [0]
+        def Tick():
+            Counts[0] += 1
+            return Counts[0]
+        Timer = PyWT.WaitableTimer(1, 0.02, Tick, ResultCondition = PyWT.T_IS_FUNC_RESULT_OF_VALUE,
+                                   ResultValue = 8, ResultBehaviour = PyWT.T_BEHAV_TIMER_PAUSE)
+        Timer.start()
+        try:
+            self.assertTrue(Timer.WaitForState(PyWT.TIMER_STATE_RUNNING, 5))
+            Timer.Pause(0.1).Wait(5)
+            self.assertTrue(Timer.WaitForState(PyWT.TIMER_STATE_RUNNING, 5))
+            self.assertTrue(Timer.WaitForState(PyWT.TIMER_STATE_SUSPENDED, 5))
+            time.sleep(0.3)
+            self.assertEqual(Timer.GetState(), PyWT.TIMER_STATE_SUSPENDED)
+            self.assertEqual(Counts[0], 8)
+        finally:
+            Timer.Terminate()
+            Timer.join(5)
+
+    def testExecutorResultWithFullQueue(self):
+        ## Results do not go through the bounded control message queue
+        Executor = NullExecutor()
+        Timer = PyWT.WaitableTimer(1, 1, lambda: True, Executor = Executor,
+                                   ResultCondition = PyWT.T_IS_FUNC_RESULT_TRUE,
+                                   ResultBehaviour = PyWT.T_BEHAV_TIMER_TERMINATED)
+        ## Not started: nothing reads the queue
+        for Index in range(PyWT.TIMER_QUEUE_SIZE - 2):
+            self.assertTrue(Timer.ChangePrecision(0.01))
+        Timer._WaitableTimer__PostResult(True)
+        Timer.start()
+        ## Stopped by the result before the first tick
+        Timer.join(0.9)
+        self.assertEqual(Timer.GetState(), PyWT.TIMER_STATE_TERMINATED)
+        self.assertEqual(Executor.Submitted, 0)
+
+
+class ResultPolicyTest(unittest.TestCase):
+
+    def testConditions(self):
+        Policy = PyWT.ResultPolicy(PyWT.T_IS_FUNC_RESULT_TRUE)
+        self.assertEqual([Policy.Match(Result) for Result in (True, 1, 0, None)], [True, True, False, False])
+        Policy = PyWT.ResultPolicy(PyWT.T_IS_FUNC_RESULT_FALSE)
+        self.assertEqual([Policy.Match(Result) for Result in (True, 1, 0, None)], [False, False, True, True])
+        Policy = PyWT.ResultPolicy(PyWT.T_IS_FUNC_RESULT_OF_TYPE, int)
+        self.assertEqual([Policy.Match(Result) for Result in (1, 'a', None)], [True, False, False])
+        Policy = PyWT.ResultPolicy(PyWT.T_IS_FUNC_RESULT_OF_VALUE, 'stop')
+        self.assertEqual([Policy.Match(Result) for Result in ('stop', 'go')], [True, False])
+
+    def testBehaviour(self):
+        Policy = PyWT.ResultPolicy(PyWT.T_IS_FUNC_RESULT_TRUE, Behaviour = PyWT.T_BEHAV_TIMER_DEACTIVATED)
+        self.assertEqual(Policy.Apply(True, 10), PyWT.T_BEHAV_TIMER_DEACTIVATED)
+        self.assertEqual(Policy.Apply(False, 10), None)
+        self.assertEqual(Policy.Interval(10), 10)
+
+    def testBackoff(self):
+        Policy = PyWT.ResultPolicy(PyWT.T_IS_FUNC_RESULT_FALSE, Behaviour = PyWT.T_BEHAV_TIMER_BACKOFF,
+                                   BackoffFactor = 2, BackoffMax = 50)
+        Intervals = []
+        for Result in (False, False, False, False, True, False):
+            self.assertEqual(Policy.Apply(Result, 10), None)
+            Intervals.append(Policy.Interval(10))
+        ## Doubled up to BackoffMax, back to the interval on success
+        self.assertEqual(Intervals, [20, 40, 50, 50, 10, 20])
+
+
+class ManagedResultTest(unittest.TestCase):
+
+    def Run(self, Behaviour, Results, **Options):
+        ## The function returns Results one by one, then None
+        Clock = PyWT.VirtualClock(1000.0)
+        Manager = PyWT.TimerManager(TimeSource = Clock)
+        Calls = []
+        def Tick():
+            Calls.append(Clock())
+            return Results[len(Calls) - 1] if len(Calls) <= len(Results) else None
+        Timer = Manager.CreateTimer(1, 1, Tick, ResultCondition = PyWT.T_IS_FUNC_RESULT_OF_VALUE,
+                                    ResultValue = 'hit', ResultBehaviour = Behaviour, **Options)
+        Manager.Simulate(1013.5)
+        return Timer, Calls
+
+    def testTerminated(self):
+        Timer, Calls = self.Run(PyWT.T_BEHAV_TIMER_TERMINATED, [None, None, 'hit'])
+        self.assertEqual(len(Calls), 3)
+        self.assertEqual(Timer.GetState(), PyWT.TIMER_STATE_TERMINATED)
+
+    def testDeactivated(self):
+        Timer, Calls = self.Run(PyWT.T_BEHAV_TIMER_DEACTIVATED, [None, 'hit'])
+        self.assertEqual(len(Calls), 2)
+        self.assertEqual(Timer.GetState(), PyWT.TIMER_STATE_INIT)
+
+    def testPause(self):
+        Timer, Calls = self.Run(PyWT.T_BEHAV_TIMER_PAUSE, ['hit'])
+        self.assertEqual(len(Calls), 1)
+        self.assertEqual(Timer.GetState(), PyWT.TIMER_STATE_SUSPENDED)
+        self.assertEqual(Timer.GetDelay(), 0)
+
+    def testBackoff(self):
+        Timer, Calls = self.Run(PyWT.T_BEHAV_TIMER_BACKOFF, ['hit', 'hit', 'hit', None], BackoffFactor = 2, BackoffMax = 4)
+        ## Intervals 2, 4, 4 after the hits (capped), then 1 again
+        self.assertEqual(Calls, [1001, 1003, 1007, 1011, 1012, 1013])
+        self.assertEqual(Timer.GetState(), PyWT.TIMER_STATE_RUNNING)
+
+
+class NullExecutor(object):
+    ## Counts the runs, runs nothing
+    def __init__(self):
+        self.Submitted = 0
+
+    def submit(self, *args, **kwargs):
+        self.Submitted += 1
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+
+import PyWT
+try:
+    import PyWTShard
+except ImportError:
+    ## Python 3.3+
+    PyWTShard = None
+
+
+def Nothing():
+    pass
+
+
+class CodeError(Exception):
+    ## Can be pickled, not loaded: the arguments do not match __init__
+    def __init__(self, Code, Text):
+        Exception.__init__(self, Text)
+        self.Code = Code
+
+
+@unittest.skipIf(PyWTShard is None, "PyWTShard requires Python 3")
+class ShardManagerTest(unittest.TestCase):
+
+    def Create(self, Manager, TimerId, Interval, **Options):
+        Result = PyWTShard.ShardExecute(Manager, PyWTShard.SHARD_CREATE, TimerId, (1, Interval, Nothing, Options))
+        self.assertEqual(Result, (True, PyWT.T_SUCCESS))
+
+    def testFinishedTimersAreForgotten(self):
+        Manager = PyWTShard.ShardManager(TimeSource = PyWT.VirtualClock(1000.0))
+        Owner = Manager._BeginBatch()
+        self.Create(Manager, 1, 0)
+        self.Create(Manager, 2, 1, TimerCount = 3)
+        self.Create(Manager, 3, 1)
+        self.Create(Manager, 4, 1)
+        Manager._EndBatch(Owner)
+        Manager.Simulate(1001)
+        self.assertEqual(sorted(Manager.GetTimerIds()), [2, 3, 4])
+
+        ## Terminate() drops the timer for the rest of the batch right away
+        Result, Error = PyWTShard.ShardExecute(Manager, PyWTShard.SHARD_TERMINATE, 4, (False,))
+        self.assertTrue(Result)
+        self.assertEqual(Manager.GetTimerIds().count(4), 0)
+        self.assertEqual(PyWTShard.ShardExecute(Manager, PyWTShard.SHARD_PAUSE, 4, (0, False)),
+                         (False, PyWT.T_ERROR_INCORRECT_STATE))
+
+        Manager.Simulate(1010)
+        self.assertEqual(Manager.GetTimerIds(), [3])
+        self.assertEqual(PyWTShard.ShardExecute(Manager, PyWTShard.SHARD_STATE, 2, ()),
+                         (PyWT.TIMER_STATE_TERMINATED, PyWT.T_SUCCESS))
+
+        Manager.Terminate()
+        Manager.Simulate(1011)
+        self.assertEqual(Manager.GetTimerIds(), [])
+
+    def testErrorsCanBeSent(self):
+        Error = ValueError('bad')
+        self.assertTrue(PyWTShard.ShardError(Error) is Error)
+        self.assertEqual(PyWTShard.ShardError(PyWT.T_SUCCESS), PyWT.T_SUCCESS)
+        Error = PyWTShard.ShardError(CodeError(7, 'bad'))
+        self.assertTrue(isinstance(Error, RuntimeError))
+        self.assertTrue(str(Error).startswith('CodeError: '))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+import PyWT
+
+
+class SlackTest(unittest.TestCase):
+
+    def Fleet(self, Slack):
+        ## A fires on the second, B half a second later
+        Manager = PyWT.TimerManager(TimeSource = PyWT.VirtualClock(1000.0))
+        Counts = [0, 0]
+        def Tick(Index):
+            Counts[Index] += 1
+        A = Manager.CreateTimer(1, 1, Tick, FunctionArgs = [0], Slack = Slack)
+        Manager.CreateTimer(1.5, 1, Tick, FunctionArgs = [1])
+        return Manager, A, Counts
+
+    def testSlackAtCreation(self):
+        Manager, A, Counts = self.Fleet(0.6)
+        Manager.Simulate(1010.9)
+        self.assertEqual(Counts, [10, 10])
+        self.assertEqual(Manager.GetStats()['CoalescedWakeups'], 10)
+
+    def testSlackSetWhileRunning(self):
+        Manager, A, Counts = self.Fleet(0)
+        Manager.Simulate(1000.5)
+        A.SetSlack(0.6)
+        Manager.Simulate(1010.9)
+        self.assertEqual(Counts, [10, 10])
+        self.assertEqual(Manager.GetStats()['CoalescedWakeups'], 10)
+
+    def testSlackClearedWhileRunning(self):
+        Manager, A, Counts = self.Fleet(0.6)
+        Manager.Simulate(1000.5)
+        A.SetSlack(0)
+        Manager.Simulate(1010.9)
+        self.assertEqual(Counts, [10, 10])
+        self.assertEqual(Manager.GetStats()['CoalescedWakeups'], 0)
+
+        ## Terminated with no slack: nothing left to look for
+        A.Terminate()
+        A.SetSlack(0.6)
+        Manager.Simulate(1020.9)
+        self.assertEqual(Counts, [10, 20])
+        self.assertEqual(Manager.GetStats()['CoalescedWakeups'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,202 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import PyWT
+
+
+def AgeSnapshot(Path, Seconds):
+    ## As if the snapshot was taken Seconds earlier
+    with open(Path, 'r+b') as File:
+        Magic, Version, Count, Wall = PyWT.SNAPSHOT_HEADER.unpack(File.read(PyWT.SNAPSHOT_HEADER.size))
+        File.seek(0)
+        File.write(PyWT.SNAPSHOT_HEADER.pack(Magic, Version, Count, Wall - Seconds))
+
+
+class SnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        self.Directory = tempfile.mkdtemp()
+        self.Path = os.path.join(self.Directory, 'fleet.pywt')
+
+    def tearDown(self):
+        shutil.rmtree(self.Directory)
+
+    def testRoundTrip(self):
+        Clock = PyWT.VirtualClock(1000.0)
+        Manager = PyWT.TimerManager(TimeSource = Clock)
+        Manager.CreateTimer(10, 10, lambda: None, TimerCount = 100, Name = 'run',
+                            Slack = 0.5, Priority = PyWT.PRIORITY_HIGH)
+        Manager.CreateTimer(10, 10, lambda: None, StartCondition = PyWT.TIMER_NO_ACTIVATE, Name = 'init')
+        Paused = Manager.CreateTimer(10, 10, lambda: None, Name = 'paused')
+        Delayed = Manager.CreateTimer(3, 10, lambda: None, Name = 'delayed')
+        Manager.CreateTimer(1, 0, lambda: None, Name = 'done')
+        Manager.Simulate(1015)
+        Paused.Pause()
+        Delayed.Pause(30)
+        Manager.Simulate(1015)
+        ## The finished one-shot is not written
+        self.assertEqual(Manager.Snapshot(self.Path), 4)
+
+        Clock = PyWT.VirtualClock(5000.0)
+        Restored = PyWT.TimerManager(TimeSource = Clock)
+        Calls = []
+        def Resolve(Name):
+            return lambda: Calls.append((Name, Clock()))
+        Timers = dict((Timer.GetName(), Timer) for Timer in Restored.Restore(self.Path, Resolve))
+        Restored.Simulate(5000)
+        self.assertEqual(sorted(Timers), ['delayed', 'init', 'paused', 'run'])
+
+        Run = Timers['run']
+        self.assertEqual(Run.GetState(), PyWT.TIMER_STATE_RUNNING)
+        self.assertEqual((Run.GetInitialInterval(), Run.GetInterval(), Run.GetCount()), (10, 10, 99))
+        self.assertEqual((Run.GetSlack(), Run.GetPriority()), (0.5, PyWT.PRIORITY_HIGH))
+        self.assertEqual(Timers['init'].GetState(), PyWT.TIMER_STATE_INIT)
+        self.assertEqual(Timers['paused'].GetState(), PyWT.TIMER_STATE_SUSPENDED)
+        self.assertEqual(Timers['paused'].GetDelay(), 0)
+        self.assertEqual(Timers['delayed'].GetState(), PyWT.TIMER_STATE_SUSPENDED)
+        self.assertAlmostEqual(Timers['delayed'].GetDelay(), 30, 1)
+
+        ## Deadlines go on from where they were: 5 seconds left for 'run'
+        ## (fired within its slack), 'paused' resumed at 5010 has 5 seconds
+        ## left, 'delayed' resumes after its delay with 8 seconds left
+        Restored.Simulate(5010)
+        Timers['paused'].Resume()
+        Restored.Simulate(5040)
+        Expected = {'run': [5005, 5015, 5025, 5035], 'paused': [5015, 5025, 5035], 'delayed': [5038]}
+        for Name, Wanted in Expected.items():
+            Stamps = [Stamp for Called, Stamp in Calls if Called == Name]
+            self.assertEqual(len(Stamps), len(Wanted), Name)
+            for Stamp, Deadline in zip(Stamps, Wanted):
+                self.assertTrue(Deadline - 0.1 <= Stamp <= Deadline + 0.5, (Name, Stamp))
+
+    def testSnapshotFromTimerFunction(self):
+        ## Runs on the dispatcher thread: must not wait for itself
+        Manager = PyWT.TimerManager()
+        Written = []
+        def Save():
+            Written.append(Manager.Snapshot(self.Path))
+        Manager.start()
+        try:
+            Manager.CreateTimer(1, 0, Save, Name = 'saver')
+            Manager.CreateTimer(5, 5, lambda: None, Name = 'other')
+            Deadline = PyWT.Clock() + 5
+            while not Written and PyWT.Clock() < Deadline:
+                time.sleep(0.01)
+        finally:
+            Manager.Terminate()
+            Manager.join(5)
+        self.assertFalse(Manager.is_alive())
+        self.assertEqual(Written, [2])
+
+    def testSnapshotInsideBatch(self):
+        Manager = PyWT.TimerManager()
+        Manager.start()
+        try:
+            Group = Manager.CreateGroup()
+            Group.CreateTimer(5, 5, lambda: None, Name = 'a').WaitForState(PyWT.TIMER_STATE_RUNNINGINITIAL, 5)
+            Owner = Manager._BeginBatch()
+            try:
+                Written = Manager.Snapshot(self.Path)
+            finally:
+                Manager._EndBatch(Owner)
+        finally:
+            Manager.Terminate()
+            Manager.join(5)
+        self.assertEqual(Written, 1)
+
+    def testSnapshotFromSimulatedFunction(self):
+        Clock = PyWT.VirtualClock(1000.0)
+        Manager = PyWT.TimerManager(TimeSource = Clock)
+        Written = []
+        Manager.CreateTimer(1, 1, lambda: Written.append(Manager.Snapshot(self.Path)), TimerCount = 3, Name = 'saver')
+        Manager.Simulate(1010)
+        ## Still running while its last call is on
+        self.assertEqual(Written, [1, 1, 1])
+        self.assertEqual(Manager.GetTimerCount(), 0)
+
+    def testMissedOneShot(self):
+        Manager = PyWT.TimerManager(TimeSource = PyWT.VirtualClock(1000.0))
+        Manager.CreateTimer(10, 0, lambda: None, Name = 'once')
+        Manager.Simulate(1001)
+        self.assertEqual(Manager.Snapshot(self.Path), 1)
+        AgeSnapshot(self.Path, 100)
+
+        ## Dropped when skipping, fired at once otherwise
+        for CatchUp, Wanted in ((PyWT.CATCHUP_SKIP, []), (PyWT.CATCHUP_ONCE, [5000.0])):
+            Clock = PyWT.VirtualClock(5000.0)
+            Restored = PyWT.TimerManager(TimeSource = Clock)
+            Calls = []
+            Timers = Restored.Restore(self.Path, lambda Name: lambda: Calls.append(Clock()), CatchUp)
+            Restored.Simulate(5100)
+            self.assertEqual(Calls, Wanted)
+            self.assertEqual(Timers[0].GetState(), PyWT.TIMER_STATE_TERMINATED)
+
+    def testRestoreCatchUpIsFlushedAtOnce(self):
+        Manager = PyWT.TimerManager(TimeSource = PyWT.VirtualClock(1000.0))
+        for Index in range(5):
+            Manager.CreateTimer(10, 10, lambda: None, Name = 'timer-%d' % Index)
+        Manager.Simulate(1001)
+        self.assertEqual(Manager.Snapshot(self.Path), 5)
+        AgeSnapshot(self.Path, 100)
+
+        Clock = PyWT.VirtualClock(5000.0)
+        Restored = PyWT.TimerManager(TimeSource = Clock)
+        Runs = []
+        def Flush(Calls):
+            Runs.append((Clock(), len(Calls)))
+        Restored.Restore(self.Path, lambda Name: Flush, PyWT.CATCHUP_ONCE, Batch = True)
+        Restored.Simulate(5000)
+        self.assertEqual(Runs, [(5000.0, 5)])
+
+
+class RestoreCatchUpTest(unittest.TestCase):
+
+    def setUp(self):
+        self.Directory = tempfile.mkdtemp()
+        self.Path = os.path.join(self.Directory, 'fleet.pywt')
+        ## Next deadline half a second away, then down for 10.25 seconds:
+        ## 10 deadlines missed, the next one 0.25 seconds after the restore
+        Manager = PyWT.TimerManager(TimeSource = PyWT.VirtualClock(1000.0))
+        Manager.CreateTimer(1, 1, lambda: None, Name = 'tick')
+        Manager.Simulate(1000.5)
+        self.assertEqual(Manager.Snapshot(self.Path), 1)
+        AgeSnapshot(self.Path, 10.25)
+
+    def tearDown(self):
+        shutil.rmtree(self.Directory)
+
+    def Restore(self, CatchUp):
+        Clock = PyWT.VirtualClock(5000.0)
+        Manager = PyWT.TimerManager(TimeSource = Clock)
+        Calls = []
+        Timers = Manager.Restore(self.Path, lambda Name: lambda: Calls.append(Clock()), CatchUp,
+                                 CatchUpLimit = 3, Statistics = True)
+        self.assertEqual(len(Timers), 1)
+        Manager.Simulate(5000.1)
+        Now = len(Calls)
+        Manager.Simulate(5001)
+        self.assertEqual(len(Calls) - Now, 1)
+        self.assertAlmostEqual(Calls[-1], 5000.25, 1)
+        return Now, Manager.GetStats()
+
+    def testSkip(self):
+        Now, Stats = self.Restore(PyWT.CATCHUP_SKIP)
+        self.assertEqual(Now, 0)
+        self.assertEqual(Stats['Skipped'], 10)
+
+    def testOnce(self):
+        Now, Stats = self.Restore(PyWT.CATCHUP_ONCE)
+        self.assertEqual(Now, 1)
+        self.assertEqual(Stats['Skipped'], 9)
+
+    def testBurst(self):
+        Now, Stats = self.Restore(PyWT.CATCHUP_BURST)
+        self.assertEqual(Now, 3)
+        self.assertEqual(Stats['Skipped'], 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+
+import PyWT
+from PyWT import SpreadFraction, SpreadPhase, TickJitter
+
+
+class SpreadTest(unittest.TestCase):
+
+    def testKeyedPhase(self):
+        ## The same key falls on the same phase, the keys spread out
+        self.assertEqual(SpreadFraction('poller-1'), SpreadFraction('poller-1'))
+        Fractions = [SpreadFraction('poller-%d' % Index) for Index in range(100)]
+        self.assertTrue(all(0 <= Fraction < 1 for Fraction in Fractions))
+        self.assertTrue(len(set(Fractions)) > 90)
+        self.assertEqual(SpreadPhase(PyWT.SPREAD_INTERVAL, 0.5, 10), 5)
+        self.assertEqual(SpreadPhase(4, 0.5, 10), 2)
+
+    def testJitterStaysBelowTheInterval(self):
+        self.assertEqual(TickJitter(0, 10), 0)
+        self.assertEqual(TickJitter(5, 0), 0)
+        self.assertTrue(all(0 <= TickJitter(50, 1) < 1 for Index in range(100)))
+
+    def testManagedTimers(self):
+        Clock = PyWT.VirtualClock(1000.0)
+        Manager = PyWT.TimerManager(TimeSource = Clock)
+        Calls = {}
+        def Tick(Key):
+            Calls.setdefault(Key, []).append(Clock())
+        for Index in range(20):
+            Key = 'poller-%d' % Index
+            Manager.CreateTimer(1, 10, Tick, FunctionArgs = [Key], Spread = PyWT.SPREAD_INTERVAL,
+                                SpreadKey = Key, Jitter = 0.5)
+        Manager.Simulate(1100.5)
+        ## Spread over the first interval instead of firing at once
+        Firsts = sorted(Times[0] for Times in Calls.values())
+        self.assertTrue(Firsts[-1] - Firsts[0] > 5)
+        for Key, Times in Calls.items():
+            Phase = 1 + SpreadFraction(Key) * 10
+            ## Every tick within the jitter behind its grid deadline: no drift
+            for Number, Time in enumerate(Times):
+                self.assertTrue(0 <= Time - (1000 + Phase + Number * 10) < 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+
+import PyWT
+
+
+class ManagerStatsTest(unittest.TestCase):
+
+    def testTotalsOutliveTimers(self):
+        Clock = PyWT.VirtualClock(1000.0)
+        Manager = PyWT.TimerManager(TimeSource = Clock)
+        for Count in range(1, 6):
+            Manager.CreateTimer(1, 1, lambda: None, TimerCount = Count + 1, Statistics = True)
+        Manager.CreateTimer(1, 1, lambda: None, Statistics = True)
+
+        Fired = 0
+        for Until in range(1001, 1011):
+            Manager.Simulate(Until)
+            Stats = Manager.GetStats()
+            self.assertTrue(Stats['Fired'] >= Fired)
+            Fired = Stats['Fired']
+
+        ## 2 + 3 + 4 + 5 + 6 calls of the finished timers, 10 of the last one
+        self.assertEqual(Fired, 30)
+        self.assertEqual(Stats['Timers'], 1)
+        self.assertEqual(Stats['Lateness']['Count'], 30)
+
+    def testTimerQueueDepth(self):
+        Clock = PyWT.VirtualClock(1000.0)
+        Manager = PyWT.TimerManager(TimeSource = Clock)
+        Timers = [Manager.CreateTimer(1, 1, lambda: None, Statistics = True) for Index in range(3)]
+        ## INIT and ACTIVATE of three timers wait in the shared queue
+        Manager.Simulate(1000)
+        self.assertEqual([Timer.GetStats()['QueueDepthMax'] for Timer in Timers], [6, 6, 6])
+        Timers[0].Pause()
+        Manager.Simulate(1001)
+        self.assertEqual(Timers[0].GetStats()['QueueDepth'], 1)
+        self.assertEqual(Manager.GetStats()['QueueDepthMax'], 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
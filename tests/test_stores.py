@@ -0,0 +1,100 @@
+import random
+import unittest
+
+import PyWT
+
+
+class StoreEquivalenceTest(unittest.TestCase):
+    ## Same inserts, cancels and pops give the same entries in the same order
+
+    def Stores(self):
+        return PyWT.HeapTimerStore(Now = 0.0), PyWT.WheelTimerStore(Now = 0.0)
+
+    def Pop(self, Stores, Now):
+        Popped = [[Entry.Item for Entry in Store.PopDue(Now)] for Store in Stores]
+        self.assertEqual(Popped[0], Popped[1])
+        self.assertEqual(len(Stores[0]), len(Stores[1]))
+        return Popped[0]
+
+    def testRandomOperations(self):
+        Random = random.Random(16)
+        Stores = self.Stores()
+        Entries = {}
+        Fired = []
+        Now = 0.0
+        for Step in range(3000):
+            Action = Random.random()
+            if Action < 0.5:
+                ## Near, far (higher wheel levels) and already due deadlines
+                Deadline = Now + Random.choice((0.01, 1, 60, 4000)) * Random.random() - 0.005
+                Item = Step
+                Entries[Item] = [Store.Insert(Deadline, Item, Random.random() < 0.1) for Store in Stores]
+            elif Action < 0.65 and Entries:
+                Item = Random.choice(sorted(Entries))
+                for Store, Entry in zip(Stores, Entries.pop(Item)):
+                    Store.Cancel(Entry)
+            else:
+                Now += Random.random() * Random.choice((0.001, 0.1, 10))
+                for Item in self.Pop(Stores, Now):
+                    Fired.append(Item)
+                    Entries.pop(Item)
+
+        ## Drain everything left
+        for Step in range(10000):
+            Deadline = Stores[0].NextDeadline()
+            if Deadline is None:
+                break
+            Now = max(Now, Deadline)
+            for Item in self.Pop(Stores, Now):
+                Entries.pop(Item)
+        self.assertEqual(Entries, {})
+        self.assertEqual(len(Stores[1]), 0)
+        self.assertTrue(len(Fired) > 500)
+
+    def testSameDeadlineOrder(self):
+        Stores = self.Stores()
+        for Item in range(6):
+            for Store in Stores:
+                Store.Insert(5.0, Item, Item in (3, 4))
+        ## Front entries first (the later one last), then in insert order
+        self.assertEqual(self.Pop(Stores, 5.0), [3, 4, 0, 1, 2, 5])
+
+
+class WheelStoreTest(unittest.TestCase):
+
+    def testCascadePointIsReached(self):
+        ## 1000 + k * 0.256 rounds below k in Now // Span for many k: a
+        ## timer driven by NextDeadline() used to stop at the first such
+        ## cascade point
+        Store = PyWT.WheelTimerStore(Now = 1000.0)
+        Deadline = 1001.0
+        Store.Insert(Deadline, None)
+        Fired = 0
+        for Step in range(1000):
+            if Store.PopDue(Store.NextDeadline()):
+                Fired += 1
+                Deadline += 1
+                if Deadline >= 1100:
+                    break
+                Store.Insert(Deadline, None)
+        self.assertEqual(Fired, 99)
+
+    def testCascadeEntriesAreDue(self):
+        Store = PyWT.WheelTimerStore(Now = 0.0)
+        Span = PyWT.WHEEL_TICK_DEFAULT * PyWT.WHEEL_SLOTS[0]
+        Items = []
+        for Key in range(3900, 3920):
+            Items.append(Key)
+            Store.Insert(Key * Span, Key)
+        Fired = []
+        ## A cascade point PopDue() does not see would come back forever
+        for Step in range(100):
+            Now = Store.NextDeadline()
+            if Now is None:
+                break
+            Fired.extend(Entry.Item for Entry in Store.PopDue(Now))
+        self.assertEqual(Fired, Items)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import time
+import unittest
+
+import PyWT
+try:
+    import asyncio
+    import PyWTAsync
+except (ImportError, SyntaxError):
+    ## Python 3.7+
+    PyWTAsync = None
+
+
+def WaitFor(Condition, Timeout = 5):
+    ## The control functions return before the timer applies the message
+    Deadline = time.time() + Timeout
+    while not Condition():
+        if time.time() > Deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def Events(Recorder, Kind):
+    return [Value for Stamp, Thread, Name, Event, Value in Recorder.GetEvents() if Event == Kind]
+
+
+class TraceTest(unittest.TestCase):
+
+    def testWaitableTimer(self):
+        Recorder = PyWT.TraceRecorder()
+        Timer = PyWT.WaitableTimer(1, 0, lambda: None, StartCondition = PyWT.TIMER_NO_ACTIVATE)
+        Timer.AddTraceListener(Recorder)
+        Timer.start()
+        try:
+            self.assertTrue(WaitFor(lambda: Timer.GetState() == PyWT.TIMER_STATE_INIT))
+            ## Refused control calls leave a notice instead of a print
+            self.assertFalse(Timer.Resume())
+            self.assertTrue(any(Notice.startswith("Resume(): Error") for Notice in Events(Recorder, PyWT.TRACE_NOTICE)))
+
+            self.assertTrue(Timer.Activate())
+            self.assertTrue(WaitFor(lambda: Timer.GetState() == PyWT.TIMER_STATE_TERMINATED))
+            Timer.join(5)
+        finally:
+            Timer.Terminate(True)
+
+        self.assertEqual(Events(Recorder, PyWT.TRACE_STATE),
+                         [PyWT.TIMER_STATE_INIT, PyWT.TIMER_STATE_RUNNINGINITIAL,
+                          PyWT.TIMER_STATE_RUNNING, PyWT.TIMER_STATE_TERMINATED])
+        self.assertEqual(len(Events(Recorder, PyWT.TRACE_CALLBACK_START)), 1)
+        self.assertEqual(len(Events(Recorder, PyWT.TRACE_CALLBACK_END)), 1)
+        self.assertTrue(PyWT.MESSAGE_ACTIVATE in Events(Recorder, PyWT.TRACE_MESSAGE))
+
+        Trace = Recorder.GetChromeTrace()['traceEvents']
+        self.assertEqual(len(Trace), len(Recorder.GetEvents()))
+        self.assertEqual([Record['ph'] for Record in Trace if Record['cat'] == 'callback'], ['b', 'e'])
+
+    def testManagedTimer(self):
+        Recorder = PyWT.TraceRecorder()
+        Manager = PyWT.TimerManager()
+        Manager.start()
+        try:
+            Timer = Manager.CreateTimer(10, 10, lambda: None, StartCondition = PyWT.TIMER_NO_ACTIVATE,
+                                        Name = "Traced")
+            Timer.AddTraceListener(Recorder)
+            self.assertTrue(WaitFor(lambda: Timer.GetState() == PyWT.TIMER_STATE_INIT))
+            self.assertTrue(Timer.Terminate())
+            self.assertTrue(WaitFor(lambda: Timer.GetState() == PyWT.TIMER_STATE_TERMINATED))
+            self.assertFalse(Timer.Activate())
+        finally:
+            Manager.Terminate()
+            Manager.join(5)
+
+        self.assertEqual(set(Name for Stamp, Thread, Name, Event, Value in Recorder.GetEvents()), set(["Traced"]))
+        self.assertEqual(Events(Recorder, PyWT.TRACE_STATE)[-1], PyWT.TIMER_STATE_TERMINATED)
+        self.assertTrue(any(Notice.startswith("Timer is in TERMINATED state") for Notice in Events(Recorder, PyWT.TRACE_NOTICE)))
+
+    @unittest.skipIf(PyWTAsync is None, "PyWTAsync requires Python 3.7+")
+    def testAsyncWaitableTimer(self):
+        Recorder = PyWT.TraceRecorder()
+        Loop = asyncio.new_event_loop()
+        try:
+            Timer = PyWTAsync.AsyncWaitableTimer(1, 0, lambda: None, StartCondition = PyWT.TIMER_NO_ACTIVATE,
+                                                 Loop = Loop, Name = "Async")
+            Timer.AddTraceListener(Recorder)
+            Loop.run_until_complete(asyncio.sleep(0))
+            self.assertFalse(Timer.Pause())
+            self.assertTrue(Timer.Activate())
+            Loop.run_until_complete(Timer.WaitForState(PyWT.TIMER_STATE_TERMINATED, 5))
+        finally:
+            Loop.close()
+
+        self.assertEqual(Timer.GetName(), "Async")
+        self.assertEqual(Events(Recorder, PyWT.TRACE_STATE),
+                         [PyWT.TIMER_STATE_INIT, PyWT.TIMER_STATE_RUNNINGINITIAL,
+                          PyWT.TIMER_STATE_RUNNING, PyWT.TIMER_STATE_TERMINATED])
+        self.assertEqual(len(Events(Recorder, PyWT.TRACE_CALLBACK_END)), 1)
+        self.assertTrue(any(Notice.startswith("Pause(): Error") for Notice in Events(Recorder, PyWT.TRACE_NOTICE)))
+
+
+if __name__ == '__main__':
+    unittest.main()
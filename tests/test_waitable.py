@@ -0,0 +1,50 @@
+import time
+import unittest
+
+import PyWT
+
+
+def WaitFor(Condition, Timeout = 5):
+    ## The control functions return before the timer thread applies the message
+    Deadline = time.time() + Timeout
+    while not Condition():
+        if time.time() > Deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+class WakeupTest(unittest.TestCase):
+
+    def RunCounted(self, Mode):
+        Calls = []
+        Timer = PyWT.WaitableTimer(0.01, 0.01, lambda: Calls.append(time.time()),
+                                   TimerCount = 5, WakeupMode = Mode)
+        Timer.start()
+        Timer.join(5)
+        self.assertFalse(Timer.is_alive())
+        self.assertEqual(len(Calls), 5)
+        self.assertEqual(Timer.GetState(), PyWT.TIMER_STATE_TERMINATED)
+
+    def testEventModeFires(self):
+        self.RunCounted(PyWT.WAKEUP_EVENT)
+
+    def testPollingModeFires(self):
+        self.RunCounted(PyWT.WAKEUP_POLLING)
+
+    def testMessageWakesLongSleep(self):
+        Timer = PyWT.WaitableTimer(60, 60, lambda: None)
+        Timer.start()
+        self.assertTrue(WaitFor(lambda: Timer.GetState() == PyWT.TIMER_STATE_RUNNINGINITIAL))
+        Start = time.time()
+        self.assertTrue(Timer.Pause())
+        self.assertTrue(WaitFor(lambda: Timer.GetState() == PyWT.TIMER_STATE_SUSPENDED))
+        Timer.Terminate()
+        Timer.join(5)
+        self.assertFalse(Timer.is_alive())
+        ## Not held until the 60 seconds deadline
+        self.assertLess(time.time() - Start, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()